@@ -0,0 +1,165 @@
+"""
+Benchmark of preprocess_demo_df against the implementation it replaced.
+
+    python -m benchmarks.demo_dedup --rows 5000000
+
+Builds a synthetic DEMO table shaped like the raw file (several versions per case,
+ages and weights in mixed units), times the old and new preprocessing and their
+dedup steps, and compares the reports each one keeps.
+
+The two dedup rules differ by design. The old one sorted by caseid, fda_dt and
+primaryid and kept each case's report with the latest fda_dt (then the highest
+primaryid). The new one (src.deduplication.is_latest_version) keeps the highest
+caseversion first, then the latest fda_dt, then the highest primaryid. They only
+disagree on cases whose highest caseversion isn't also their latest
+(fda_dt, primaryid), e.g. a follow-up with an older FDA receipt date than the
+report it replaces. compare() checks that those are exactly the cases where the
+kept reports differ.
+"""
+
+import argparse
+import sys
+import time
+from typing import Callable, Dict, Tuple
+
+import numpy as np
+import pandas as pd
+
+from src.deduplication import is_latest_version
+from src.preprocessing import preprocess_demo_df
+
+AGE_CODES = ["YR", "MON", "WK", "DY", "HR", "DEC"]
+
+
+def make_demo(n_rows: int, seed: int = 0, conflict_rate: float = 0.01) -> pd.DataFrame:
+    """
+    Synthetic raw DEMO table with about two versions per case, in random file order.
+    Args:
+        n_rows: int
+        seed: int
+        conflict_rate: float (share of reports whose fda_dt is older than their
+            case's earlier versions)
+    """
+    rng = np.random.default_rng(seed)
+    caseid = rng.integers(0, max(n_rows // 2, 1), n_rows)
+    caseversion = pd.Series(caseid).groupby(caseid).cumcount().to_numpy() + 1
+    fda_dt = (20100101 + 10 * caseversion + rng.integers(0, 5, n_rows)).astype(float)
+    conflicts = rng.random(n_rows) < conflict_rate
+    fda_dt[conflicts] -= 1000
+    fda_dt[rng.random(n_rows) < 0.005] = np.nan
+    return pd.DataFrame(
+        {
+            "primaryid": caseid * 100 + caseversion,
+            "caseid": caseid,
+            "caseversion": caseversion,
+            "i_f_code": np.where(caseversion > 1, "F", "I"),
+            "event_dt": 20100101,
+            "fda_dt": fda_dt,
+            "age_cod": pd.Categorical(rng.choice(AGE_CODES, n_rows, p=[0.9, 0.04, 0.02, 0.02, 0.01, 0.01])),
+            "age": np.where(rng.random(n_rows) < 0.3, np.nan, rng.integers(1, 90, n_rows)),
+            "sex": pd.Categorical(rng.choice(["F", "M", "UNK"], n_rows)),
+            "wt": np.where(rng.random(n_rows) < 0.5, np.nan, rng.integers(3, 150, n_rows)),
+            "wt_cod": pd.Categorical(rng.choice(["KG", "LBS"], n_rows)),
+        }
+    )
+
+
+def old_latest(demo: pd.DataFrame) -> pd.DataFrame:
+    """
+    The dedup step of the old preprocess_demo_df
+    """
+    demo = demo.sort_values(by=["caseid", "fda_dt", "primaryid"], ascending=[True, False, False])
+    return demo.drop_duplicates(subset=["caseid"], keep="first")
+
+
+def old_preprocess_demo_df(demo: pd.DataFrame) -> pd.DataFrame:
+    """
+    preprocess_demo_df as it was before it was vectorized
+    """
+    demo = demo[
+        ["primaryid", "caseid", "caseversion", "age_cod", "age", "sex", "wt", "fda_dt", "event_dt"]
+    ]
+    demo = old_latest(demo)
+    demo = demo[pd.notnull(demo["age"])]
+    demo = demo[demo.age_cod != "dec"].reset_index(drop=True)
+    demo["age"] = demo["age"].apply(pd.to_numeric, errors="coerce")
+    demo["age"] = np.where(demo["age_cod"] == "MON", demo["age"] * 1 / 12, demo["age"])
+    demo["age"] = np.where(demo["age_cod"] == "WK", demo["age"] * 1 / 52, demo["age"])
+    demo["age"] = np.where(demo["age_cod"] == "DY", demo["age"] * 1 / 365, demo["age"])
+    demo["age"] = np.where(demo["age_cod"] == "HR", demo["age"] * 1 / 8760, demo["age"])
+    return demo.drop(["age_cod"], axis=1)
+
+
+def conflicting_cases(demo: pd.DataFrame) -> np.ndarray:
+    """
+    caseids whose highest caseversion isn't also their latest (fda_dt, primaryid),
+    the only cases the two rules keep different reports for
+    """
+    keys = demo[["caseid", "caseversion", "fda_dt", "primaryid"]].fillna({"caseversion": -1, "fda_dt": -1})
+    by_version = keys.sort_values(["caseid", "caseversion", "fda_dt", "primaryid"]).drop_duplicates("caseid", keep="last")
+    by_date = keys.sort_values(["caseid", "fda_dt", "primaryid"]).drop_duplicates("caseid", keep="last")
+    merged = by_version.merge(by_date, on="caseid", suffixes=("_version", "_date"))
+    return merged.loc[merged["primaryid_version"] != merged["primaryid_date"], "caseid"].to_numpy()
+
+
+def timed(function: Callable, *args) -> Tuple[object, float]:
+    start = time.perf_counter()
+    result = function(*args)
+    return result, time.perf_counter() - start
+
+
+def compare(demo: pd.DataFrame) -> Dict[str, object]:
+    """
+    Time the old and new preprocessing and compare the reports they keep
+    Returns:
+        dict of timings (seconds), counts and whether the kept reports only differ
+        on conflicting cases
+    """
+    old_dedup, old_dedup_s = timed(old_latest, demo)
+    new_mask, new_dedup_s = timed(is_latest_version, demo)
+    old_demo, old_s = timed(old_preprocess_demo_df, demo)
+    new_demo, new_s = timed(preprocess_demo_df, demo)
+
+    new_dedup = demo[new_mask]
+    old_ids = pd.Series(old_dedup["primaryid"].to_numpy(), index=old_dedup["caseid"].to_numpy())
+    new_ids = pd.Series(new_dedup["primaryid"].to_numpy(), index=new_dedup["caseid"].to_numpy())
+    differing = np.sort(old_ids.index[old_ids != new_ids.reindex(old_ids.index)].to_numpy())
+    conflicts = np.sort(conflicting_cases(demo))
+
+    # Outside the conflicting cases the full preprocessing keeps the same reports
+    old_kept = old_demo.loc[~old_demo["caseid"].isin(conflicts), "primaryid"]
+    new_kept = new_demo.loc[~new_demo["caseid"].isin(conflicts), "primaryid"]
+    return {
+        "rows": len(demo),
+        "cases": len(old_ids),
+        "old_dedup_s": old_dedup_s,
+        "new_dedup_s": new_dedup_s,
+        "old_preprocess_s": old_s,
+        "new_preprocess_s": new_s,
+        "conflicting_cases": len(conflicts),
+        "differing_cases": len(differing),
+        "same_cases_kept": bool(old_ids.index.sort_values().equals(new_ids.index.sort_values())),
+        "only_conflicts_differ": bool(np.array_equal(differing, conflicts)),
+        "same_reports_elsewhere": bool(np.array_equal(np.sort(old_kept), np.sort(new_kept))),
+    }
+
+
+def build_parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(prog="python -m benchmarks.demo_dedup")
+    p.add_argument("--rows", type=int, default=5_000_000)
+    p.add_argument("--seed", type=int, default=0)
+    p.add_argument("--conflict-rate", type=float, default=0.01)
+    return p
+
+
+def main():
+    args = build_parser().parse_args()
+    result = compare(make_demo(args.rows, args.seed, args.conflict_rate))
+    for key, value in result.items():
+        print(f"{key:>24}: {value:.2f}" if isinstance(value, float) else f"{key:>24}: {value}")
+    ok = result["same_cases_kept"] and result["only_conflicts_differ"] and result["same_reports_elsewhere"]
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
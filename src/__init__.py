@@ -1,13 +1,14 @@
 from .data_loader import FAERSData, FAERSDataLoader
 from .experiment import FilterExperiment
 from .meddra_search import filter_by_preferred_terms
-from .drug_search import filter_by_drug_name, run_indications_analysis, extract_top_indications, filter_by_age, merge_with_demographics, merge_with_outcomes, merge_with_indications
+from .drug_search import filter_by_drug_name, filter_by_drug_names, run_indications_analysis, extract_top_indications, filter_by_age, merge_with_demographics, merge_with_outcomes, merge_with_indications
 from .filters import filter_by
 
 __all__ = [
     "FAERSData",
     "FAERSDataLoader",
     "filter_by_drug_name",
+    "filter_by_drug_names",
     "FilterExperiment",
     "filter_by_preferred_terms",
     "filter_by"
@@ -1,58 +1,50 @@
-"""Functions for aggregating FAERS data."""
+"""Functions for aggregating FAERS data.
+
+The list columns (pt, rpsr_cod, start_dt) are pyarrow list<dictionary> columns built
+from a RaggedArray (see src/ragged.py), not object columns of Python lists. Reading
+an element or calling tolist() still gives Python lists, but the column's dtype is a
+pd.ArrowDtype, list operations go through its .list accessor, and a report without
+rows in the table has a missing list (<NA>) after a merge.
+"""
 
 import pandas as pd
 from loguru import logger
 from typing import Dict, Callable, Any
 
+from src.outcomes import encode_outcomes
+from src.ragged import RaggedArray
+
 def aggregate_outcomes(outc: pd.DataFrame, debug: bool = False) -> pd.DataFrame:
-    """Aggregate outcome data by primaryid and caseid."""
+    """Aggregate outcome data by primaryid and caseid into an outcome bitmask (see src/outcomes.py)."""
     if debug:
         logger.debug(f"Aggregating outcomes for {outc.shape[0]} rows")
-    
-    outcomes_agg = (
-        outc.groupby(["primaryid", "caseid"])["outc_cod"]
-        .apply(lambda x: list(x.dropna().unique()))
-        .reset_index()
-    )
-    return outcomes_agg
+
+    return encode_outcomes(outc)
 
 def aggregate_reactions(reac: pd.DataFrame, debug: bool = False) -> pd.DataFrame:
-    """Aggregate reaction data by primaryid and caseid."""
+    """Aggregate reaction data by primaryid and caseid into a list column of PTs (see src/ragged.py)."""
     if debug:
         logger.debug(f"Aggregating reactions for {reac.shape[0]} rows")
-        
-    reactions_agg = (
-        reac.groupby(["primaryid", "caseid"])["pt"]
-        .apply(lambda x: list(x.dropna().unique()))
-        .reset_index()
-    )
-    return reactions_agg
+
+    return RaggedArray.from_table(reac, "pt").to_frame("pt")
 
 def aggregate_therapy(ther: pd.DataFrame, debug: bool = False) -> pd.DataFrame:
-    """Aggregate therapy data by primaryid and caseid."""
+    """
+    Aggregate therapy data by primaryid and caseid into a list column of start dates.
+    end_dt, dur and dur_cod are no longer aggregated: preprocess_ther_df drops them.
+    """
     if debug:
         logger.debug(f"Aggregating therapy data for {ther.shape[0]} rows")
-        
-    therapy_agg = (
-        ther.groupby(["primaryid", "caseid"])[
-            ["start_dt", "end_dt", "dur", "dur_cod"]
-        ]
-        .apply(lambda x: list(x.dropna().unique()))
-        .reset_index()
-    )
-    return therapy_agg
+
+    # start_dt is the only therapy field preprocess_ther_df keeps
+    return RaggedArray.from_table(ther, "start_dt").to_frame("start_dt")
 
 def aggregate_reporter(rpsr: pd.DataFrame, debug: bool = False) -> pd.DataFrame:
-    """Aggregate reporter data by primaryid and caseid."""
+    """Aggregate reporter data by primaryid and caseid into a list column of reporter codes."""
     if debug:
         logger.debug(f"Aggregating reporter data for {rpsr.shape[0]} rows")
-        
-    rpsr_agg = (
-        rpsr.groupby(["primaryid", "caseid"])["rpsr_cod"]
-        .apply(lambda x: list(x.dropna().unique()))
-        .reset_index()
-    )
-    return rpsr_agg
+
+    return RaggedArray.from_table(rpsr, "rpsr_cod").to_frame("rpsr_cod")
 
 # Factory method setup similar to preprocessing.py
 AGGREGATION_FUNCTIONS: Dict[str, Callable[[pd.DataFrame, bool], pd.DataFrame]] = {
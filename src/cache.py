@@ -0,0 +1,330 @@
+"""
+On-disk cache of loaded FAERS tables.
+
+Each cache entry is a directory holding one uncompressed Arrow IPC (Feather) file per
+table. Files are memory-mapped when read, so opening an entry is cheap and a table
+is only paged in from disk when it is accessed.
+
+The loader caches each quarter as its own entry (a shard) keyed by the quarter's
+fingerprint, and assembles any requested range of quarters from the shards. A shard
+only holds the tables that have been requested so far; others are added as needed.
+CacheManager keeps the cache directory under a byte budget by evicting the least
+recently used entries, and can be driven from the command line:
+
+    python -m src.cache list
+    python -m src.cache evict --max-bytes 20e9
+    python -m src.cache purge 2024Q1_<fingerprint>
+"""
+
+import argparse
+import hashlib
+import os
+import shutil
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import pandas as pd
+from loguru import logger
+from pyarrow import feather
+
+from src.preprocessing import PREPROCESS_VERSION
+from src.processed_store import get_processed_quarter_dir
+from src.utils.quarter_archive import get_quarter_archive_path, get_quarter_dir
+from src.vocabulary import get_vocabulary_epoch
+
+# Marker file whose mtime records when an entry was last used
+LAST_ACCESS_FILE = ".last_access"
+
+# Bytes hashed at each end of a source file for its fingerprint
+FINGERPRINT_EDGE_BYTES = 1024 * 1024
+
+
+def file_digest(path: Path, size: int, edge_bytes: int = FINGERPRINT_EDGE_BYTES) -> str:
+    """
+    Hash of the first and last edge_bytes of a file, so a file rewritten with the
+    same size and mtime (e.g. restored from a copy) is still told apart without
+    reading all of it
+    """
+    hasher = hashlib.md5()
+    with open(path, "rb") as f:
+        hasher.update(f.read(edge_bytes))
+        if size > edge_bytes:
+            f.seek(max(size - edge_bytes, edge_bytes))
+            hasher.update(f.read(edge_bytes))
+    return hasher.hexdigest()
+
+
+def quarter_fingerprint(quarter: str, save_dir: str = "data") -> str:
+    """
+    Fingerprint of a quarter's source files, the preprocessing version and the
+    vocabulary its names are encoded with. Changes whenever a source file is replaced
+    (size, mtime or the hash of its first and last MB), preprocessing changes or the
+    vocabulary is recreated. A change in the middle of a file that keeps its size and
+    mtime isn't detected, hashing whole files would cost a full read of the quarter.
+
+    The source files are the raw TXT files in data/faers_reports/<quarter>, the
+    quarter's archive if it wasn't extracted, or the processed store for quarters
+    that are only available there.
+    """
+    hasher = hashlib.md5(PREPROCESS_VERSION.encode())
+    hasher.update(get_vocabulary_epoch(save_dir).encode())
+    quarter_dir = get_quarter_dir(quarter, save_dir)
+    archive_path = get_quarter_archive_path(quarter, save_dir)
+    if quarter_dir.is_dir():
+        source_files = sorted(quarter_dir.iterdir())
+    elif archive_path.exists():
+        source_files = [archive_path]
+    else:
+        source_files = sorted(get_processed_quarter_dir(quarter, save_dir).iterdir())
+    for path in source_files:
+        if path.is_file():
+            stat = path.stat()
+            digest = file_digest(path, stat.st_size)
+            hasher.update(f"{path.name}:{stat.st_size}:{stat.st_mtime_ns}:{digest};".encode())
+    return hasher.hexdigest()
+
+
+def get_shard_key(quarter: str, fingerprint: str) -> str:
+    """
+    Get the key of the cache entry holding one quarter's tables (e.g. 2024Q1_<fingerprint>)
+    """
+    return f"{quarter}_{fingerprint}"
+
+
+def get_cached_table_path(entry_dir: Path, name: str) -> Path:
+    """
+    Get the path of a table inside a cache entry (e.g. data/cache/<key>/drug.feather)
+    """
+    return Path(entry_dir) / f"{name}.feather"
+
+
+def is_cache_entry_complete(entry_dir: Path, table_names: List[str]) -> bool:
+    """
+    Check if every table has been written to the cache entry
+    """
+    return all(get_cached_table_path(entry_dir, name).exists() for name in table_names)
+
+
+def write_cache_entry(entry_dir: Path, tables: Dict[str, pd.DataFrame]) -> None:
+    """
+    Write tables to a cache entry as uncompressed Feather files so they can be
+    memory-mapped. Each file is written under a temporary name and renamed into
+    place once complete, so readers never see a half-written table. Tables already
+    in the entry that aren't in tables are kept.
+    Args:
+        entry_dir: Path of the cache entry directory
+        tables: dict of table name -> DataFrame
+    """
+    entry_dir = Path(entry_dir)
+    entry_dir.mkdir(parents=True, exist_ok=True)
+    for name, df in tables.items():
+        path = get_cached_table_path(entry_dir, name)
+        tmp_path = entry_dir / f".{path.name}.{uuid.uuid4().hex}.tmp"
+        try:
+            feather.write_feather(df, tmp_path, compression="uncompressed")
+            os.replace(tmp_path, path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+    Path(entry_dir, LAST_ACCESS_FILE).touch()
+    logger.info(f"Wrote {list(tables)} to cache entry {entry_dir}")
+
+
+def read_cached_table(
+    entry_dir: Path, name: str, columns: Optional[List[str]] = None
+) -> pd.DataFrame:
+    """
+    Read a table from a cache entry through a memory map.
+    Args:
+        entry_dir: Path of the cache entry directory
+        name: table name (e.g. "drug")
+        columns: only read these columns (all columns if None)
+    """
+    path = get_cached_table_path(entry_dir, name)
+    logger.debug(f"Reading cached {name} from {path}")
+    return feather.read_table(path, columns=columns, memory_map=True).to_pandas()
+
+
+class CacheManager:
+    """
+    Manages the entries of a cache directory. Tables are written atomically, an
+    entry's last access time is recorded whenever it is read, and the least recently
+    used entries are evicted once the directory grows past max_bytes.
+
+    Args:
+        cache_dir: Path (e.g. data/cache)
+        max_bytes: int (byte budget for the whole directory, None for no limit)
+    """
+
+    def __init__(self, cache_dir: Path = Path("data/cache"), max_bytes: Optional[int] = None):
+        self.cache_dir = Path(cache_dir)
+        self.max_bytes = max_bytes
+
+    def entry_dir(self, key: str) -> Path:
+        """
+        Get the directory of a cache entry
+        """
+        return self.cache_dir / key
+
+    def has_entry(self, key: str, table_names: List[str]) -> bool:
+        """
+        Check if the entry exists and holds every table
+        """
+        return is_cache_entry_complete(self.entry_dir(key), table_names)
+
+    def write(self, key: str, tables: Dict[str, pd.DataFrame]) -> Path:
+        """
+        Atomically write tables to an entry, then evict other entries if over budget
+        """
+        write_cache_entry(self.entry_dir(key), tables)
+        self.evict(protect=[key])
+        return self.entry_dir(key)
+
+    def read_table(
+        self, key: str, name: str, columns: Optional[List[str]] = None
+    ) -> pd.DataFrame:
+        """
+        Read a table from an entry and record the access
+        """
+        self.touch(key)
+        return read_cached_table(self.entry_dir(key), name, columns)
+
+    def touch(self, key: str) -> None:
+        """
+        Record that an entry was just used
+        """
+        entry_dir = self.entry_dir(key)
+        if entry_dir.exists():
+            Path(entry_dir, LAST_ACCESS_FILE).touch()
+
+    def list_entries(self) -> pd.DataFrame:
+        """
+        List the cache entries with their size and last access time, least recently used first
+        """
+        entries = []
+        if self.cache_dir.exists():
+            for entry_dir in self.cache_dir.iterdir():
+                # Skip in-progress writes and files that aren't entries
+                if not entry_dir.is_dir() or entry_dir.name.startswith("."):
+                    continue
+                files = [f for f in entry_dir.rglob("*") if f.is_file()]
+                marker = Path(entry_dir, LAST_ACCESS_FILE)
+                last_access = (marker if marker.exists() else entry_dir).stat().st_mtime
+                entries.append(
+                    {
+                        "key": entry_dir.name,
+                        "size_bytes": sum(f.stat().st_size for f in files),
+                        "last_access": pd.Timestamp(last_access, unit="s"),
+                    }
+                )
+        return (
+            pd.DataFrame(entries, columns=["key", "size_bytes", "last_access"])
+            .sort_values("last_access")
+            .reset_index(drop=True)
+        )
+
+    def size(self) -> int:
+        """
+        Total size of the cache entries in bytes
+        """
+        return int(self.list_entries()["size_bytes"].sum())
+
+    def evict(self, protect: Iterable[str] = ()) -> List[str]:
+        """
+        Remove least recently used entries until the cache fits in max_bytes.
+        Args:
+            protect: keys that must not be evicted (e.g. entries in use)
+        Returns:
+            keys of the evicted entries
+        """
+        if self.max_bytes is None:
+            return []
+        protect = set(protect)
+        entries = self.list_entries()
+        total = entries["size_bytes"].sum()
+        evicted = []
+        for entry in entries.itertuples():
+            if total <= self.max_bytes:
+                break
+            if entry.key in protect:
+                continue
+            self._remove(entry.key)
+            total -= entry.size_bytes
+            evicted.append(entry.key)
+        if evicted:
+            logger.info(f"Evicted {len(evicted)} cache entries to fit in {self.max_bytes} bytes")
+        return evicted
+
+    def purge(self, keys: Optional[Iterable[str]] = None) -> List[str]:
+        """
+        Remove the given entries, or every entry if keys is None
+        Returns:
+            keys of the removed entries
+        """
+        if keys is None:
+            keys = self.list_entries()["key"].tolist()
+        removed = []
+        for key in keys:
+            if self.entry_dir(key).exists():
+                self._remove(key)
+                removed.append(key)
+        return removed
+
+    def remove_stale_shards(self, quarter: str, fingerprint: str) -> None:
+        """
+        Remove the shards of a quarter that were built from other source files or an
+        older preprocessing version
+        """
+        current = get_shard_key(quarter, fingerprint)
+        for entry_dir in self.cache_dir.glob(f"{quarter}_*"):
+            if entry_dir.name != current and entry_dir.is_dir():
+                logger.info(f"Removing stale cache shard {entry_dir}")
+                self._remove(entry_dir.name)
+
+    def _remove(self, key: str) -> None:
+        # Rename first so concurrent readers never see a partially deleted entry
+        entry_dir = self.entry_dir(key)
+        trash_dir = entry_dir.with_name(f".{key}.{time.time_ns()}.old")
+        try:
+            entry_dir.rename(trash_dir)
+        except OSError:
+            return
+        shutil.rmtree(trash_dir, ignore_errors=True)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(prog="python -m src.cache")
+    p.add_argument("--cache-dir", type=Path, default=Path("data/cache"))
+    sub = p.add_subparsers(dest="cmd", required=True)
+
+    sub.add_parser("list", help="List entries, least recently used first")
+    sub.add_parser("size", help="Print the total cache size in bytes")
+
+    e = sub.add_parser("evict", help="Evict least recently used entries down to a budget")
+    e.add_argument("--max-bytes", type=float, required=True)
+
+    pg = sub.add_parser("purge", help="Remove the given entries, or all entries")
+    pg.add_argument("keys", nargs="*")
+    return p
+
+
+def main():
+    args = build_parser().parse_args()
+    if args.cmd == "list":
+        manager = CacheManager(args.cache_dir)
+        print(manager.list_entries().to_string(index=False))
+    elif args.cmd == "size":
+        print(CacheManager(args.cache_dir).size())
+    elif args.cmd == "evict":
+        manager = CacheManager(args.cache_dir, max_bytes=int(args.max_bytes))
+        for key in manager.evict():
+            print(f"Evicted {key}")
+    elif args.cmd == "purge":
+        manager = CacheManager(args.cache_dir)
+        for key in manager.purge(args.keys or None):
+            print(f"Removed {key}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,52 @@
 from src.utils import (
     get_available_downloaded_quarters,
     get_available_processed_quarters,
-    convert_quarter_file_str,
 )
+from src.utils.manifest import get_quarter_size
+from src.utils.quarter_archive import open_raw_table
 from src.aggregations import aggregate_faers_table
-import pickle
-import hashlib
-from typing import Optional
+from concurrent.futures import ProcessPoolExecutor
+from typing import BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, Union
 from src.parse_quarters import ParseQuarters
 import pandas as pd
 import numpy as np
+from pyarrow import csv as pa_csv
 from loguru import logger
 from pathlib import Path
+import hashlib
+import json
 from tqdm import tqdm
-from src.preprocessing import preprocess
+from src.preprocessing import preprocess, preprocess_chunks, CHUNKED_TYPES
+from src.deduplication import (
+    CaseDeduplicator,
+    DEDUP_COLUMNS,
+    VERSIONS_TABLE,
+    case_versions,
+    drop_superseded,
+)
+from src.vocabulary import (
+    decode_ids,
+    decode_table,
+    encode_table,
+    get_vocabulary_dir,
+    get_vocabulary_epoch,
+)
+from src.incidence import FAERSIncidence
+from src.outcomes import decode_outcomes
+from src.schemas import TABLE_SCHEMAS, FAERS_DELIMITER, FAERS_ENCODING
+from src.cache import (
+    CacheManager,
+    get_shard_key,
+    quarter_fingerprint,
+    write_cache_entry,
+)
+from src.processed_store import (
+    get_processed_epoch,
+    is_quarter_processed,
+    read_processed_quarter,
+    write_processed_quarter,
+    write_processed_table,
+)
 from dataclasses import dataclass
 from functools import cached_property
 
@@ -22,10 +55,29 @@ import warnings
 
 warnings.filterwarnings("ignore")
 
+# Order of the tables returned by load_single_quarter
+TABLE_NAMES = ["reac", "drug", "demo", "outc", "ther", "indi", "rpsr"]
+
+# Tables written to the processed store for every quarter: the preprocessed tables
+# and the case versions used to deduplicate them (see src/deduplication.py)
+STORED_TABLES = TABLE_NAMES + [VERSIONS_TABLE]
+
+# CSV engines supported by read_raw_table
+CSV_ENGINES = ["c", "pyarrow"]
+
+# Strings pandas' C engine reads as missing, so the pyarrow engine matches it
+NA_VALUES = [
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan", "1.#IND",
+    "1.#QNAN", "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a", "nan", "null",
+]
+
 @dataclass
 class FAERSData:
     """
     Class to hold the FAERS dataframes with caching capabilities.
+
+    A FAERSData built by FAERSDataLoader is lazy: each table is read, from the
+    cache shards or the quarters, the first time its attribute is accessed.
     
     Attributes:
         reac_data (pd.DataFrame): DataFrame containing reaction data
@@ -34,6 +86,7 @@ class FAERSData:
         outc_data (pd.DataFrame): DataFrame containing outcome data
         ther_data (pd.DataFrame): DataFrame containing therapy data
         indi_data (pd.DataFrame): DataFrame containing indication data
+        rpsr_data (pd.DataFrame): DataFrame containing reporter data
     """
     reac_data: pd.DataFrame
     drug_data: pd.DataFrame
@@ -43,27 +96,59 @@ class FAERSData:
     indi_data: pd.DataFrame
     rpsr_data: pd.DataFrame
     
-    def save_to_cache(self, cache_path: Path) -> None:
-        """Save the FAERSData object to cache"""
-        cache_path.parent.mkdir(parents=True, exist_ok=True)
-        with open(cache_path, 'wb') as f:
-            pickle.dump(self, f)
-    
     @classmethod
-    def load_from_cache(cls, cache_path: Path) -> Optional['FAERSData']:
-        """Load FAERSData object from cache if it exists"""
-        try:
-            if cache_path.exists():
-                with open(cache_path, 'rb') as f:
-                    return pickle.load(f)
-        except Exception as e:
-            logger.warning(f"Failed to load cache: {e}")
-        return None
+    def lazy(cls, load_table: Callable[[str], pd.DataFrame]) -> 'FAERSData':
+        """
+        Create a FAERSData whose tables are loaded by load_table(name) (e.g. "drug")
+        on first access instead of up front
+        """
+        data = cls.__new__(cls)
+        data._load_table = load_table
+        return data
+
+    def __getattr__(self, attr: str):
+        # Only reached when the attribute isn't set yet, i.e. for unloaded tables of a lazy FAERSData
+        name = attr[: -len("_data")]
+        if attr.endswith("_data") and name in TABLE_NAMES and "_load_table" in self.__dict__:
+            table = self._load_table(name)
+            setattr(self, attr, table)
+            return table
+        raise AttributeError(f"'{type(self).__name__}' object has no attribute '{attr}'")
+
+    @cached_property
+    def incidence(self) -> FAERSIncidence:
+        """
+        Sparse report x PT, report x drug and report x indication matrices (see
+        src/incidence.py). Read from the loader's cache entry if it has one, otherwise
+        built from reac_data, drug_data and indi_data (and cached if possible).
+        """
+        incidence_dir = self.__dict__.get("_incidence_dir")
+        incidence = FAERSIncidence.load(incidence_dir) if incidence_dir else None
+        if incidence is None:
+            incidence = FAERSIncidence.build(self.reac_data, self.drug_data, self.indi_data)
+            if incidence_dir:
+                try:
+                    incidence.save(incidence_dir)
+                except OSError as e:
+                    logger.warning(f"Failed to cache the incidence matrices: {e}")
+        return incidence
+
+    @cached_property
+    def outcomes(self) -> pd.DataFrame:
+        """
+        outc_data with its bitmasks decoded to outc_cod and outc_label lists of codes
+        and labels, as outc_data held them before outc_mask (see src/outcomes.py)
+        """
+        return decode_outcomes(self.outc_data)
 
     @cached_property
     def merged(self):
         """
         Merge the data for the given start and end years and quarters.
+
+        One row per drug row, with the report's demo fields, its outc_mask and lists
+        of its PTs (pt), reporter codes (rpsr_cod) and therapy start dates (start_dt).
+        The lists are pyarrow list columns (see src/aggregations.py).
         """
         # === Load Data ===
         logger.info(f"Merging dataframes")
@@ -83,6 +168,8 @@ class FAERSData:
         # === Merge outcome_data ===
         logger.debug(f"Merging with outcome_data")
         merged = merged.merge(self.outc_data, on=["primaryid", "caseid"], how="left")
+        # Reports without an outcome row have no outcomes
+        merged["outc_mask"] = merged["outc_mask"].fillna(0).astype("uint8")
 
         # === Merge and aggregate rpsr_data ===
         logger.debug(f"Merging with rpsr_data")
@@ -102,6 +189,25 @@ class FAERSDataLoader:
     """
     Loads the FAERS data for the given start and end years and quarters.
 
+    The returned FAERSData is lazy: a table is only read, from the cache or from
+    the quarters themselves, the first time it is accessed. Use tables to restrict
+    which tables can be loaded at all, and columns to project them.
+
+    With use_cache, every quarter is cached as its own shard in data/cache keyed by
+    the quarter's fingerprint (its source files and the preprocessing version). The
+    requested range is assembled from the shards, and only missing or stale quarters
+    are rebuilt. Set cache_max_bytes to evict least recently used shards once the
+    cache directory grows past that size. A shard evicted before one of its tables
+    was read (e.g. by a later loader) is rebuilt when the table is accessed.
+
+    With deduplicate, only the latest version of every case across the whole range is
+    kept (see src/deduplication.py): the reports it supersedes, in the same quarter or
+    a later one, are dropped from every table, including the ones loaded lazily. It's
+    off by default since it changes every downstream count.
+
+    Drug names and PTs are stored as ids into the shared vocabulary (see
+    src/vocabulary.py) and returned as categoricals over it.
+
     Args:
         save_dir: str
         start_year: int
@@ -110,6 +216,14 @@ class FAERSDataLoader:
         end_quarter: int
         debug: bool
         use_cache: bool
+        max_workers: int (number of processes used to load quarters, 1 loads serially)
+        use_processed: bool (read/write the data/processed_faers columnar store)
+        engine: str (CSV engine for raw TXT files, "c" or "pyarrow")
+        chunksize: int (rows per chunk when streaming the DRUG and REAC files, None reads them whole)
+        cache_max_bytes: int (byte budget for data/cache, None for no limit)
+        tables: List[str] (tables to load, e.g. ["drug", "demo"], None for all)
+        columns: Dict[str, List[str]] (columns to keep per table, e.g. {"demo": ["primaryid", "age"]})
+        deduplicate: bool (keep only the latest version of each case, within and across quarters)
     """
 
     def __init__(
@@ -121,17 +235,43 @@ class FAERSDataLoader:
         save_dir: str = "data",
         debug: bool = False,
         use_cache: bool = True,
+        max_workers: int = 1,
+        use_processed: bool = True,
+        engine: str = "c",
+        chunksize: Optional[int] = None,
+        cache_max_bytes: Optional[int] = None,
+        tables: Optional[List[str]] = None,
+        columns: Optional[Dict[str, List[str]]] = None,
+        deduplicate: bool = False,
     ):
         self.save_dir = save_dir
         self.use_cache = use_cache
+        self.max_workers = max_workers
+        self.use_processed = use_processed
+        self.engine = engine
+        self.chunksize = chunksize
+        self.tables = TABLE_NAMES if tables is None else tables
+        self.columns = columns or {}
+        self.deduplicate = deduplicate
+        # Deduplication needs the case versions of every quarter
+        self.shard_tables = self.tables + [VERSIONS_TABLE] if deduplicate else self.tables
         self.cache_dir = Path(save_dir) / "cache"
+        self.cache = CacheManager(self.cache_dir, max_bytes=cache_max_bytes)
         self.available_downloaded_quarters = get_available_downloaded_quarters(save_dir)
 
+        invalid_tables = [name for name in self.tables if name not in TABLE_NAMES]
+        if invalid_tables:
+            logger.error(f"Invalid tables: {invalid_tables}. Must be in {TABLE_NAMES}")
+            raise ValueError(f"Invalid tables: {invalid_tables}. Must be in {TABLE_NAMES}")
+
         # Parse the quarters and make sure they are available locally
         self.parsed_quarters = ParseQuarters(
             start_year, end_year, start_quarter, end_quarter
         )
-        self.parsed_quarters.check_available_downloaded(save_dir)
+        if use_processed:
+            self.parsed_quarters.check_available_local(save_dir)
+        else:
+            self.parsed_quarters.check_available_downloaded(save_dir)
         self.parsed_quarters = self.parsed_quarters.get_quarters()
 
         # Initialize dataframes
@@ -142,14 +282,14 @@ class FAERSDataLoader:
         self.ther_data = pd.DataFrame()
         self.indi_data = pd.DataFrame()
         self.rpsr_data = pd.DataFrame()
+        self.shard_keys: Optional[List[str]] = None
+        self.shard_quarters: Dict[str, str] = {}
+        self._superseded: Optional[np.ndarray] = None
 
-        # Generate cache key based on quarters
-        self.cache_key = self._generate_cache_key()
-        self.cache_path = self.cache_dir / f"{self.cache_key}.pkl"
-        
-        # Try loading from cache first, then fall back to loading quarters
-        if not self._load_from_cache():
-            self.load_quarters()
+        # Build any missing cache shards up front, tables are read lazily either way
+        if self.use_cache:
+            self._build_cache_shards()
+        self.data = self._with_incidence_dir(FAERSData.lazy(self.load_table))
 
     def load_single_quarter(self, quarter: str):
         """
@@ -157,81 +297,259 @@ class FAERSDataLoader:
         Args:
             quarter: str (e.g. "2024Q1")
         """
-        return load_single_quarter(quarter, self.save_dir)
+        return load_single_quarter(
+            quarter, self.save_dir, self.use_processed, self.engine, self.chunksize
+        )
+
+    def iter_quarters(
+        self, quarters: List[str], tables: Optional[List[str]] = None
+    ) -> Iterator[Tuple[str, Dict[str, pd.DataFrame]]]:
+        """
+        Load the given tables of the given quarters, yielding (quarter, tables) in
+        quarter order.
+
+        Quarters are loaded serially when max_workers is 1 and across a process pool
+        otherwise. The pool is given the largest quarters first (by their size in the
+        manifest) so a big quarter doesn't start last and hold up the whole load.
+        """
+        tables = self.tables if tables is None else tables
+        if self.max_workers > 1:
+            logger.info(f"Loading {len(quarters)} quarters with {self.max_workers} workers")
+            by_size = sorted(
+                quarters, key=lambda q: get_quarter_size(q, self.save_dir), reverse=True
+            )
+            with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+                futures = {
+                    quarter: executor.submit(
+                        load_quarter_tables,
+                        quarter,
+                        self.save_dir,
+                        tables,
+                        self.use_processed,
+                        self.engine,
+                        self.chunksize,
+                    )
+                    for quarter in by_size
+                }
+                # Results are still yielded in quarter order, so the output does not
+                # depend on which quarter finishes first
+                for quarter in tqdm(quarters, desc="Loading quarters"):
+                    yield quarter, futures[quarter].result()
+        else:
+            for quarter in tqdm(quarters, desc="Loading quarters"):
+                logger.info(f"Loading quarter: {quarter}")
+                yield quarter, load_quarter_tables(
+                    quarter,
+                    self.save_dir,
+                    tables,
+                    self.use_processed,
+                    self.engine,
+                    self.chunksize,
+                )
 
     def load_quarters(self) -> None:
         """
-        Load the data for the given start and end years and quarters.
-        """
-        for quarter in tqdm(self.parsed_quarters, desc="Loading quarters"):
-            logger.info(f"Loading quarter: {quarter}")
-            reac, drug, demo, outc, ther, indi, rpsr = self.load_single_quarter(quarter)
-            self.reac_data = pd.concat([self.reac_data, reac])
-            self.drug_data = pd.concat([self.drug_data, drug])
-            self.demo_data = pd.concat([self.demo_data, demo])
-            self.outc_data = pd.concat([self.outc_data, outc])
-            self.ther_data = pd.concat([self.ther_data, ther])
-            self.indi_data = pd.concat([self.indi_data, indi])
-            self.rpsr_data = pd.concat([self.rpsr_data, rpsr])
-    
+        Eagerly load the selected tables for the given start and end years and quarters.
+
+        The per-quarter results are kept in quarter order and each table is
+        concatenated once at the end.
+        """
+        results = []
+        versions = []
+        for _, loaded in self.iter_quarters(self.parsed_quarters, self.shard_tables):
+            results.append(tuple(loaded[name] for name in self.tables))
+            if self.deduplicate:
+                versions.append(loaded[VERSIONS_TABLE])
+        if self.deduplicate and self._superseded is None:
+            self._deduplicate_quarters(versions)
+        for name, table in zip(self.tables, concat_quarter_tables(results, self.tables)):
+            if self.deduplicate:
+                table = drop_superseded(table, self.superseded_primaryids)
+            table = decode_table(self._select_columns(name, table), name, self.save_dir)
+            setattr(self, f"{name}_data", table)
+        self.data = self._with_incidence_dir(
+            FAERSData(
+                **{f"{name}_data": getattr(self, f"{name}_data") for name in TABLE_NAMES}
+            )
+        )
+
+    def load_table(self, name: str) -> pd.DataFrame:
+        """
+        Load one table across all the quarters, from the cache shards if use_cache is
+        set and from the processed store / raw files otherwise. Tables that weren't
+        selected are returned empty.
+        Args:
+            name: str (e.g. "drug")
+        """
+        if name not in self.tables:
+            logger.warning(f"Table {name} was not selected when loading, returning an empty DataFrame")
+            return pd.DataFrame()
+
+        columns = self.columns.get(name)
+        if self.shard_keys is not None:
+            read_columns = columns
+            # The anti-join needs primaryid even if it isn't one of the selected columns
+            if self.deduplicate and columns is not None and "primaryid" not in columns:
+                read_columns = ["primaryid"] + columns
+            df = pd.concat(
+                [self.read_shard_table(key, name, read_columns) for key in self.shard_keys]
+            )
+        else:
+            df = pd.concat(
+                [loaded[name] for _, loaded in self.iter_quarters(self.parsed_quarters, [name])]
+            )
+        if self.deduplicate:
+            df = drop_superseded(df, self.superseded_primaryids)
+        return decode_table(self._select_columns(name, df), name, self.save_dir)
+
+    @property
+    def superseded_primaryids(self) -> np.ndarray:
+        """
+        primaryids of the reports superseded by a later version of their case anywhere
+        in the range. Worked out from the versions tables the first time it's needed.
+        """
+        if self._superseded is None:
+            if self.shard_keys is not None:
+                version_frames = (
+                    self.read_shard_table(key, VERSIONS_TABLE) for key in self.shard_keys
+                )
+            else:
+                version_frames = (
+                    loaded[VERSIONS_TABLE]
+                    for _, loaded in self.iter_quarters(self.parsed_quarters, [VERSIONS_TABLE])
+                )
+            self._deduplicate_quarters(version_frames)
+        return self._superseded
+
+    def _deduplicate_quarters(self, version_frames: Iterable[pd.DataFrame]) -> None:
+        """
+        Feed the versions table of each quarter, in quarter order, to a CaseDeduplicator
+        """
+        deduplicator = CaseDeduplicator()
+        for versions in version_frames:
+            deduplicator.add(versions[DEDUP_COLUMNS])
+        self._superseded = deduplicator.superseded
+        logger.info(
+            f"Dropping {len(self._superseded)} reports superseded by a later version of their case"
+        )
+
+    def read_shard_table(
+        self, key: str, name: str, columns: Optional[List[str]] = None
+    ) -> pd.DataFrame:
+        """
+        Read a table from a cache shard. Another loader (or python -m src.cache) may
+        have evicted the shard since this loader built it, e.g. before a lazy table
+        was first accessed, in which case the quarter's table is rebuilt and written
+        back to the shard.
+        Args:
+            key: str (shard key, e.g. 2024Q1_<fingerprint>)
+            name: str (e.g. "drug")
+            columns: only read these columns (all columns if None)
+        """
+        try:
+            return self.cache.read_table(key, name, columns)
+        except FileNotFoundError:
+            pass
+        quarter = self.shard_quarters[key]
+        logger.warning(f"Cache shard {key} no longer has {name}, rebuilding it from {quarter}")
+        loaded = load_quarter_tables(
+            quarter, self.save_dir, [name], self.use_processed, self.engine, self.chunksize
+        )
+        # Only write it back if the quarter's source files haven't changed since
+        if get_shard_key(quarter, quarter_fingerprint(quarter, self.save_dir)) == key:
+            self.cache.write(key, loaded)
+        df = loaded[name]
+        return df if columns is None else df[columns]
+
+    def _with_incidence_dir(self, data: FAERSData) -> FAERSData:
+        """
+        Point data's incidence matrices at this selection's cache entry, so they're
+        read from and saved to the cache whichever path built data
+        """
+        if self.shard_keys is not None:
+            data._incidence_dir = self.cache.entry_dir(self._incidence_key())
+        return data
+
+    def _incidence_key(self) -> str:
+        """
+        Key of the cache entry holding the incidence matrices of this range and selection
+        """
+        selection = {
+            "shards": self.shard_keys,
+            "deduplicate": self.deduplicate,
+            "tables": {
+                name: self.columns.get(name) if name in self.tables else False
+                for name in ("reac", "drug", "indi")
+            },
+        }
+        digest = hashlib.md5(json.dumps(selection, sort_keys=True).encode()).hexdigest()
+        return f"incidence_{digest}"
+
+    def decode(self, ids, vocabulary: str) -> pd.Series:
+        """
+        Decode vocabulary ids, e.g. from a table returned by load_single_quarter or
+        read from the processed store, whose names are still encoded.
+        Args:
+            ids: array-like of ids
+            vocabulary: str ("drug" or "pt")
+        """
+        return decode_ids(ids, vocabulary, self.save_dir)
+
+    def _select_columns(self, name: str, df: pd.DataFrame) -> pd.DataFrame:
+        columns = self.columns.get(name)
+        return df if columns is None else df[columns]
+
     def get_data_dict(self):
         """
         Get the data for the given start and end years and quarters.
         """
-        return {
-            "reac": self.reac_data,
-            "drug": self.drug_data,
-            "demo": self.demo_data,
-            "outc": self.outc_data,
-            "ther": self.ther_data,
-            "indi": self.indi_data,
-            "rpsr": self.rpsr_data,
+        return {name: getattr(self.data, f"{name}_data") for name in self.tables}
+
+    def _build_cache_shards(self) -> None:
+        """
+        Build the selected tables of cache shards that are missing or stale, so the
+        requested range can be read from the shards
+        """
+        fingerprints = {
+            quarter: quarter_fingerprint(quarter, self.save_dir)
+            for quarter in self.parsed_quarters
         }
-    
-    def _generate_cache_key(self) -> str:
-        """Generate a unique cache key based on the quarters being loaded"""
-        quarters_str = ",".join(sorted(self.parsed_quarters))
-        return hashlib.md5(quarters_str.encode()).hexdigest()
-    
-    def _load_from_cache(self) -> bool:
-        """Attempt to load data from cache"""
-        if not self.use_cache:
-            return False
-            
-        logger.info(f"Checking cache at {self.cache_path}")
-        cached_data = FAERSData.load_from_cache(self.cache_path)
-        
-        if cached_data is not None:
-            logger.info("Found cached data")
-            self.reac_data = cached_data.reac_data
-            self.drug_data = cached_data.drug_data
-            self.demo_data = cached_data.demo_data
-            self.outc_data = cached_data.outc_data
-            self.ther_data = cached_data.ther_data
-            self.indi_data = cached_data.indi_data
-            self.rpsr_data = cached_data.rpsr_data
-            return True
-        
-        logger.info("No cached data found")
-        return False
+        shard_keys = {
+            quarter: get_shard_key(quarter, fingerprint)
+            for quarter, fingerprint in fingerprints.items()
+        }
+        missing_quarters = [
+            quarter
+            for quarter, key in shard_keys.items()
+            if not self.cache.has_entry(key, self.shard_tables)
+        ]
+        logger.info(
+            f"Found {len(self.parsed_quarters) - len(missing_quarters)} of {len(self.parsed_quarters)} quarters in cache at {self.cache_dir}"
+        )
+
+        # Only rebuild the tables the shards are missing
+        missing_tables = [
+            name
+            for name in self.shard_tables
+            if any(not self.cache.has_entry(shard_keys[q], [name]) for q in missing_quarters)
+        ]
+        for quarter, loaded in self.iter_quarters(missing_quarters, missing_tables):
+            self.cache.remove_stale_shards(quarter, fingerprints[quarter])
+            write_cache_entry(self.cache.entry_dir(shard_keys[quarter]), loaded)
+
+        # Record the access before evicting so the shards in use are the most recent
+        self.shard_keys = list(shard_keys.values())
+        self.shard_quarters = {key: quarter for quarter, key in shard_keys.items()}
+        for key in self.shard_keys:
+            self.cache.touch(key)
+        self.cache.evict(protect=self.shard_keys)
 
     def get_data(self):
-        faers_data = FAERSData(
-            reac_data=self.reac_data,
-            drug_data=self.drug_data,
-            demo_data=self.demo_data,
-            outc_data=self.outc_data,
-            ther_data=self.ther_data,
-            indi_data=self.indi_data,
-            rpsr_data=self.rpsr_data,
-        )
-        
-        # Save to cache if enabled
-        if self.use_cache:
-            logger.info(f"Saving data to cache at {self.cache_path}")
-            faers_data.save_to_cache(self.cache_path)
-            
-        return faers_data
+        """
+        Get the FAERSData for the given start and end years and quarters. Its tables are
+        loaded on first access unless load_quarters was called.
+        """
+        return self.data
 
     def help(self):
         """
@@ -248,92 +566,310 @@ class FAERSDataLoader:
             f"loader.get_data() # Returns the reac, drug, demo, outc, ther, indi dataframes"
         )
 
-def load_single_quarter(quarter: str, save_dir: str):
+def concat_quarter_tables(
+    results: List[Tuple[pd.DataFrame, ...]], table_names: List[str] = TABLE_NAMES
+) -> List[pd.DataFrame]:
+    """
+    Concatenate the per-quarter results of load_single_quarter table by table.
+    Args:
+        results: list of (reac, drug, demo, outc, ther, indi, rpsr) tuples, in quarter order
+        table_names: the tables in each tuple, if not all of them
+    Returns:
+        list of the concatenated tables, in the same order as table_names
+    """
+    if not results:
+        return [pd.DataFrame() for _ in table_names]
+    return [pd.concat(list(tables)) for tables in zip(*results)]
+
+def read_raw_table(
+    file_path: Union[Path, BinaryIO], table: str, engine: str = "c"
+) -> pd.DataFrame:
+    """
+    Parse a raw $-delimited FAERS table, keeping only the columns declared in its
+    schema and parsing them with the schema dtypes.
+    Args:
+        file_path: path to the TXT file (e.g. data/faers_reports/2024Q1/DRUG24Q1.txt),
+            or a binary stream of it (e.g. a member of the quarter's archive)
+        table: str (e.g. "drug")
+        engine: str ("c" for pandas' C parser, "pyarrow" for the multithreaded Arrow parser)
+    """
+    if engine == "c":
+        return pd.read_csv(file_path, **TABLE_SCHEMAS[table].read_csv_kwargs())
+    elif engine == "pyarrow":
+        return read_raw_table_arrow(file_path, table)
+    else:
+        logger.error(f"Invalid engine: {engine}. Must be one of {CSV_ENGINES}")
+        raise ValueError(f"Invalid engine: {engine}. Must be one of {CSV_ENGINES}")
+
+def iter_raw_table(
+    file_path: Union[Path, BinaryIO], table: str, chunksize: int
+) -> Iterator[pd.DataFrame]:
+    """
+    Stream a raw $-delimited FAERS table in chunks of chunksize rows, with the same
+    column pruning and dtypes as read_raw_table. Always uses pandas' C parser.
+    Args:
+        file_path: path to the TXT file, or a binary stream of it
+        table: str (e.g. "drug")
+        chunksize: int (rows per chunk)
+    """
+    with pd.read_csv(
+        file_path, chunksize=chunksize, **TABLE_SCHEMAS[table].read_csv_kwargs()
+    ) as reader:
+        yield from reader
+
+def read_raw_table_arrow(file_path: Union[Path, BinaryIO], table: str) -> pd.DataFrame:
+    """
+    Parse a raw $-delimited FAERS table with pyarrow.csv.
+
+    The header is read separately so a trailing delimiter on every line (which adds
+    an empty, unnamed last column) parses cleanly. Rows whose field count still
+    doesn't match the header are skipped with a warning.
+    Args:
+        file_path: path to the TXT file, or a seekable binary stream of it
+        table: str (e.g. "drug")
+    """
+    schema = TABLE_SCHEMAS[table]
+    if isinstance(file_path, (str, Path)):
+        with open(file_path, "rb") as f:
+            header = f.readline()
+    else:
+        # Rewinding a zip member only re-inflates the header line
+        header = file_path.readline()
+        file_path.seek(0)
+    column_names = header.decode(FAERS_ENCODING).rstrip("\r\n").split(FAERS_DELIMITER)
+    # Give unnamed columns (e.g. from a trailing delimiter) a placeholder name
+    column_names = [name or f"_unnamed_{i}" for i, name in enumerate(column_names)]
+    include_columns = [name for name in column_names if name in schema.columns]
+
+    def skip_invalid_row(row) -> str:
+        logger.warning(
+            f"Skipping malformed row in {getattr(file_path, 'name', file_path)} (expected {row.expected_columns} fields, got {row.actual_columns}): {row.text[:100]}"
+        )
+        return "skip"
+
+    arrow_table = pa_csv.read_csv(
+        file_path,
+        read_options=pa_csv.ReadOptions(
+            column_names=column_names, skip_rows=1, encoding=FAERS_ENCODING
+        ),
+        parse_options=pa_csv.ParseOptions(
+            delimiter=FAERS_DELIMITER,
+            quote_char=False,
+            invalid_row_handler=skip_invalid_row,
+        ),
+        convert_options=pa_csv.ConvertOptions(
+            include_columns=include_columns,
+            null_values=NA_VALUES,
+            strings_can_be_null=True,
+        ),
+    )
+    df = arrow_table.to_pandas()
+    return df.astype({c: t for c, t in schema.dtypes.items() if c in df.columns})
+
+def load_single_quarter(
+    quarter: str,
+    save_dir: str,
+    use_processed: bool = True,
+    engine: str = "c",
+    chunksize: Optional[int] = None,
+):
         """
         Load the data for the given quarter.
+
+        When use_processed is set the quarter is read from the data/processed_faers
+        columnar store if it has been written there from the current raw files, and
+        the raw TXT files are only parsed (and the store written) when it hasn't.
         Args:
             quarter: str (e.g. "2024Q1")
             save_dir: str
+            use_processed: bool
+            engine: str (CSV engine for the raw TXT files, "c" or "pyarrow")
+            chunksize: int (stream the DRUG and REAC files in chunks of this many rows,
+                so peak memory is bounded by the chunk size rather than the file size)
+        Returns:
+            (reac, drug, demo, outc, ther, indi, rpsr) preprocessed DataFrames (names encoded, see src/vocabulary.py)
         """
-        if quarter not in get_available_downloaded_quarters(save_dir):
+        tables = load_quarter_tables(
+            quarter, save_dir, TABLE_NAMES, use_processed, engine, chunksize
+        )
+        return tuple(tables[name] for name in TABLE_NAMES)
+
+def load_quarter_tables(
+    quarter: str,
+    save_dir: str,
+    tables: Optional[List[str]] = None,
+    use_processed: bool = True,
+    engine: str = "c",
+    chunksize: Optional[int] = None,
+) -> Dict[str, pd.DataFrame]:
+    """
+    Load some of the tables of the given quarter. Takes the same options as
+    load_single_quarter; the processed store is only written when every table is loaded.
+    Args:
+        quarter: str (e.g. "2024Q1")
+        save_dir: str
+        tables: names of the tables to load (all of TABLE_NAMES if None), may include
+            VERSIONS_TABLE for the case versions of every raw demo row
+    Returns:
+        dict of table name -> preprocessed DataFrame (names encoded, see src/vocabulary.py)
+    """
+    tables = TABLE_NAMES if tables is None else tables
+
+    def read_raw(name: str) -> pd.DataFrame:
+        try:
+            with open_raw_table(quarter, name, save_dir) as f:
+                return read_raw_table(f, name, engine)
+        except FileNotFoundError:
+            logger.error(f"{name.upper()} file not found for quarter {quarter}")
+            return pd.DataFrame()
+
+    # A stored quarter is stale if the raw files or preprocessing have changed since
+    # it was written. Quarters without raw files can only come from the store.
+    downloaded = quarter in get_available_downloaded_quarters(save_dir)
+    fingerprint = quarter_fingerprint(quarter, save_dir) if downloaded else None
+    if use_processed and is_quarter_processed(
+        quarter, TABLE_NAMES, save_dir, fingerprint
+    ):
+        # The fingerprint of a downloaded quarter covers the vocabulary epoch. A
+        # quarter that's only in the store can't be rebuilt, so its ids must not be
+        # decoded against a different vocabulary
+        if not downloaded and get_processed_epoch(quarter, save_dir) != get_vocabulary_epoch(save_dir):
             logger.error(
-                f"Quarter {quarter} not found in {save_dir}/faers_reports"
+                f"Processed {quarter} was encoded with a different vocabulary than {get_vocabulary_dir(save_dir)} and has no raw files to rebuild it from"
             )
             raise ValueError(
-                f"Quarter {quarter} not found in {save_dir}/faers_reports"
+                f"Processed {quarter} was encoded with a different vocabulary than {get_vocabulary_dir(save_dir)} and has no raw files to rebuild it from"
             )
-
-        # Construct the file paths
-        reac_file_path = Path(save_dir).joinpath(
-            "faers_reports", quarter, f"REAC{convert_quarter_file_str(quarter)}.txt"
+        if is_quarter_processed(quarter, [VERSIONS_TABLE], save_dir):
+            return read_processed_quarter(quarter, tables, save_dir)
+        # Stored before the versions table existed
+        loaded = read_processed_quarter(
+            quarter, [name for name in tables if name != VERSIONS_TABLE], save_dir
         )
-        drug_file_path = Path(save_dir).joinpath(
-            "faers_reports", quarter, f"DRUG{convert_quarter_file_str(quarter)}.txt"
-        )
-        demo_file_path = Path(save_dir).joinpath(
-            "faers_reports", quarter, f"DEMO{convert_quarter_file_str(quarter)}.txt"
-        )
-        outc_file_path = Path(save_dir).joinpath(
-            "faers_reports", quarter, f"OUTC{convert_quarter_file_str(quarter)}.txt"
-        )
-        ther_file_path = Path(save_dir).joinpath(
-            "faers_reports", quarter, f"THER{convert_quarter_file_str(quarter)}.txt"
-        )
-        indi_file_path = Path(save_dir).joinpath(
-            "faers_reports", quarter, f"INDI{convert_quarter_file_str(quarter)}.txt"
+        if downloaded:
+            versions = case_versions(read_raw("demo"))
+            try:
+                write_processed_table(quarter, VERSIONS_TABLE, versions, save_dir)
+            except Exception as e:
+                logger.warning(f"Failed to add {VERSIONS_TABLE} to processed {quarter}: {e}")
+        elif VERSIONS_TABLE in tables:
+            # Without raw files, the preprocessed demo is the best approximation
+            logger.warning(
+                f"Processed {quarter} has no {VERSIONS_TABLE} table, deduplicating it from its preprocessed demo"
+            )
+            versions = case_versions(read_processed_quarter(quarter, ["demo"], save_dir)["demo"])
+        if VERSIONS_TABLE in tables:
+            loaded[VERSIONS_TABLE] = versions
+        return loaded
+
+    if not downloaded:
+        logger.error(
+            f"Quarter {quarter} not found in {save_dir}/faers_reports"
         )
-        rpsr_file_path = Path(save_dir).joinpath(
-            "faers_reports", quarter, f"RPSR{convert_quarter_file_str(quarter)}.txt"
+        raise ValueError(
+            f"Quarter {quarter} not found in {save_dir}/faers_reports"
         )
 
-        # Load the data
-        reac_raw = pd.DataFrame()
-        drug_raw = pd.DataFrame()
-        demo_raw = pd.DataFrame()
-        outc_raw = pd.DataFrame()
-        ther_raw = pd.DataFrame()
-        indi_raw = pd.DataFrame()
-        rpsr_raw = pd.DataFrame()
+    # Parse only the columns preprocess needs, with the compact dtypes from the schema.
+    # Archive-only quarters are streamed straight out of the zip.
+    loaded = {}
+    raw_demo = None
+    for name in tables:
+        if name == VERSIONS_TABLE:
+            continue
+        if chunksize and name in CHUNKED_TYPES:
+            if engine != "c":
+                logger.debug(f"Streaming {name.upper()} with the C engine")
+            try:
+                with open_raw_table(quarter, name, save_dir) as f:
+                    loaded[name] = encode_table(
+                        preprocess_chunks(iter_raw_table(f, name, chunksize), name, save_dir),
+                        name,
+                        save_dir,
+                    )
+                continue
+            except FileNotFoundError:
+                logger.error(f"{name.upper()} file not found for quarter {quarter}")
+                raw = pd.DataFrame()
+        else:
+            raw = read_raw(name)
+            if name == "demo":
+                raw_demo = raw
 
+        # Preprocess the data and encode its names with the shared vocabulary
+        loaded[name] = encode_table(preprocess(raw, name, save_dir), name, save_dir)
+
+    # The case versions come from the raw demo rows, before preprocessing drops any
+    if VERSIONS_TABLE in tables or raw_demo is not None:
+        loaded[VERSIONS_TABLE] = case_versions(read_raw("demo") if raw_demo is None else raw_demo)
+
+    if use_processed and set(STORED_TABLES) <= set(loaded):
         try:
-            reac_raw = pd.read_csv(reac_file_path, sep="$")
-        except FileNotFoundError:
-            logger.error(f"REAC file not found for quarter {quarter}")
-        try:
-            drug_raw = pd.read_csv(drug_file_path, sep="$")
-        except FileNotFoundError:
-            logger.error(f"DRUG file not found for quarter {quarter}")
-        try:
-            demo_raw = pd.read_csv(demo_file_path, sep="$")
-        except FileNotFoundError:
-            logger.error(f"DEMO file not found for quarter {quarter}")
-        try:
-            outc_raw = pd.read_csv(outc_file_path, sep="$")
-        except FileNotFoundError:
-            logger.error(f"OUTC file not found for quarter {quarter}")
-        try:
-            ther_raw = pd.read_csv(ther_file_path, sep="$")
-        except FileNotFoundError:
-            logger.error(f"THER file not found for quarter {quarter}")
-        try:
-            indi_raw = pd.read_csv(indi_file_path, sep="$")
-        except FileNotFoundError:
-            logger.error(f"INDI file not found for quarter {quarter}")
-        try:
-            rpsr_raw = pd.read_csv(rpsr_file_path, sep="$")
-        except FileNotFoundError:
-            logger.error(f"RPSR file not found for quarter {quarter}")
+            write_processed_quarter(quarter, loaded, save_dir, fingerprint=fingerprint)
+        except Exception as e:
+            logger.warning(f"Failed to write processed {quarter}: {e}")
+
+    return {name: loaded[name] for name in tables}
 
-        # Preprocess the data
-        reac = preprocess(reac_raw, "reac")
-        drug = preprocess(drug_raw, "drug")
-        demo = preprocess(demo_raw, "demo")
-        outc = preprocess(outc_raw, "outc")
-        ther = preprocess(ther_raw, "ther")
-        indi = preprocess(indi_raw, "indi")
-        rpsr = preprocess(rpsr_raw, "rpsr")
+def convert_faers_quarters(
+    start_year: int,
+    end_year: int,
+    start_quarter: int = 1,
+    end_quarter: int = 4,
+    save_dir: str = "data",
+    overwrite: bool = False,
+    engine: str = "c",
+    chunksize: Optional[int] = None,
+):
+    """
+    Parse and preprocess the raw TXT files of each quarter and write the results to
+    the data/processed_faers columnar store.
+    Args:
+        start_year: int
+        end_year: int
+        start_quarter: int = 1
+        end_quarter: int = 4
+        save_dir: str = "data"
+        overwrite: bool = False (rebuild quarters that are already in the store)
+        engine: str = "c" (CSV engine for the raw TXT files, "c" or "pyarrow")
+        chunksize: int = None (stream the DRUG and REAC files in chunks of this many rows)
+    """
+    parsed_quarters = ParseQuarters(start_year, end_year, start_quarter, end_quarter)
+    parsed_quarters.check_available_downloaded(save_dir)
 
-        return reac, drug, demo, outc, ther, indi, rpsr
+    for quarter in tqdm(parsed_quarters.get_quarters(), desc="Converting quarters"):
+        convert_quarter(quarter, save_dir, overwrite, engine, chunksize)
+
+def convert_quarter(
+    quarter: str,
+    save_dir: str = "data",
+    overwrite: bool = False,
+    engine: str = "c",
+    chunksize: Optional[int] = None,
+) -> bool:
+    """
+    Parse and preprocess the raw TXT files of a single quarter and write the results
+    to the data/processed_faers columnar store.
+    Args:
+        quarter: str (e.g. "2024Q1")
+        save_dir: str = "data"
+        overwrite: bool = False (rebuild the quarter if it's already in the store)
+        engine: str = "c" (CSV engine for the raw TXT files, "c" or "pyarrow")
+        chunksize: int = None (stream the DRUG and REAC files in chunks of this many rows)
+    Returns:
+        True if the quarter was converted, False if it was already up to date
+    """
+    fingerprint = quarter_fingerprint(quarter, save_dir)
+    if not overwrite and is_quarter_processed(
+        quarter, TABLE_NAMES, save_dir, fingerprint
+    ):
+        logger.info(f"Skipping {quarter} because it is already processed")
+        return False
+    tables = load_quarter_tables(
+        quarter, save_dir, STORED_TABLES, use_processed=False, engine=engine, chunksize=chunksize
+    )
+    write_processed_quarter(quarter, tables, save_dir, fingerprint=fingerprint)
+    return True
 
 def load_faers_data(
     start_year: int,
@@ -343,9 +879,27 @@ def load_faers_data(
     save_dir: str = "data",
     debug: bool = False,
     cache: bool = True,
+    max_workers: int = 1,
+    use_processed: bool = True,
+    engine: str = "c",
+    chunksize: Optional[int] = None,
+    tables: Optional[List[str]] = None,
+    columns: Optional[Dict[str, List[str]]] = None,
+    deduplicate: bool = False,
 ):
     """
     Load the FAERS data for the given start and end years and quarters.
+    Set max_workers > 1 to load the quarters in parallel across a process pool.
+    Quarters already in the data/processed_faers store are read from there, the
+    rest are parsed from the raw TXT files with the given CSV engine ("c" or "pyarrow").
+    Set chunksize to stream the DRUG and REAC files with bounded memory.
+
+    Tables are loaded lazily on first access. Pass tables (e.g. ["drug", "demo"]) to
+    only ever load those, and columns (e.g. {"demo": ["primaryid", "caseid", "age"]})
+    to keep only some of their columns.
+
+    Set deduplicate to keep only the latest version of every case, dropping the
+    reports of its earlier versions from every table.
     """
     loader = FAERSDataLoader(
         start_year=start_year,
@@ -355,5 +909,12 @@ def load_faers_data(
         save_dir=save_dir,
         debug=debug,
         use_cache=cache,
+        max_workers=max_workers,
+        use_processed=use_processed,
+        engine=engine,
+        chunksize=chunksize,
+        tables=tables,
+        columns=columns,
+        deduplicate=deduplicate,
     )
     return loader.get_data()
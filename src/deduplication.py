@@ -0,0 +1,172 @@
+"""
+Cross-quarter case deduplication.
+
+A FAERS case gets a new report (primaryid) every time it's followed up, and the
+follow-ups land in the same or later quarters. preprocess_demo_df only keeps the
+latest version of a case within one quarter (and drops reports without an age), and
+only from demo: the other tables still hold every version, and once several
+quarters are concatenated a case can appear once per quarter it was updated in.
+
+CaseDeduplicator keeps the latest version of every case across the quarters added
+to it (highest caseversion, then latest fda_dt, then highest primaryid) and collects
+the primaryids of the versions it superseded. Those are then removed from every
+table with a hash anti-join. Both steps are linear in the number of rows: each
+quarter is reduced to one version per case as it's added, and the quarters are
+reduced against each other in a single pass when the result is first read.
+
+The deduplicator is fed the versions table of each quarter: the DEDUP_COLUMNS of
+every raw demo row, before preprocessing filters any of them out, so versions
+dropped by preprocess_demo_df still count as superseded. It's stored next to the
+preprocessed tables in the processed store and the cache shards.
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+# Columns of demo that decide which version of a case is the latest, in priority order
+VERSION_COLUMNS = ["caseversion", "fda_dt", "primaryid"]
+
+# Columns of demo the deduplicator needs
+DEDUP_COLUMNS = ["primaryid", "caseid", "caseversion", "fda_dt"]
+
+# Name of the per-quarter table holding the DEDUP_COLUMNS of every raw demo row
+VERSIONS_TABLE = "versions"
+
+
+def case_versions(demo: pd.DataFrame) -> pd.DataFrame:
+    """
+    Get the versions table of a quarter from its raw (unfiltered) demo table
+    Returns:
+        pd.DataFrame (DEDUP_COLUMNS, one row per report)
+    """
+    if demo.empty:
+        return pd.DataFrame({column: pd.Series(dtype="int64") for column in DEDUP_COLUMNS})
+    return demo[DEDUP_COLUMNS].reset_index(drop=True)
+
+
+def is_latest_version(demo: pd.DataFrame) -> np.ndarray:
+    """
+    Mark the latest version of every case in demo, with hash groupbys rather than a
+    sort. Each pass keeps the rows holding their case's maximum of the next version
+    column, so exactly one row per case is left (primaryid is unique).
+
+    Until preprocess_demo_df used this, it kept the report with the latest fda_dt
+    (then the highest primaryid). The two only keep different reports for cases
+    whose highest caseversion doesn't also have their latest (fda_dt, primaryid),
+    e.g. a follow-up with an older receipt date than the report it replaces; those
+    now keep the follow-up. benchmarks/demo_dedup.py compares them.
+    Returns:
+        boolean mask aligned with the rows of demo
+    """
+    # Missing versions and dates lose to any known one
+    keys = demo[["caseid"] + VERSION_COLUMNS].fillna({"caseversion": -1, "fda_dt": -1})
+    mask = np.ones(len(keys), dtype=bool)
+    for column in VERSION_COLUMNS:
+        positions = np.flatnonzero(mask)
+        candidates = keys.iloc[positions]
+        best = candidates.groupby("caseid", sort=False)[column].transform("max")
+        mask[positions[(candidates[column] != best).to_numpy()]] = False
+    return mask
+
+
+def latest_per_case(demo: pd.DataFrame) -> pd.DataFrame:
+    """
+    Keep the latest version of every case in demo
+    Returns:
+        DataFrame indexed by caseid with the VERSION_COLUMNS of the latest version
+    """
+    latest = demo.loc[is_latest_version(demo), ["caseid"] + VERSION_COLUMNS]
+    latest = latest.fillna({"caseversion": -1, "fda_dt": -1})
+    return latest.set_index("caseid")
+
+
+class CaseDeduplicator:
+    """
+    Tracks the latest version of every case across quarters. Add the versions table
+    of each quarter (in any order), then drop the superseded reports from every table.
+    """
+
+    def __init__(self):
+        # Latest version of every case within each added quarter
+        self._latest: List[pd.DataFrame] = []
+        # Reports superseded within their own quarter
+        self._superseded: List[np.ndarray] = []
+        self._reduced: Optional[Tuple[np.ndarray, np.ndarray]] = None
+
+    def add(self, demo: pd.DataFrame) -> None:
+        """
+        Add the versions of a quarter (the DEDUP_COLUMNS of every one of its raw
+        demo rows, see case_versions) or any other set of reports
+        """
+        incoming = latest_per_case(demo).reset_index()
+        self._superseded.append(
+            np.setdiff1d(demo["primaryid"].to_numpy(), incoming["primaryid"].to_numpy())
+        )
+        self._latest.append(incoming)
+        self._reduced = None
+
+    def _reduce(self) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Reduce the quarters added so far against each other, once
+        Returns:
+            (primaryids of the latest versions, primaryids of the superseded ones)
+        """
+        if self._reduced is None:
+            if not self._latest:
+                empty = np.array([], dtype="int64")
+                return empty, empty
+            candidates = pd.concat(self._latest, ignore_index=True)
+            latest = is_latest_version(candidates)
+            primaryids = candidates["primaryid"].to_numpy()
+            superseded = np.concatenate(self._superseded + [primaryids[~latest]]).astype("int64")
+            # Later adds only have to be reduced against the latest versions
+            self._latest = [candidates[latest]]
+            self._superseded = [superseded]
+            self._reduced = (primaryids[latest].astype("int64"), superseded)
+        return self._reduced
+
+    @property
+    def superseded(self) -> np.ndarray:
+        """
+        primaryids of every report superseded so far
+        """
+        return self._reduce()[1]
+
+    def latest_primaryids(self) -> np.ndarray:
+        """
+        primaryids of the latest version of every case
+        """
+        return self._reduce()[0]
+
+
+def drop_superseded(table: pd.DataFrame, superseded: np.ndarray) -> pd.DataFrame:
+    """
+    Anti-join a table against the superseded primaryids
+    """
+    if len(superseded) == 0 or "primaryid" not in table.columns:
+        return table
+    return table[~table["primaryid"].isin(superseded)]
+
+
+def deduplicate_cases(tables: Dict[str, pd.DataFrame]) -> Dict[str, pd.DataFrame]:
+    """
+    Keep only the latest version of every case in a set of already assembled tables.
+    Args:
+        tables: dict of table name -> DataFrame, must include VERSIONS_TABLE (or
+            "demo", in which case reports preprocessing already dropped from it are
+            missed)
+    Returns:
+        dict of table name -> deduplicated DataFrame, without the versions table
+    """
+    deduplicator = CaseDeduplicator()
+    deduplicator.add(tables.get(VERSIONS_TABLE, tables.get("demo")))
+    superseded = deduplicator.superseded
+    logger.info(f"Dropping {len(superseded)} superseded case versions")
+    return {
+        name: drop_superseded(table, superseded)
+        for name, table in tables.items()
+        if name != VERSIONS_TABLE
+    }
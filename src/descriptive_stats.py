@@ -2,6 +2,7 @@
 from src.data_loader import FAERSData
 import pandas as pd
 from loguru import logger
+from src.outcomes import decode_outcome_labels
 
 def describe(data: pd.DataFrame | FAERSData, description_type: str):
     if description_type == 'age':
@@ -74,10 +75,12 @@ def describe_country(demo_df):
 
 def describe_severity(outc_df):
     try:
-        # Count outcomes
-        return outc_df['outc_labels'].value_counts(dropna=False).to_frame(name='count')
+        # Count each combination of outcomes, decoding only the distinct masks
+        counts = outc_df['outc_mask'].value_counts()
+        counts.index = decode_outcome_labels(counts.index.to_series()).str.join(', ').to_numpy()
+        return counts.to_frame(name='count')
     except KeyError:
-        logger.error("outc_labels column not found in dataset")
+        logger.error("outc_mask column not found in dataset")
 
 def describe_reporting_delay(demo_df):
     date_df = demo_df.copy()
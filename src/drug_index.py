@@ -0,0 +1,327 @@
+"""
+Trigram index over distinct drug names.
+
+filter_by_drug_name matches a query against the drugname, prod_ai, best_match_name
+and rxnorm_name columns with str.contains. Those columns are categoricals over the
+shared drug vocabulary (see src.vocabulary), so the query only has to be matched
+against the distinct names, and the matching rows are then found on the integer
+codes.
+
+DrugNameIndex maps every trigram (three consecutive characters) to the names that
+contain it. A literal query of three characters or more is only checked against the
+names that contain all of its trigrams. Shorter queries and regular expressions are
+matched against every distinct name, which is still far fewer strings than rows.
+
+The vocabulary is append-only, so the index grows with it: when a quarter adds
+names, only the new names are indexed.
+
+Batches of queries (e.g. a screening list of drugs) are matched with an
+Aho-Corasick automaton instead: every distinct name is read once and yields all the
+literal queries it contains, and the rows of each query are found with one sparse
+product per name column.
+"""
+
+import re
+from collections import defaultdict, deque
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+# Name columns of the drug table a query is matched against
+DRUG_NAME_COLUMNS = ["drugname", "prod_ai", "best_match_name", "rxnorm_name"]
+
+NGRAM = 3
+
+# Characters that make a query a regular expression rather than a literal
+REGEX_CHARACTERS = set(".^$*+?{}[]\\|()")
+
+
+def is_literal(pattern: str) -> bool:
+    """
+    Check whether str.contains would match the pattern as a plain substring
+    """
+    return not REGEX_CHARACTERS.intersection(pattern)
+
+
+def trigrams(value: str) -> set:
+    """
+    Distinct trigrams of a string
+    """
+    return {value[i : i + NGRAM] for i in range(len(value) - NGRAM + 1)}
+
+
+class DrugNameIndex:
+    """
+    Inverted index from trigrams to the positions of the names that contain them.
+
+    Args:
+        names: Iterable[str] (distinct names, e.g. the drug vocabulary)
+    """
+
+    def __init__(self, names: Iterable[str] = ()):
+        self.names: List[str] = []
+        self.postings: Dict[str, List[int]] = defaultdict(list)
+        self._arrays: Dict[str, np.ndarray] = {}
+        self._name_index = None
+        self._categories = None
+        self.extend(names)
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def extend(self, names: Iterable[str]) -> None:
+        """
+        Index more names. Their positions follow the names already indexed.
+        """
+        start = len(self.names)
+        for position, name in enumerate(names, start):
+            name = str(name)
+            self.names.append(name)
+            for gram in trigrams(name):
+                self.postings[gram].append(position)
+        # Posting arrays of grown lists are rebuilt on the next search
+        self._arrays.clear()
+        self._name_index = None
+
+    def update(self, categories: pd.Index) -> bool:
+        """
+        Index the names categories adds to the ones already indexed. Returns False
+        (and indexes nothing) if categories and the indexed names don't share a prefix,
+        i.e. they aren't two versions of the same vocabulary.
+        """
+        if categories is self._categories:
+            return True
+        if self._name_index is None:
+            self._name_index = pd.Index(self.names, dtype=object)
+        n = min(len(categories), len(self.names))
+        if not categories[:n].equals(self._name_index[:n]):
+            return False
+        if len(categories) > len(self.names):
+            self.extend(categories[n:])
+        self._categories = categories
+        return True
+
+    def _posting(self, gram: str) -> np.ndarray:
+        if gram not in self._arrays:
+            self._arrays[gram] = np.asarray(self.postings.get(gram, []), dtype=np.int64)
+        return self._arrays[gram]
+
+    def search(self, pattern: str) -> np.ndarray:
+        """
+        Positions of the names matching the pattern, with the semantics of
+        str.contains (case-sensitive, regular expression)
+        """
+        if not is_literal(pattern):
+            regex = re.compile(pattern)
+            return np.flatnonzero([regex.search(name) is not None for name in self.names])
+        if len(pattern) < NGRAM:
+            return np.flatnonzero([pattern in name for name in self.names])
+
+        # Intersect the posting lists, smallest first, then check the candidates
+        postings = sorted((self._posting(gram) for gram in trigrams(pattern)), key=len)
+        candidates = postings[0]
+        for posting in postings[1:]:
+            if not len(candidates):
+                break
+            candidates = np.intersect1d(candidates, posting, assume_unique=True)
+        return np.array(
+            [position for position in candidates if pattern in self.names[position]],
+            dtype=np.int64,
+        )
+
+
+# Index of the categories last searched, grown as the vocabulary grows
+_index = DrugNameIndex()
+
+
+def get_drug_index(categories: pd.Index) -> DrugNameIndex:
+    """
+    Get an index covering the given categories. The shared index is extended when the
+    categories extend it (the vocabulary gained names), reused when they're an older
+    version of it, and rebuilt otherwise.
+    """
+    global _index
+    if not _index.update(categories):
+        _index = DrugNameIndex(categories)
+    return _index
+
+
+def match_drug_names(drug_df: pd.DataFrame, drug_name: str) -> np.ndarray:
+    """
+    Boolean mask of the drug rows with any name column matching drug_name, the same
+    rows as str.contains(drug_name, na=False) on each column
+    Args:
+        drug_df: pd.DataFrame (drug table)
+        drug_name: str (query, a substring or regular expression)
+    """
+    mask = np.zeros(len(drug_df), dtype=bool)
+    for column in DRUG_NAME_COLUMNS:
+        values = drug_df[column]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            # Vocabulary-encoded names, the categories are the shared vocabulary
+            codes = values.cat.codes.to_numpy()
+            n_names = len(values.cat.categories)
+            matched = get_drug_index(values.cat.categories).search(drug_name)
+            # The index may also cover names added to the vocabulary since df was read
+            matched = matched[matched < n_names]
+        else:
+            # Plain columns (e.g. read from a store written before encoding) are
+            # matched once per distinct value
+            codes, uniques = pd.factorize(values)
+            n_names = len(uniques)
+            matched = np.flatnonzero(
+                pd.Series(uniques, dtype=object).str.contains(drug_name, na=False).to_numpy(bool)
+            )
+        # One flag per name plus a trailing False that null names (code -1) land on
+        hits = np.zeros(n_names + 1, dtype=bool)
+        hits[matched] = True
+        mask |= hits[codes]
+    return mask
+
+
+class AhoCorasick:
+    """
+    Aho-Corasick automaton finding which of a set of literal patterns occur in a
+    string, in one pass over the string.
+
+    Args:
+        patterns: List[str]
+    """
+
+    def __init__(self, patterns: List[str]):
+        self.patterns = list(patterns)
+        # State 0 is the root. goto[s] maps a character to the next state, fail[s] is
+        # the state of the longest proper suffix that is also a prefix of a pattern,
+        # and output[s] the patterns ending at s
+        self.goto: List[Dict[str, int]] = [{}]
+        self.fail: List[int] = [0]
+        self.output: List[List[int]] = [[]]
+        for position, pattern in enumerate(self.patterns):
+            state = 0
+            for char in pattern:
+                if char not in self.goto[state]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.output.append([])
+                    self.goto[state][char] = len(self.goto) - 1
+                state = self.goto[state][char]
+            self.output[state].append(position)
+
+        # Breadth-first, so a state's fail state is done before it. The root's
+        # children fail to the root
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self.goto[state].items():
+                queue.append(child)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(char, 0)
+                self.output[child] = self.output[child] + self.output[self.fail[child]]
+
+    def search(self, text: str) -> set:
+        """
+        Positions of the patterns occurring in text
+        """
+        found = set(self.output[0])
+        goto, fail, output = self.goto, self.fail, self.output
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if output[state]:
+                found.update(output[state])
+        return found
+
+
+def match_names_batch(names: List[str], queries: List[str]) -> sparse.csr_matrix:
+    """
+    Match every query against every name, with the semantics of str.contains
+    (names that aren't strings never match).
+    Literal queries go through one Aho-Corasick pass over the names, regular
+    expressions are matched one by one.
+    Returns:
+        sparse.csr_matrix (names x queries, 1 where the name matches the query)
+    """
+    literal = [i for i, query in enumerate(queries) if is_literal(query)]
+    rows, columns = [], []
+    if literal:
+        automaton = AhoCorasick([queries[i] for i in literal])
+        for position, name in enumerate(names):
+            if not isinstance(name, str):
+                continue
+            for match in automaton.search(name):
+                rows.append(position)
+                columns.append(literal[match])
+    for i, query in enumerate(queries):
+        if not is_literal(query):
+            regex = re.compile(query)
+            matched = [
+                position
+                for position, name in enumerate(names)
+                if isinstance(name, str) and regex.search(name)
+            ]
+            rows.extend(matched)
+            columns.extend([i] * len(matched))
+    rows = np.asarray(rows, dtype=np.int64)
+    columns = np.asarray(columns, dtype=np.int64)
+    return sparse.csr_matrix(
+        (np.ones(len(rows), dtype=np.int32), (rows, columns)), shape=(len(names), len(queries))
+    )
+
+
+def match_drug_names_batch(
+    drug_df: pd.DataFrame, queries: List[str], reports: Optional[np.ndarray] = None
+) -> Tuple[sparse.csr_matrix, np.ndarray]:
+    """
+    Find the reports with a drug row matching each query, the same reports as
+    match_drug_names query by query
+    Args:
+        drug_df: pd.DataFrame (drug table)
+        queries: List[str] (distinct queries, substrings or regular expressions)
+        reports: np.ndarray (sorted primaryids of the matrix columns, e.g. the reports
+            of FAERSData.incidence, by default every report in drug_df)
+    Returns:
+        sparse.csr_matrix (queries x reports, 1 where a report matches a query),
+        np.ndarray (primaryid of every column)
+    """
+    if reports is None:
+        reports = np.sort(pd.unique(drug_df["primaryid"].to_numpy()))
+    report_index = pd.Index(reports)
+    primaryids = drug_df["primaryid"].to_numpy()
+
+    # Columns over the same vocabulary share one pass over its names
+    name_matches = {}
+    membership = sparse.csr_matrix((len(queries), len(reports)), dtype=np.int32)
+    for column in DRUG_NAME_COLUMNS:
+        values = drug_df[column]
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            codes = values.cat.codes.to_numpy()
+            names = get_drug_index(values.cat.categories).names
+        else:
+            codes, uniques = pd.factorize(values)
+            names = list(uniques)
+        if id(names) not in name_matches:
+            name_matches[id(names)] = (names, match_names_batch(names, queries))
+        matches = name_matches[id(names)][1]
+
+        # Only rows whose name matches some query, on a report among the columns
+        hits = np.append(np.diff(matches.indptr) > 0, False)
+        rows = np.flatnonzero(hits[codes])
+        report_rows = report_index.get_indexer(primaryids[rows])
+        keep = report_rows >= 0
+        report_names = sparse.csr_matrix(
+            (np.ones(keep.sum(), dtype=np.int32), (report_rows[keep], codes[rows[keep]])),
+            shape=(len(reports), matches.shape[0]),
+        )
+        membership = membership + (report_names @ matches).T.tocsr()
+
+    membership = membership.tocsr()
+    membership.data[:] = 1
+    membership.eliminate_zeros()
+    membership.sort_indices()
+    return membership, np.asarray(reports)
@@ -1,8 +1,11 @@
 import argparse
+import numpy as np
 import pandas as pd
 import sys
 from pathlib import Path
+from typing import Dict, List, Optional
 from src.data_loader import FAERSData
+from src.drug_index import match_drug_names, match_drug_names_batch
 from loguru import logger
 
 def filter_by_drug_name(drug_df: pd.DataFrame | FAERSData, drug_name: str):
@@ -13,16 +16,11 @@ def filter_by_drug_name(drug_df: pd.DataFrame | FAERSData, drug_name: str):
 
 def filter_by_drug_name_drug_df(drug_df: pd.DataFrame, drug_name: str):
     """
-    Find and filter drug reports based on the query drug name
+    Find and filter drug reports based on the query drug name. The query is matched
+    (as str.contains would) against the distinct names of the drugname, prod_ai,
+    best_match_name and rxnorm_name columns through a trigram index, see src.drug_index
     """
-    just_drugs = drug_df
-    
-    query_drug_df = just_drugs[
-        just_drugs['drugname'].str.contains(drug_name, na=False) |
-        just_drugs['prod_ai'].str.contains(drug_name, na=False) |
-        just_drugs['best_match_name'].str.contains(drug_name, na=False) |
-        just_drugs['rxnorm_name'].str.contains(drug_name, na=False)
-    ]
+    query_drug_df = drug_df[match_drug_names(drug_df, drug_name)]
     
     logger.info(f"Number of reports for {drug_name} in 'drug' file: {query_drug_df.shape[0]}")
     logger.info(f"Number of reports with same 'primaryid': {query_drug_df.duplicated(subset=['primaryid']).sum()}")
@@ -35,6 +33,44 @@ def filter_by_drug_name_faersdata(drug_df: FAERSData, drug_name: str):
     """
     return filter_by_drug_name(drug_df.drug_data, drug_name)
 
+def filter_by_drug_names(
+    drug_df: pd.DataFrame | FAERSData,
+    drug_names: List[str],
+    return_matrix: bool = False,
+    reports: Optional[np.ndarray] = None,
+):
+    """
+    Find the reports of many query drug names at once, e.g. for a screening list. Each
+    query matches the same reports as filter_by_drug_name, but the distinct names are
+    read once for the whole batch (see src.drug_index)
+    Args:
+        drug_df: pd.DataFrame | FAERSData
+        drug_names: List[str] (queries, substrings or regular expressions)
+        return_matrix: bool (also return the sparse queries x reports matrix)
+        reports: np.ndarray (sorted primaryids of the matrix columns, e.g.
+            data.incidence.reports to count against the incidence matrices; by
+            default every report in the drug table)
+    Returns:
+        Dict[str, np.ndarray] (sorted primaryids of the reports matching each query)
+        and, if return_matrix, the queries x reports scipy.sparse.csr_matrix and the
+        primaryid of each of its columns
+    """
+    if isinstance(drug_df, FAERSData):
+        drug_df = drug_df.drug_data
+    queries = list(dict.fromkeys(drug_names))
+    membership, reports = match_drug_names_batch(drug_df, queries, reports)
+    matches: Dict[str, np.ndarray] = {
+        query: reports[membership.indices[membership.indptr[i]:membership.indptr[i + 1]]]
+        for i, query in enumerate(queries)
+    }
+    logger.info(
+        f"{sum(len(ids) > 0 for ids in matches.values())} of {len(queries)} drug names "
+        f"matched reports in 'drug' file"
+    )
+    if return_matrix:
+        return matches, membership, reports
+    return matches
+
 # Merge drug reports with demographics data
 def merge_with_demographics(query_drug_df, demo_df):
     
@@ -1,15 +1,27 @@
 from .drug_search import filter_by_drug_name, filter_by_age
 from .meddra_search import filter_by_preferred_terms
-from typing import List, Tuple
+from .outcomes import is_fatal, is_serious
+from typing import List, Tuple, Union
 import pandas as pd
 from .data_loader import FAERSData
 
-def filter_by(df: pd.DataFrame | FAERSData, filter_type: str, filter_value: str | List[str] | Tuple[int, int]) -> pd.DataFrame:
+def filter_by(df: pd.DataFrame | FAERSData, filter_type: str, filter_value: Union[str, List[str], Tuple[int, int], bool] = True) -> pd.DataFrame:
+    """
+    Filter reports by drug name, age range, preferred terms or outcome.
+    For "serious" and "fatal", filter_value is whether to keep the reports that are
+    (True) or aren't (False). They apply to any DataFrame with an outc_mask column,
+    or to the outc_data of a FAERSData.
+    """
     if filter_type == "drug":
         return filter_by_drug_name(df, filter_value)
     elif filter_type == "age":
         return filter_by_age(df, filter_value[0], filter_value[1])
     elif filter_type == "preferred_terms":
         return filter_by_preferred_terms(df, filter_value)
+    elif filter_type in ("serious", "fatal"):
+        if isinstance(df, FAERSData):
+            df = df.outc_data
+        predicate = is_serious if filter_type == "serious" else is_fatal
+        return df[predicate(df["outc_mask"]) == bool(filter_value)]
     else:
         raise ValueError(f"Invalid filter type: {filter_type}")
\ No newline at end of file
@@ -0,0 +1,229 @@
+"""
+Sparse report incidence matrices.
+
+FAERSIncidence holds three scipy.sparse CSR matrices over the same report rows:
+
+    pt          report x reaction PT      (from reac_data)
+    drug        report x drug             (from drug_data, the RxNorm name if mapped,
+                                           the cleaned drug name otherwise)
+    indication  report x indication PT    (from indi_data)
+
+A cell is 1 if the report has that label. Report-level counts are then sparse
+products instead of isin / value_counts / merge chains. For example, the PT counts
+of a set of reports are mask @ pt, and drug x PT co-occurrence counts are
+drug.T @ pt.
+
+The loader persists the matrices as a cache entry (data/cache/incidence_<key>) next
+to the table shards, so they're only built once per range and selection.
+"""
+
+import json
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Optional
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+from scipy import sparse
+
+from src.cache import LAST_ACCESS_FILE
+from src.utils import atomic_directory
+
+# Matrices of a FAERSIncidence and the (table, column) each is built from
+INCIDENCE_SOURCES = {
+    "pt": ("reac", "pt"),
+    "drug": ("drug", "rxnorm_name"),
+    "indication": ("indi", "indi_pt"),
+}
+
+
+@dataclass
+class IncidenceMatrix:
+    """
+    Sparse report x label matrix.
+
+    Attributes:
+        matrix (sparse.csr_matrix): int32, 1 where the report has the label
+        reports (np.ndarray): sorted primaryid of every row
+        labels (pd.Index): label of every column
+    """
+
+    matrix: sparse.csr_matrix
+    reports: np.ndarray
+    labels: pd.Index
+
+    @classmethod
+    def build(cls, primaryids: pd.Series, values: pd.Series, reports: pd.Index) -> "IncidenceMatrix":
+        """
+        Build the matrix from a long table in one pass. Categorical values (e.g. the
+        vocabulary-encoded names) are factorized on their codes.
+        Args:
+            primaryids: pd.Series (report of every row)
+            values: pd.Series (label of every row, nulls are skipped)
+            reports: pd.Index (sorted primaryids of the rows, must include every primaryid)
+        """
+        codes, labels = pd.factorize(values, sort=True)
+        keep = codes >= 0
+        # A hash lookup, much faster than a binary search over millions of reports
+        rows = reports.get_indexer(primaryids.to_numpy()[keep])
+        # Duplicate (report, label) pairs are summed when converting, then clipped to 1
+        matrix = sparse.csr_matrix(
+            (np.ones(keep.sum(), dtype=np.int32), (rows, codes[keep])),
+            shape=(len(reports), len(labels)),
+        )
+        matrix.data[:] = 1
+        return cls(matrix, reports.to_numpy(), pd.Index(labels))
+
+    def row_mask(self, primaryids: Iterable) -> np.ndarray:
+        """
+        Boolean mask of the rows of the given reports
+        """
+        if isinstance(primaryids, (set, frozenset)) or not hasattr(primaryids, "__len__"):
+            primaryids = list(primaryids)
+        return np.isin(self.reports, np.asarray(primaryids))
+
+    def counts(self, primaryids: Optional[Iterable] = None) -> pd.Series:
+        """
+        Number of reports with each label, among the given reports (all if None)
+        """
+        if primaryids is None:
+            totals = np.asarray(self.matrix.sum(axis=0)).ravel()
+        else:
+            totals = self.row_mask(primaryids).astype(np.int32) @ self.matrix
+        return pd.Series(totals, index=self.labels, name="count")
+
+    def reports_with(self, labels: Iterable) -> np.ndarray:
+        """
+        primaryids of the reports with any of the given labels
+        """
+        columns = self.labels.get_indexer(list(labels))
+        columns = columns[columns >= 0]
+        has_label = np.asarray(self.matrix[:, columns].sum(axis=1)).ravel() > 0
+        return self.reports[has_label]
+
+
+@dataclass
+class FAERSIncidence:
+    """
+    The report x PT, report x drug and report x indication matrices of a FAERSData,
+    over the same sorted report rows.
+    """
+
+    reports: np.ndarray
+    pt: IncidenceMatrix
+    drug: IncidenceMatrix
+    indication: IncidenceMatrix
+
+    @classmethod
+    def build(cls, reac: pd.DataFrame, drug: pd.DataFrame, indi: pd.DataFrame) -> "FAERSIncidence":
+        """
+        Build the three matrices from the reac, drug and indi tables
+        """
+        tables = {"reac": reac, "drug": drug, "indi": indi}
+        values = {}
+        for name, (table, column) in INCIDENCE_SOURCES.items():
+            df = tables[table]
+            if column not in df.columns or "primaryid" not in df.columns:
+                logger.warning(f"{table} has no {column} column, the {name} matrix will be empty")
+                df = pd.DataFrame({"primaryid": pd.Series(dtype="int64"), column: pd.Series(dtype=object)})
+            label = drug_labels(df) if name == "drug" else df[column]
+            values[name] = (df["primaryid"], label)
+
+        reports = pd.unique(np.concatenate([ids.to_numpy() for ids, _ in values.values()]))
+        reports = pd.Index(np.sort(reports))
+        matrices = {
+            name: IncidenceMatrix.build(ids, label, reports)
+            for name, (ids, label) in values.items()
+        }
+        return cls(reports=reports.to_numpy(), **matrices)
+
+    def ae_contingency(
+        self, query_ids: Iterable, background_ids: Optional[Iterable] = None
+    ) -> pd.DataFrame:
+        """
+        PT contingency counts of a set of query reports against background reports
+        (every other report if None), as two sparse products
+        Returns:
+            pd.DataFrame (pt_name, Count_query_drug, Count_non_query_drug,
+            No_AE_query_drug, No_AE_non_query_drug)
+        """
+        query = self.pt.row_mask(query_ids)
+        background = ~query if background_ids is None else self.pt.row_mask(background_ids) & ~query
+        counts = np.vstack([query, background]).astype(np.int32) @ self.pt.matrix
+        contingency = pd.DataFrame(
+            {
+                "pt_name": self.pt.labels,
+                "Count_query_drug": counts[0],
+                "Count_non_query_drug": counts[1],
+            }
+        )
+        contingency = contingency[
+            (contingency["Count_query_drug"] > 0) | (contingency["Count_non_query_drug"] > 0)
+        ].reset_index(drop=True)
+        contingency["No_AE_query_drug"] = query.sum() - contingency["Count_query_drug"]
+        contingency["No_AE_non_query_drug"] = background.sum() - contingency["Count_non_query_drug"]
+        return contingency
+
+    def save(self, entry_dir: Path) -> None:
+        """
+        Atomically write the matrices to a cache entry
+        """
+        with atomic_directory(entry_dir) as tmp_dir:
+            np.save(tmp_dir / "reports.npy", self.reports)
+            labels = {}
+            for name in INCIDENCE_SOURCES:
+                incidence = getattr(self, name)
+                sparse.save_npz(tmp_dir / f"{name}.npz", incidence.matrix)
+                labels[name] = pd.Series(incidence.labels.to_numpy(dtype=object)).tolist()
+            with open(tmp_dir / "labels.json", "w") as f:
+                json.dump(labels, f)
+            Path(tmp_dir, LAST_ACCESS_FILE).touch()
+        logger.info(f"Wrote incidence matrices to {entry_dir}")
+
+    @classmethod
+    def load(cls, entry_dir: Path) -> Optional["FAERSIncidence"]:
+        """
+        Read the matrices from a cache entry, or None if it isn't there
+        """
+        entry_dir = Path(entry_dir)
+        if not (entry_dir / "labels.json").exists():
+            return None
+        logger.debug(f"Reading incidence matrices from {entry_dir}")
+        reports = np.load(entry_dir / "reports.npy")
+        with open(entry_dir / "labels.json") as f:
+            labels = json.load(f)
+        Path(entry_dir, LAST_ACCESS_FILE).touch()
+        return cls(
+            reports=reports,
+            **{
+                name: IncidenceMatrix(
+                    sparse.load_npz(entry_dir / f"{name}.npz").tocsr(),
+                    reports,
+                    pd.Index(labels[name], dtype=object),
+                )
+                for name in INCIDENCE_SOURCES
+            },
+        )
+
+
+def drug_labels(drug: pd.DataFrame) -> pd.Series:
+    """
+    RxNorm name of every drug row, falling back to the cleaned drug name where the
+    name isn't mapped. Vocabulary-encoded columns are combined on their codes.
+    """
+    names = drug["rxnorm_name"]
+    if "drugname" not in drug.columns:
+        return names
+    missing = names.isna().to_numpy()
+    fallback = drug["drugname"]
+    if (
+        isinstance(names.dtype, pd.CategoricalDtype)
+        and isinstance(fallback.dtype, pd.CategoricalDtype)
+        and names.cat.categories.equals(fallback.cat.categories)
+    ):
+        codes = np.where(missing, fallback.cat.codes, names.cat.codes)
+        return pd.Series(
+            pd.Categorical.from_codes(codes, dtype=names.dtype), index=names.index
+        )
+    return names.astype(object).where(~missing, fallback.astype(object))
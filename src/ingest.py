@@ -0,0 +1,214 @@
+"""
+Pipelined ingestion of FAERS quarters: download -> parse -> preprocess -> columnar store.
+
+Quarters are downloaded on a background thread and handed to a pool of worker
+processes that parse, preprocess and write each one to data/processed_faers, so
+quarter N+1 downloads while quarter N is being converted. Both hand-offs are
+bounded: the downloader blocks once queue_size downloaded quarters are waiting,
+and at most convert_workers quarters are converted at once, so memory stays
+bounded no matter how many quarters are ingested.
+
+    python -m src.ingest --start-year 2015 --end-year 2024 --keep-archive
+"""
+
+import argparse
+import queue
+import threading
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    wait,
+)
+from typing import Dict, List, Optional
+
+from loguru import logger
+from tqdm import tqdm
+
+from src.data_loader import CSV_ENGINES, convert_quarter
+from src.parse_quarters import ParseQuarters
+from src.report_downloader import FAILED, SKIPPED, FAERSDownloader
+
+# Outcome of a quarter whose conversion succeeded
+CONVERTED = "converted"
+
+# Marks the end of the download queue
+_DONE = None
+
+
+def ingest_faers_quarters(
+    start_year: int,
+    end_year: int,
+    start_quarter: int = 1,
+    end_quarter: int = 4,
+    save_dir: str = "data",
+    keep_archive: bool = False,
+    overwrite: bool = False,
+    download_workers: int = 1,
+    convert_workers: int = 1,
+    queue_size: int = 2,
+    engine: str = "c",
+    chunksize: Optional[int] = None,
+    retries: int = 3,
+    request_delay: float = 1.0,
+    debug: bool = False,
+) -> Dict[str, List[str]]:
+    """
+    Download the given quarters and convert them to the processed store, overlapping
+    the downloads with the conversion.
+    Args:
+        start_year: int
+        end_year: int
+        start_quarter: int = 1
+        end_quarter: int = 4
+        save_dir: str = "data"
+        keep_archive: bool = False (keep each quarter as its zip instead of extracting it)
+        overwrite: bool = False (download and convert quarters that are already present)
+        download_workers: int = 1 (number of quarters downloaded at once)
+        convert_workers: int = 1 (number of processes converting quarters)
+        queue_size: int = 2 (downloaded quarters that may wait for conversion before
+            the downloads pause)
+        engine: str = "c" (CSV engine for the raw TXT files, "c" or "pyarrow")
+        chunksize: int = None (stream the DRUG and REAC files in chunks of this many rows)
+        retries: int = 3 (download attempts after the first before a quarter fails)
+        request_delay: float = 1.0 (minimum seconds between requests to the FDA server)
+        debug: bool = False
+    Returns:
+        dict of outcome -> quarters. "converted" and "skipped" quarters are in the
+        processed store, "failed" quarters could not be downloaded or converted
+    """
+    downloader = FAERSDownloader(save_dir, debug=debug, request_delay=request_delay)
+    parsed_quarters = ParseQuarters(
+        start_year, end_year, start_quarter, end_quarter, debug=debug
+    )
+    parsed_quarters.check_available_online(save_dir)
+    quarters = parsed_quarters.get_quarters()
+
+    downloaded: queue.Queue = queue.Queue(maxsize=queue_size)
+    summary = {CONVERTED: [], SKIPPED: [], FAILED: []}
+    download_thread = threading.Thread(
+        target=_download_stage,
+        args=(downloader, quarters, downloaded, summary, download_workers, retries),
+        kwargs={"overwrite": overwrite, "keep_archive": keep_archive},
+        daemon=True,
+    )
+    download_thread.start()
+
+    logger.info(
+        f"Ingesting {len(quarters)} quarters with {download_workers} download and {convert_workers} convert workers"
+    )
+    with ProcessPoolExecutor(max_workers=convert_workers) as executor, tqdm(
+        total=len(quarters), desc="Ingesting quarters"
+    ) as bar:
+        in_flight = {}
+        while True:
+            quarter = downloaded.get()
+            if quarter is _DONE:
+                break
+            # Only take the next quarter off the queue once a worker is free
+            while len(in_flight) >= convert_workers:
+                _collect(wait(in_flight, return_when=FIRST_COMPLETED).done, in_flight, summary, bar)
+            future = executor.submit(
+                convert_quarter, quarter, save_dir, overwrite, engine, chunksize
+            )
+            in_flight[future] = quarter
+        _collect(wait(in_flight).done, in_flight, summary, bar)
+
+    download_thread.join()
+    for status, status_quarters in summary.items():
+        status_quarters.sort()
+        logger.info(f"{len(status_quarters)} quarters {status}: {status_quarters}")
+    return summary
+
+
+def _download_stage(
+    downloader: FAERSDownloader,
+    quarters: List[str],
+    downloaded: queue.Queue,
+    summary: Dict[str, List[str]],
+    workers: int,
+    retries: int,
+    **kwargs,
+) -> None:
+    """
+    Download the quarters and put each one on the queue as soon as it's ready,
+    blocking while the queue is full
+    """
+    def download(quarter: str) -> None:
+        status = downloader.download_quarter_with_retries(quarter, retries, **kwargs)
+        if status == FAILED:
+            summary[FAILED].append(quarter)
+        else:
+            # Blocks while the converters are behind
+            downloaded.put(quarter)
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            for future in [executor.submit(download, quarter) for quarter in quarters]:
+                future.result()
+    finally:
+        downloaded.put(_DONE)
+
+
+def _collect(done, in_flight: Dict, summary: Dict[str, List[str]], bar: tqdm) -> None:
+    """
+    Record the outcome of finished conversions
+    """
+    for future in done:
+        quarter = in_flight.pop(future)
+        try:
+            summary[CONVERTED if future.result() else SKIPPED].append(quarter)
+        except Exception as e:
+            logger.error(f"Failed to convert {quarter}: {e}")
+            summary[FAILED].append(quarter)
+        bar.update(1)
+
+
+def build_parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(
+        prog="python -m src.ingest",
+        description="Download FAERS quarters and convert them to the processed store",
+    )
+    p.add_argument("--start-year", type=int, required=True)
+    p.add_argument("--end-year", type=int, required=True)
+    p.add_argument("--start-quarter", type=int, default=1)
+    p.add_argument("--end-quarter", type=int, default=4)
+    p.add_argument("--save-dir", default="data")
+    p.add_argument("--keep-archive", action="store_true", help="Keep quarters as zips instead of extracting them")
+    p.add_argument("--overwrite", action="store_true")
+    p.add_argument("--download-workers", type=int, default=1)
+    p.add_argument("--convert-workers", type=int, default=1)
+    p.add_argument("--queue-size", type=int, default=2)
+    p.add_argument("--engine", choices=CSV_ENGINES, default="c")
+    p.add_argument("--chunksize", type=int, default=None)
+    p.add_argument("--retries", type=int, default=3, help="Download attempts after the first before a quarter fails")
+    p.add_argument("--request-delay", type=float, default=1.0, help="Minimum seconds between requests to the FDA server")
+    p.add_argument("--debug", action="store_true")
+    return p
+
+
+def main():
+    args = build_parser().parse_args()
+    summary = ingest_faers_quarters(
+        args.start_year,
+        args.end_year,
+        args.start_quarter,
+        args.end_quarter,
+        save_dir=args.save_dir,
+        keep_archive=args.keep_archive,
+        overwrite=args.overwrite,
+        download_workers=args.download_workers,
+        convert_workers=args.convert_workers,
+        queue_size=args.queue_size,
+        engine=args.engine,
+        chunksize=args.chunksize,
+        retries=args.retries,
+        request_delay=args.request_delay,
+        debug=args.debug,
+    )
+    if summary[FAILED]:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,20 +7,22 @@ import pickle
 from typing import List
 from loguru import logger
 
+from src.ragged import RaggedArray
+
 
 def filter_by_any_pt_terms(df: pd.DataFrame, terms: List[str]) -> pd.DataFrame:
     """
     Filter DataFrame to only include rows that contain ANY of the specified terms.
 
     Args:
-        df: DataFrame containing the data
-        terms: List of terms to search for (all must be present)
+        df: DataFrame containing the data, with a "pt" column of lists (e.g. FAERSData.merged)
+        terms: List of terms to search for (any may be present)
 
     Returns:
-        DataFrame containing only rows that have all specified terms
+        DataFrame containing only rows that have any of the specified terms
     """
-    terms_set = set(terms)
-    return df[df["pt"].apply(lambda term_list: any(t in terms_set for t in term_list))]
+    # Matched on the dictionary codes of the PTs (see src/ragged.py)
+    return df[RaggedArray.from_series(df["pt"]).contains_any(terms)]
 
 
 def filter_by_all_pt_terms(df: pd.DataFrame, terms: List[str]) -> pd.DataFrame:
@@ -28,16 +30,13 @@ def filter_by_all_pt_terms(df: pd.DataFrame, terms: List[str]) -> pd.DataFrame:
     Filter DataFrame to only include rows that contain ALL of the specified terms.
 
     Args:
-        df: DataFrame containing the data
+        df: DataFrame containing the data, with a "pt" column of lists (e.g. FAERSData.merged)
         terms: List of terms to search for (all must be present)
 
     Returns:
         DataFrame containing only rows that have all specified terms
     """
-    # Filter rows where all terms are present
-    mask = df["pt"].apply(lambda x: all(term in x for term in terms))
-
-    return df[mask]
+    return df[RaggedArray.from_series(df["pt"]).contains_all(terms)]
 
 def filter_by_preferred_terms(report: pd.DataFrame, preferred_terms: List[str]) -> pd.DataFrame:
     """
@@ -0,0 +1,219 @@
+"""
+Unique-value normalization of FAERS name columns.
+
+Drug names and PTs repeat heavily: a quarter has tens of millions of rows but only
+a few hundred thousand distinct strings. A NameNormalizer factorizes a column,
+cleans each distinct value once and maps the codes back to the cleaned values.
+
+The raw -> clean dictionary it learns is persisted under the loader's save_dir
+(e.g. data/normalization/drugname_v1/), so each new quarter only cleans strings
+that no earlier quarter contained. Every save appends a small parquet file with the
+newly learned pairs (so concurrent workers never overwrite each other), and the
+files are compacted once there are more than MAX_PARTS of them.
+"""
+
+import os
+import uuid
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+
+import pandas as pd
+from loguru import logger
+
+from src.utils import file_lock
+
+NORMALIZATION_DIR = "normalization"
+
+# Bump when a cleaning function changes so the persisted dictionaries are relearned
+NORMALIZATION_VERSION = "1"
+
+# Number of parquet files a dictionary may grow to before it's compacted
+MAX_PARTS = 32
+
+
+def get_normalization_dir(save_dir: str = "data") -> Path:
+    """
+    Get the directory the dictionaries are persisted to (e.g. data/normalization)
+    """
+    return Path(save_dir) / NORMALIZATION_DIR
+
+
+def strip_trailing_period(names: pd.Series) -> pd.Series:
+    """
+    Remove one period at the end of each name
+    """
+    return names.where(~names.str.endswith("."), names.str[:-1])
+
+
+def clean_drug_names(names: pd.Series) -> pd.Series:
+    """
+    Strip whitespace, lowercase, standardize slashes to '/' and remove a trailing period
+    """
+    names = names.str.strip().str.lower()
+    names = names.str.replace("\\", "/")
+    return strip_trailing_period(names)
+
+
+def clean_pts(names: pd.Series) -> pd.Series:
+    """
+    Strip whitespace, lowercase and remove a trailing period
+    """
+    return strip_trailing_period(names.str.strip().str.lower())
+
+
+def clean_lowercase(names: pd.Series) -> pd.Series:
+    """
+    Lowercase
+    """
+    return names.str.lower()
+
+
+class NameNormalizer:
+    """
+    Cleans a column of names one distinct value at a time, remembering every value it
+    has cleaned.
+
+    Args:
+        name: str (name of the dictionary, e.g. "drugname")
+        clean: function cleaning a Series of distinct raw names
+        save_dir: str (the dictionary is persisted to save_dir/normalization, None
+            keeps it in memory)
+    """
+
+    def __init__(
+        self,
+        name: str,
+        clean: Callable[[pd.Series], pd.Series],
+        save_dir: Optional[str] = None,
+    ):
+        self.name = name
+        self.clean = clean
+        self.dir = (
+            None
+            if save_dir is None
+            else get_normalization_dir(save_dir) / f"{name}_v{NORMALIZATION_VERSION}"
+        )
+        self.mapping: Dict[str, str] = None
+        self.learned: Dict[str, str] = {}
+
+    def load(self) -> None:
+        """
+        Load the persisted dictionary
+        """
+        self.mapping = {}
+        if self.dir is None or not self.dir.exists():
+            return
+        for path in sorted(self.dir.glob("*.parquet")):
+            try:
+                part = pd.read_parquet(path)
+            except (OSError, ValueError) as e:
+                logger.warning(f"Skipping unreadable normalization file {path}: {e}")
+                continue
+            self.mapping.update(zip(part["raw"], part["clean"]))
+        logger.debug(f"Loaded {len(self.mapping)} {self.name} normalizations from {self.dir}")
+
+    def normalize(self, values: pd.Series) -> pd.Series:
+        """
+        Clean a column of names. Only values that haven't been seen before are run
+        through the cleaning function. Nulls are kept as nulls.
+        """
+        if self.mapping is None:
+            self.load()
+        codes, uniques = pd.factorize(values)
+
+        unseen = [value for value in uniques if value not in self.mapping]
+        if unseen:
+            cleaned = self.clean(pd.Series(unseen, dtype=values.dtype))
+            new = dict(zip(unseen, cleaned.astype(object)))
+            self.mapping.update(new)
+            self.learned.update(new)
+
+        clean_uniques = pd.array(
+            [self.mapping[value] for value in uniques], dtype=values.dtype
+        )
+        return pd.Series(
+            clean_uniques.take(codes, allow_fill=True),
+            index=values.index,
+            name=values.name,
+        )
+
+    def save(self) -> None:
+        """
+        Persist the values learned since the last save
+        """
+        if self.dir is None or not self.learned:
+            return
+        try:
+            self.dir.mkdir(parents=True, exist_ok=True)
+            path = self.dir / f"part-{uuid.uuid4().hex}.parquet"
+            tmp_path = path.with_name(f".{path.name}.tmp")
+            pd.DataFrame(
+                {"raw": list(self.learned), "clean": list(self.learned.values())}
+            ).to_parquet(tmp_path, index=False)
+            os.replace(tmp_path, path)
+            logger.debug(f"Saved {len(self.learned)} new {self.name} normalizations to {path}")
+            self.learned = {}
+            if len(list(self.dir.glob("*.parquet"))) > MAX_PARTS:
+                self.compact()
+        except OSError as e:
+            logger.warning(f"Could not save {self.name} normalizations to {self.dir}: {e}")
+
+    def compact(self) -> None:
+        """
+        Merge the persisted parquet files into one
+        """
+        with file_lock(self.dir / ".lock"):
+            parts = sorted(self.dir.glob("*.parquet"))
+            merged = pd.concat([pd.read_parquet(path) for path in parts])
+            merged = merged.drop_duplicates(subset=["raw"])
+            path = self.dir / f"part-{uuid.uuid4().hex}.parquet"
+            tmp_path = path.with_name(f".{path.name}.tmp")
+            merged.to_parquet(tmp_path, index=False)
+            os.replace(tmp_path, path)
+            for part in parts:
+                part.unlink(missing_ok=True)
+        logger.debug(f"Compacted {len(parts)} {self.name} normalization files")
+
+
+# Cleaning function of each normalized column
+NORMALIZERS: Dict[str, Callable[[pd.Series], pd.Series]] = {
+    "drugname": clean_drug_names,
+    "pt": clean_pts,
+    "prod_ai": clean_lowercase,
+}
+
+# One normalizer per save_dir, column and process, so each dictionary is loaded once
+_normalizers: Dict[Tuple[str, str], NameNormalizer] = {}
+
+
+def get_normalizer(name: str, save_dir: str = "data") -> NameNormalizer:
+    """
+    Get the normalizer of a column (e.g. "drugname"), persisted under save_dir.
+    Memoized per process.
+    """
+    if name not in NORMALIZERS:
+        logger.error(f"Invalid normalizer: {name}. Must be one of {list(NORMALIZERS)}")
+        raise ValueError(f"Invalid normalizer: {name}. Must be one of {list(NORMALIZERS)}")
+    key = (str(Path(save_dir).resolve()), name)
+    if key not in _normalizers:
+        _normalizers[key] = NameNormalizer(name, NORMALIZERS[name], save_dir)
+    return _normalizers[key]
+
+
+def normalize_names(values: pd.Series, name: str, save_dir: str = "data") -> pd.Series:
+    """
+    Clean a column of names with the normalizer registered for it
+    Args:
+        values: pd.Series (raw names)
+        name: str (one of NORMALIZERS, e.g. "drugname")
+        save_dir: str (the dictionary is persisted to save_dir/normalization)
+    """
+    return get_normalizer(name, save_dir).normalize(values)
+
+
+def save_normalizations() -> None:
+    """
+    Persist the values every normalizer has learned since the last save
+    """
+    for normalizer in _normalizers.values():
+        normalizer.save()
@@ -0,0 +1,134 @@
+"""
+Bitmask encoding of FAERS outcome codes.
+
+Every report's outcomes are stored as one uint8 (outc_mask) with a bit per outcome
+code instead of Python lists of codes and labels. Filtering on outcomes is then a
+vectorized bitwise test, and labels are only decoded when they're displayed.
+"""
+
+from typing import List
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+# Outcome codes in bit order (DE is bit 0, LT bit 1, ...)
+OUTCOME_CODES = ["DE", "LT", "HO", "DS", "CA", "RI", "OT"]
+
+OUTCOME_LABELS = {
+    "DE": "Death",
+    "LT": "Life-Threatening",
+    "HO": "Hospitalization",
+    "DS": "Disability",
+    "CA": "Congenital Anomaly",
+    "RI": "Required Intervention",
+    "OT": "Other Serious",
+}
+
+OUTCOME_BITS = {code: np.uint8(1 << i) for i, code in enumerate(OUTCOME_CODES)}
+
+# Number of distinct masks, used to decode through a lookup table
+N_MASKS = 1 << len(OUTCOME_CODES)
+
+
+def encode_outcomes(outc: pd.DataFrame) -> pd.DataFrame:
+    """
+    Aggregate the OUTC table to one outcome bitmask per (primaryid, caseid).
+    Reports whose codes are all missing or unknown get an empty mask.
+    Args:
+        outc: pd.DataFrame (primaryid, caseid, outc_cod with one row per outcome)
+    Returns:
+        pd.DataFrame (primaryid, caseid, outc_mask)
+    """
+    codes = outc["outc_cod"].astype("category")
+    # Look the bit up once per category and index it with the categorical codes
+    category_bits = codes.cat.categories.astype(str).str.upper().map(OUTCOME_BITS)
+    unknown = category_bits.isna()
+    if unknown.any():
+        logger.warning(f"Ignoring unknown outcome codes: {list(codes.cat.categories[unknown])}")
+    lookup = np.append(category_bits.fillna(0).to_numpy(np.uint8), np.uint8(0))
+    bits = outc[["primaryid", "caseid"]].assign(
+        outc_mask=lookup[codes.cat.codes.to_numpy()]
+    )
+    # A report's bits are distinct after dropping repeated codes, so their sum is their OR
+    return (
+        bits.drop_duplicates()
+        .groupby(["primaryid", "caseid"])["outc_mask"]
+        .sum()
+        .astype(np.uint8)
+        .reset_index()
+    )
+
+
+def _masks(outc_mask: pd.Series) -> np.ndarray:
+    # Reports without outcomes (e.g. after a left merge) have a missing mask
+    return outc_mask.fillna(0).to_numpy().astype(np.uint8)
+
+
+def has_outcome(outc_mask: pd.Series, codes: List[str]) -> pd.Series:
+    """
+    Check which reports have any of the given outcome codes
+    Args:
+        outc_mask: pd.Series (outcome bitmasks)
+        codes: List[str] (e.g. ["DE", "LT"])
+    """
+    invalid_codes = [code for code in codes if code not in OUTCOME_BITS]
+    if invalid_codes:
+        logger.error(f"Invalid outcome codes: {invalid_codes}. Must be in {OUTCOME_CODES}")
+        raise ValueError(f"Invalid outcome codes: {invalid_codes}. Must be in {OUTCOME_CODES}")
+    bits = np.bitwise_or.reduce([OUTCOME_BITS[code] for code in codes], initial=np.uint8(0))
+    return pd.Series((_masks(outc_mask) & bits) != 0, index=outc_mask.index)
+
+
+def is_serious(outc_mask: pd.Series) -> pd.Series:
+    """
+    Check which reports are serious. Every FAERS outcome code is a serious outcome,
+    so these are the reports with any outcome.
+    """
+    return pd.Series(_masks(outc_mask) != 0, index=outc_mask.index)
+
+
+def is_fatal(outc_mask: pd.Series) -> pd.Series:
+    """
+    Check which reports resulted in death
+    """
+    return has_outcome(outc_mask, ["DE"])
+
+
+def _decode_table(values: dict) -> np.ndarray:
+    table = np.empty(N_MASKS, dtype=object)
+    for mask in range(N_MASKS):
+        table[mask] = [values[code] for code in OUTCOME_CODES if mask & OUTCOME_BITS[code]]
+    return table
+
+
+OUTCOME_CODE_TABLE = _decode_table({code: code for code in OUTCOME_CODES})
+OUTCOME_LABEL_TABLE = _decode_table(OUTCOME_LABELS)
+
+
+def decode_outcome_codes(outc_mask: pd.Series) -> pd.Series:
+    """
+    Decode bitmasks to lists of outcome codes (e.g. ["DE", "HO"]), for display
+    """
+    return pd.Series(OUTCOME_CODE_TABLE[_masks(outc_mask)], index=outc_mask.index)
+
+
+def decode_outcome_labels(outc_mask: pd.Series) -> pd.Series:
+    """
+    Decode bitmasks to lists of human-readable outcomes (e.g. ["Death", "Hospitalization"]),
+    for display
+    """
+    return pd.Series(OUTCOME_LABEL_TABLE[_masks(outc_mask)], index=outc_mask.index)
+
+
+def decode_outcomes(outc: pd.DataFrame) -> pd.DataFrame:
+    """
+    Add the outc_cod and outc_label list columns outc tables had before outcomes were
+    stored as bitmasks
+    Args:
+        outc: pd.DataFrame (with an outc_mask column, e.g. outc_data or merged)
+    """
+    return outc.assign(
+        outc_cod=decode_outcome_codes(outc["outc_mask"]),
+        outc_label=decode_outcome_labels(outc["outc_mask"]),
+    )
@@ -75,12 +75,13 @@ class ParseQuarters:
         """
         return self.parsed_quarters
 
-    def check_available_online(self) -> None:
+    def check_available_online(self, save_dir: str = "data") -> None:
         """
-        Check if the quarters are available online
+        Check if the quarters are available online, using the cached download page
+        index in save_dir when it's fresh
         """
         missing_quarters = []
-        available_online_quarters = get_available_online_quarters()
+        available_online_quarters = get_available_online_quarters(save_dir)
         for quarter in self.parsed_quarters:
             if quarter not in available_online_quarters:
                 missing_quarters.append(quarter)
@@ -126,11 +127,34 @@ class ParseQuarters:
                 missing_quarters.append(quarter)
         if missing_quarters:
             logger.error(
-                f"Quarters {missing_quarters} not found in {save_dir}/processed"
+                f"Quarters {missing_quarters} not found in {save_dir}/processed_faers"
             )
             raise ValueError(
-                f"Quarters {missing_quarters} not found in {save_dir}/processed"
+                f"Quarters {missing_quarters} not found in {save_dir}/processed_faers"
             )
         logger.info(
-            f"All quarters {self.parsed_quarters} found in {save_dir}/processed"
+            f"All quarters {self.parsed_quarters} found in {save_dir}/processed_faers"
+        )
+
+    def check_available_local(self, save_dir: str = "data") -> None:
+        """
+        Check if the quarters are available either as raw downloads in save_dir/faers_reports
+        or in the save_dir/processed_faers store
+        """
+        missing_quarters = []
+        available_local_quarters = set(
+            get_available_downloaded_quarters(save_dir)
+        ) | set(get_available_processed_quarters(save_dir))
+        for quarter in self.parsed_quarters:
+            if quarter not in available_local_quarters:
+                missing_quarters.append(quarter)
+        if missing_quarters:
+            logger.error(
+                f"Quarters {missing_quarters} not found in {save_dir}/faers_reports or {save_dir}/processed_faers"
+            )
+            raise ValueError(
+                f"Quarters {missing_quarters} not found in {save_dir}/faers_reports or {save_dir}/processed_faers"
+            )
+        logger.info(
+            f"All quarters {self.parsed_quarters} found locally in {save_dir}"
         )
@@ -2,22 +2,53 @@ import pandas as pd
 import numpy as np
 
 from loguru import logger
+from typing import Dict, Iterable, List
+
 from src.aggregations import aggregate_faers_table
+from src.deduplication import is_latest_version
+from src.normalization import normalize_names, save_normalizations
+from src.rxnorm import RXNORM_COLUMNS, RXNORM_MAP_PATH, get_rxnorm_index
+
+# Tables whose preprocessing can run chunk by chunk
+CHUNKED_TYPES = ["drug", "reac"]
+
+# Bump whenever the output of preprocessing changes, so cached and stored quarters
+# built by older code are rebuilt
+PREPROCESS_VERSION = "7"
+
+# Factor converting each FAERS age unit (age_cod) to years
+AGE_UNIT_YEARS = {
+    "DEC": 10.0,
+    "YR": 1.0,
+    "MON": 1 / 12,
+    "WK": 1 / 52,
+    "DY": 1 / 365,
+    "HR": 1 / 8760,
+}
+
+# Factor converting each FAERS weight unit (wt_cod) to kilograms
+WEIGHT_UNIT_KG = {"KG": 1.0, "LBS": 0.45359237, "GMS": 0.001}
 
-def preprocess(df: pd.DataFrame, type: str) -> pd.DataFrame:
+
+def preprocess(df: pd.DataFrame, type: str, save_dir: str = "data") -> pd.DataFrame:
     """
     Factory function to preprocess the dataframe for the given type.
 
     Args:
         df: pd.DataFrame
         type: str
+        save_dir: str (where the name normalizations are persisted)
     Returns:
         pd.DataFrame (with preprocessed data)
     """
     if type == "reac":
-        return preprocess_reac_df(df)
+        df = preprocess_reac_df(df, save_dir=save_dir)
+        save_normalizations()
+        return df
     elif type == "drug":
-        return preprocess_drug_df(df)
+        df = preprocess_drug_df(df, save_dir)
+        save_normalizations()
+        return df
     elif type == "demo":
         return preprocess_demo_df(df)
     elif type == "outc":
@@ -37,22 +68,51 @@ def preprocess(df: pd.DataFrame, type: str) -> pd.DataFrame:
         )
 
 
-def load_rxnorm_mapping(mapping_path, drug_df):
+def preprocess_chunks(
+    chunks: Iterable[pd.DataFrame], type: str, save_dir: str = "data"
+) -> pd.DataFrame:
+    """
+    Factory function to preprocess a table that is read in chunks. Only the tables in
+    CHUNKED_TYPES can be streamed.
 
-    # Load full mapping
-    logger.info(f"Loading RxNorm mapping from: {mapping_path}")
-    mapping = pd.read_csv(mapping_path)
+    Args:
+        chunks: Iterable[pd.DataFrame]
+        type: str
+        save_dir: str (where the name normalizations are persisted)
+    Returns:
+        pd.DataFrame (with preprocessed data)
+    """
+    if type == "drug":
+        df = preprocess_drug_chunks(chunks, save_dir)
+    elif type == "reac":
+        df = preprocess_reac_chunks(chunks, save_dir=save_dir)
+    else:
+        logger.error(f"Invalid type: {type}. Must be one of {CHUNKED_TYPES}")
+        raise ValueError(f"Invalid type: {type}. Must be one of {CHUNKED_TYPES}")
+    save_normalizations()
+    return df
 
-    # Get unique drugnames from FAERS drug table for given time frame
-    faers_drugnames = drug_df["drugname"].dropna().unique()
 
-    # Only keep relevant names to minimize merge time
-    mapping = mapping[mapping["drugname"].isin(faers_drugnames)]
+def load_rxnorm_mapping(mapping_path, drug_df):
+    """
+    Get the rows of the RxNorm mapping for the drug names in drug_df, one per name.
+    """
+    index = get_rxnorm_index(mapping_path)
+    faers_drugnames = pd.Series(drug_df["drugname"].dropna().unique())
+    mapping = index.lookup(faers_drugnames)
+    mapping.insert(0, "drugname", faers_drugnames)
 
-    return mapping
+    return mapping[faers_drugnames.isin(index.names)].reset_index(drop=True)
 
 
-def preprocess_drug_df(drug):
+def filter_drug_rows(
+    drug: pd.DataFrame, debug: bool = False, save_dir: str = "data"
+) -> pd.DataFrame:
+    """
+    Row-wise part of the drug preprocessing: keeps the needed columns and the primary
+    suspect, non-null, non-unknown drugs, and normalizes the drug names. Every row is
+    handled independently, so this can be applied to a chunk of the DRUG file at a time.
+    """
     drug = drug[
         [
             "primaryid",
@@ -66,42 +126,40 @@ def preprocess_drug_df(drug):
         ]
     ]
 
-    logger.info(f"Starting number of reports in 'drug' file: {drug.shape[0]}")
-
     drug = drug[drug["role_cod"] == "PS"]
-    logger.info(
-        f"Number of reports in the 'drug' file where drug is the primary suspect: {drug.shape[0]}"
-    )
+    if debug:
+        logger.debug(
+            f"Number of reports in the 'drug' file where drug is the primary suspect: {drug.shape[0]}"
+        )
 
     drug = drug[pd.notnull(drug["drugname"])]  # Drops Nulls
     drug = drug[~drug["drugname"].isin(["unknown"])]  # Drops unknowns
 
-    logger.info(
-        f"Number of reports in the 'drug' file after unknown/null drugs are removed: {drug.shape[0]}"
-    )
+    if debug:
+        logger.debug(
+            f"Number of reports in the 'drug' file after unknown/null drugs are removed: {drug.shape[0]}"
+        )
 
-    # Clean drug names BEFORE loading mapping
-    drug["drugname"] = (
-        drug["drugname"].str.strip().str.lower()
-    )  # Strips whitespace, Transforms to lowercase
-    drug["drugname"] = drug["drugname"].str.replace(
-        "\\", "/"
-    )  # Standardizes slashes to '/'
-    drug["drugname"] = drug["drugname"].map(
-        lambda x: x[:-1] if str(x).endswith(".") else x
-    )  # Removes periods at the end of drug names
-
-    # Now load mapping after cleaning drug names
-    name_mapping = load_rxnorm_mapping("data/rxnorm_map.csv", drug)
-
-    # Add in rxnorm mapping results
-    drug = drug.merge(
-        name_mapping[["drugname", "best_match_name", "rxnorm_name"]],
-        how="left",
-        on="drugname",
-    )
+    # Clean drug names BEFORE loading mapping: strips whitespace, lowercases,
+    # standardizes slashes to '/' and removes periods at the end of drug names.
+    # Each distinct name is only cleaned once (see src/normalization.py)
+    drug["drugname"] = normalize_names(drug["drugname"], "drugname", save_dir)
 
-    drug["prod_ai"] = drug["prod_ai"].str.lower()
+    return drug
+
+
+def map_drug_names(drug: pd.DataFrame, save_dir: str = "data") -> pd.DataFrame:
+    """
+    Report-level part of the drug preprocessing: adds the RxNorm mapping and keeps one
+    primary suspect drug per report. Needs all the rows of the table at once.
+    """
+    # Add in rxnorm mapping results. The mapping is compiled and indexed once per
+    # process, and looked up per distinct name rather than merged on the strings
+    name_mapping = get_rxnorm_index(RXNORM_MAP_PATH)
+    drug = drug.reset_index(drop=True)
+    drug[RXNORM_COLUMNS] = name_mapping.lookup(drug["drugname"])
+
+    drug["prod_ai"] = normalize_names(drug["prod_ai"], "prod_ai", save_dir)
     drug = drug.drop_duplicates(subset=["primaryid"], keep="first")
 
     logger.info(f"Number of reports in the 'drug' file after rxnorm mapping: {drug.shape[0]}")
@@ -109,7 +167,40 @@ def preprocess_drug_df(drug):
     return drug
 
 
-def preprocess_reac_df(reac: pd.DataFrame, debug: bool = False) -> pd.DataFrame:
+def preprocess_drug_df(drug, save_dir: str = "data"):
+    logger.info(f"Starting number of reports in 'drug' file: {drug.shape[0]}")
+
+    drug = filter_drug_rows(drug, save_dir=save_dir)
+    logger.info(
+        f"Number of primary suspect reports in the 'drug' file after unknown/null drugs are removed: {drug.shape[0]}"
+    )
+
+    return map_drug_names(drug, save_dir)
+
+
+def preprocess_drug_chunks(
+    chunks: Iterable[pd.DataFrame], save_dir: str = "data"
+) -> pd.DataFrame:
+    """
+    Streaming version of preprocess_drug_df. The row-wise filtering and name cleaning
+    run on each chunk as it is read, so only the surviving rows are ever held in memory.
+    """
+    n_rows = 0
+    kept = []
+    for chunk in chunks:
+        n_rows += chunk.shape[0]
+        kept.append(filter_drug_rows(chunk, save_dir=save_dir))
+    logger.info(f"Starting number of reports in 'drug' file: {n_rows}")
+    logger.info(
+        f"Number of primary suspect reports in the 'drug' file after unknown/null drugs are removed: {sum(df.shape[0] for df in kept)}"
+    )
+
+    return map_drug_names(concat_chunks(kept), save_dir)
+
+
+def preprocess_reac_df(
+    reac: pd.DataFrame, debug: bool = False, save_dir: str = "data"
+) -> pd.DataFrame:
     if debug:
         logger.debug(f"Starting number of reports in 'reac' file: {reac.shape[0]}")
 
@@ -121,14 +212,51 @@ def preprocess_reac_df(reac: pd.DataFrame, debug: bool = False) -> pd.DataFrame:
             f"Number of reports in the 'reac' file after unknown/null reacs are removed: {reac.shape[0]}"
         )
 
-    reac["pt"] = reac["pt"].str.strip().str.lower()  # Transforms to lowercase
-    reac["pt"] = reac["pt"].map(
-        lambda x: x[:-1] if str(x).endswith(".") else x
-    )  # Removes periods at the end of drug names
+    # Strips whitespace, lowercases and removes periods at the end of PTs, once per distinct PT
+    reac["pt"] = normalize_names(reac["pt"], "pt", save_dir)
 
     return reac
 
 
+def preprocess_reac_chunks(
+    chunks: Iterable[pd.DataFrame], debug: bool = False, save_dir: str = "data"
+) -> pd.DataFrame:
+    """
+    Streaming version of preprocess_reac_df, applied to each chunk as it is read.
+    """
+    return concat_chunks([preprocess_reac_df(chunk, debug, save_dir) for chunk in chunks])
+
+
+def concat_chunks(chunks: List[pd.DataFrame]) -> pd.DataFrame:
+    """
+    Concatenate preprocessed chunks. Categorical columns are restored afterwards since
+    chunks with different categories would otherwise be concatenated as object.
+    """
+    if not chunks:
+        return pd.DataFrame()
+    df = pd.concat(chunks)
+    for column in chunks[0].select_dtypes("category").columns:
+        df[column] = df[column].astype("category")
+    return df
+
+
+def unit_factors(units: pd.Series, factors: Dict[str, float]) -> np.ndarray:
+    """
+    Look up the conversion factor of every row's unit code. The factors are looked up
+    once per category and indexed by the categorical codes. Missing units and units
+    without a factor get 1 (the value is kept as is).
+    Args:
+        units: pd.Series (unit codes, e.g. age_cod)
+        factors: dict of upper case unit code -> factor
+    """
+    units = units.astype("category")
+    lookup = (
+        units.cat.categories.astype(str).str.upper().map(factors).fillna(1.0).to_numpy(float)
+    )
+    # Missing units have code -1, which lands on the trailing 1
+    return np.append(lookup, 1.0)[units.cat.codes.to_numpy()]
+
+
 def preprocess_demo_df(demo: pd.DataFrame, debug: bool = False) -> pd.DataFrame:
     if debug:
         logger.debug(f"Starting number of reports in 'demo' file: {demo.shape[0]}")
@@ -145,35 +273,27 @@ def preprocess_demo_df(demo: pd.DataFrame, debug: bool = False) -> pd.DataFrame:
             "fda_dt",
             "event_dt",
         ]
+        # Older quarters don't have a weight unit
+        + (["wt_cod"] if "wt_cod" in demo.columns else [])
     ]
 
-    # If multiple reports have the same primary id and case id, keep the most recent one
-    demo = demo.sort_values(
-        by=["caseid", "fda_dt", "primaryid"], ascending=[True, False, False]
-    )
-    demo = demo.drop_duplicates(subset=["caseid"], keep="first")
+    # If a case has multiple reports, keep its latest version (see src/deduplication.py)
+    demo = demo[is_latest_version(demo)]
 
     if debug:
         logger.debug(
             f"Number of reports in the 'demo' file after duplicate primary/case id combos are removed: {demo.shape[0]}"
         )
 
-    demo = demo[pd.notnull(demo["age"])]
-    demo = demo[demo.age_cod != "dec"].reset_index(drop=True)
-    demo["age"] = demo["age"].apply(pd.to_numeric, errors="coerce")
-    demo["age"] = np.where(
-        demo["age_cod"] == "MON", demo["age"] * 1 / 12, demo["age"]
-    )  # mounth
-    demo["age"] = np.where(
-        demo["age_cod"] == "WK", demo["age"] * 1 / 52, demo["age"]
-    )  # week
-    demo["age"] = np.where(
-        demo["age_cod"] == "DY", demo["age"] * 1 / 365, demo["age"]
-    )  # day
-    demo["age"] = np.where(
-        demo["age_cod"] == "HR", demo["age"] * 1 / 8760, demo["age"]
-    )  # hour
-    demo = demo.drop(["age_cod"], axis=1)
+    demo = demo[pd.notnull(demo["age"])].reset_index(drop=True)
+    # Ages in years, weights in kilograms
+    demo["age"] = pd.to_numeric(demo["age"], errors="coerce") * unit_factors(
+        demo["age_cod"], AGE_UNIT_YEARS
+    )
+    demo["wt"] = pd.to_numeric(demo["wt"], errors="coerce")
+    if "wt_cod" in demo.columns:
+        demo["wt"] = demo["wt"] * unit_factors(demo["wt_cod"], WEIGHT_UNIT_KG)
+    demo = demo.drop(columns=["age_cod", "wt_cod"], errors="ignore")
 
     if debug:
         logger.debug(
@@ -187,23 +307,9 @@ def preprocess_outc_df(outc: pd.DataFrame, debug: bool = False) -> pd.DataFrame:
     if debug:
         logger.debug(f"Starting number of reports in 'outc' file: {outc.shape[0]}")
 
-    outcomes_agg = aggregate_faers_table(outc, 'outc', debug)
-
-    # Map to human-readable outcomes
-    outcome_labels = {
-        'DE': 'Death',
-        'LT': 'Life-Threatening',
-        'HO': 'Hospitalization',
-        'DS': 'Disability',
-        'CA': 'Congenital Anomaly',
-        'RI': 'Required Intervention',
-        'OT': 'Other Serious'
-    }
-
-    # Map each code in the list to its human-readable label
-    outcomes_agg['outc_label'] = outcomes_agg['outc_cod'].apply(lambda codes: [outcome_labels[code] for code in codes])
-
-    return outcomes_agg
+    # One outcome bitmask per report, labels are decoded on demand with
+    # src.outcomes.decode_outcome_labels
+    return aggregate_faers_table(outc, 'outc', debug)
 
 
 def preprocess_ther_df(ther: pd.DataFrame, debug: bool = False) -> pd.DataFrame:
@@ -0,0 +1,137 @@
+"""
+Columnar store for preprocessed FAERS quarters.
+
+Each preprocessed table of a quarter is written to
+data/processed_faers/<quarter>/<table>.parquet so later loads can skip parsing the
+raw $-delimited TXT files and rerunning preprocess.
+"""
+
+import json
+import os
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import pandas as pd
+from loguru import logger
+
+from src.utils import atomic_directory
+from src.utils.manifest import record_processed
+from src.vocabulary import get_vocabulary_epoch
+
+
+def get_processed_quarter_dir(quarter: str, save_dir: str = "data") -> Path:
+    """
+    Get the processed store directory for a quarter (e.g. data/processed_faers/2024Q1)
+    """
+    return Path(save_dir).joinpath("processed_faers", quarter)
+
+
+def is_quarter_processed(
+    quarter: str,
+    table_names: List[str],
+    save_dir: str = "data",
+    fingerprint: Optional[str] = None,
+) -> bool:
+    """
+    Check if every table of the quarter has been written to the processed store.
+    If a fingerprint is given, the stored quarter must also have been built from it.
+    """
+    quarter_dir = get_processed_quarter_dir(quarter, save_dir)
+    if not all(quarter_dir.joinpath(f"{name}.parquet").exists() for name in table_names):
+        return False
+    if fingerprint is None:
+        return True
+    meta_path = quarter_dir / "_meta.json"
+    if not meta_path.exists():
+        return False
+    with open(meta_path) as f:
+        return json.load(f).get("fingerprint") == fingerprint
+
+
+def get_processed_epoch(quarter: str, save_dir: str = "data") -> Optional[str]:
+    """
+    Get the epoch of the vocabulary a stored quarter was encoded with (see
+    src/vocabulary.py), or None if it wasn't recorded
+    """
+    meta_path = get_processed_quarter_dir(quarter, save_dir) / "_meta.json"
+    if not meta_path.exists():
+        return None
+    with open(meta_path) as f:
+        return json.load(f).get("vocabulary_epoch")
+
+
+def write_processed_quarter(
+    quarter: str,
+    tables: Dict[str, pd.DataFrame],
+    save_dir: str = "data",
+    compression: str = "zstd",
+    fingerprint: Optional[str] = None,
+) -> Path:
+    """
+    Write the preprocessed tables of a quarter to the processed store.
+
+    The tables are written to a temporary directory that is renamed into place once
+    every file is complete, so readers never see a partially written quarter. The
+    epoch of the vocabulary their names are encoded with is recorded next to them.
+    Args:
+        quarter: str (e.g. "2024Q1")
+        tables: dict of table name -> preprocessed DataFrame
+        save_dir: str
+        compression: parquet compression codec
+        fingerprint: fingerprint of the source files the tables were built from
+    Returns:
+        Path to the quarter directory
+    """
+    quarter_dir = get_processed_quarter_dir(quarter, save_dir)
+    with atomic_directory(quarter_dir) as tmp_dir:
+        for name, df in tables.items():
+            df.to_parquet(tmp_dir / f"{name}.parquet", compression=compression)
+        with open(tmp_dir / "_meta.json", "w") as f:
+            json.dump(
+                {"fingerprint": fingerprint, "vocabulary_epoch": get_vocabulary_epoch(save_dir)},
+                f,
+            )
+    record_processed(quarter, save_dir)
+    logger.info(f"Wrote processed {quarter} to {quarter_dir}")
+    return quarter_dir
+
+
+def write_processed_table(
+    quarter: str,
+    name: str,
+    df: pd.DataFrame,
+    save_dir: str = "data",
+    compression: str = "zstd",
+) -> Path:
+    """
+    Add one table to a quarter that's already in the processed store (e.g. a table
+    older versions of the store didn't have). The file is written under a temporary
+    name and renamed into place.
+    Returns:
+        Path to the table's parquet file
+    """
+    path = get_processed_quarter_dir(quarter, save_dir) / f"{name}.parquet"
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    df.to_parquet(tmp_path, compression=compression)
+    os.replace(tmp_path, path)
+    logger.info(f"Added {name} to processed {quarter}")
+    return path
+
+
+def read_processed_quarter(
+    quarter: str, table_names: List[str], save_dir: str = "data"
+) -> Dict[str, pd.DataFrame]:
+    """
+    Read the preprocessed tables of a quarter from the processed store.
+    Args:
+        quarter: str (e.g. "2024Q1")
+        table_names: names of the tables to read
+        save_dir: str
+    Returns:
+        dict of table name -> DataFrame
+    """
+    quarter_dir = get_processed_quarter_dir(quarter, save_dir)
+    logger.info(f"Reading processed {quarter} from {quarter_dir}")
+    return {
+        name: pd.read_parquet(quarter_dir / f"{name}.parquet") for name in table_names
+    }
@@ -0,0 +1,214 @@
+"""
+Ragged (CSR) arrays of per-report values.
+
+A RaggedArray stores a list of values per row the way a sparse CSR matrix stores
+its rows: int32 offsets into one flat array of int32 dictionary codes, plus the
+distinct values the codes point into. Row i holds
+categories[codes[offsets[i]:offsets[i + 1]]].
+
+The per-report aggregates (the PTs, reporter codes and therapy start dates of each
+report) are built as RaggedArrays with a few vectorized passes instead of a Python
+function per group, and are handed to pandas as pyarrow list<dictionary<int32, ...>>
+columns, which have the same layout. Membership tests such as "does the report
+have all of these PTs" then run on the codes without building Python lists.
+"""
+
+from dataclasses import dataclass
+from typing import Iterable, List, Optional
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+
+# Columns identifying a report
+REPORT_KEYS = ["primaryid", "caseid"]
+
+
+def _offsets(lengths: np.ndarray) -> np.ndarray:
+    offsets = np.zeros(len(lengths) + 1, dtype=np.int32)
+    np.cumsum(lengths, out=offsets[1:])
+    return offsets
+
+
+@dataclass
+class RaggedArray:
+    """
+    A list of dictionary-encoded values per row.
+
+    Attributes:
+        offsets (np.ndarray): int32, row i's codes are codes[offsets[i]:offsets[i + 1]]
+        codes (np.ndarray): int32 positions in categories
+        categories (pd.Index): distinct values
+        keys (pd.DataFrame): report keys of the rows (sorted), None if the rows aren't reports
+    """
+
+    offsets: np.ndarray
+    codes: np.ndarray
+    categories: pd.Index
+    keys: Optional[pd.DataFrame] = None
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    @property
+    def lengths(self) -> np.ndarray:
+        """
+        Number of values in each row
+        """
+        return np.diff(self.offsets)
+
+    def row_ids(self) -> np.ndarray:
+        """
+        Row of every value in codes
+        """
+        return np.repeat(np.arange(len(self), dtype=np.int32), self.lengths)
+
+    @classmethod
+    def from_table(
+        cls, df: pd.DataFrame, column: str, keys: List[str] = REPORT_KEYS
+    ) -> "RaggedArray":
+        """
+        Collect the distinct non-null values of column per report, in order of first
+        appearance. Every report in df gets a row, sorted by its keys, even if all its
+        values are null.
+        Args:
+            df: pd.DataFrame (one row per value, e.g. the REAC table)
+            column: str (e.g. "pt")
+            keys: List[str] (columns identifying a report)
+        """
+        grouped = df.groupby(keys, sort=True)
+        rows = grouped.ngroup().to_numpy()
+        report_keys = grouped.size().index.to_frame(index=False)
+
+        values = df[column]
+        valid = values.notna().to_numpy()
+        codes, categories = pd.factorize(values[valid])
+        rows = rows[valid]
+
+        # Drop repeated values within a report, keeping the first one
+        pairs = rows.astype(np.int64) * max(len(categories), 1) + codes
+        first = ~pd.Series(pairs).duplicated().to_numpy()
+        rows, codes = rows[first], codes[first]
+
+        # A stable sort by row keeps each report's values in order of appearance
+        order = np.argsort(rows, kind="stable")
+        return cls(
+            offsets=_offsets(np.bincount(rows, minlength=len(report_keys))),
+            codes=codes[order].astype(np.int32),
+            categories=pd.Index(categories),
+            keys=report_keys,
+        )
+
+    @classmethod
+    def from_arrow(cls, array: pa.ListArray) -> "RaggedArray":
+        """
+        View a pyarrow list array as a RaggedArray. Null lists become empty rows.
+        """
+        lengths = pc.list_value_length(array).fill_null(0).to_numpy(zero_copy_only=False)
+        # flatten only returns the values of this (possibly sliced) array
+        flat = array.flatten()
+        if pa.types.is_dictionary(flat.type):
+            codes = flat.indices.to_numpy(zero_copy_only=False)
+            categories = pd.Index(flat.dictionary.to_pandas())
+        else:
+            codes, categories = pd.factorize(flat.to_pandas())
+        return cls(_offsets(lengths), codes.astype(np.int32), pd.Index(categories))
+
+    @classmethod
+    def from_series(cls, series: pd.Series) -> "RaggedArray":
+        """
+        Read a column of lists, either a pyarrow list column (as built by to_series)
+        or an object column of Python lists. Missing values become empty rows.
+        """
+        if isinstance(series.dtype, pd.ArrowDtype) and pa.types.is_list(
+            series.dtype.pyarrow_dtype
+        ):
+            # The column is a pyarrow ChunkedArray, its chunks may have different dictionaries
+            array = series.array.__arrow_array__()
+            if array.num_chunks == 0:
+                return cls.from_arrow(pa.array([], type=array.type))
+            return cls.concat([cls.from_arrow(chunk) for chunk in array.chunks])
+
+        exploded = series.reset_index(drop=True).explode()
+        valid = exploded.notna().to_numpy()
+        codes, categories = pd.factorize(exploded[valid])
+        rows = exploded.index.to_numpy()[valid]
+        return cls(
+            offsets=_offsets(np.bincount(rows, minlength=len(series))),
+            codes=codes.astype(np.int32),
+            categories=pd.Index(categories),
+        )
+
+    @classmethod
+    def concat(cls, arrays: List["RaggedArray"]) -> "RaggedArray":
+        """
+        Stack RaggedArrays row-wise, merging their categories
+        """
+        categories = arrays[0].categories
+        for array in arrays[1:]:
+            categories = categories.append(
+                array.categories[~array.categories.isin(categories)]
+            )
+        codes = [
+            categories.get_indexer(array.categories)[array.codes] for array in arrays
+        ]
+        keys = (
+            pd.concat([array.keys for array in arrays], ignore_index=True)
+            if all(array.keys is not None for array in arrays)
+            else None
+        )
+        return cls(
+            offsets=_offsets(np.concatenate([array.lengths for array in arrays])),
+            codes=np.concatenate(codes).astype(np.int32),
+            categories=categories,
+            keys=keys,
+        )
+
+    def to_arrow(self) -> pa.ListArray:
+        """
+        Convert to a pyarrow list<dictionary<int32, ...>> array, without copying the codes
+        """
+        dictionary = pa.DictionaryArray.from_arrays(
+            pa.array(self.codes, type=pa.int32()), pa.array(self.categories.to_numpy())
+        )
+        return pa.ListArray.from_arrays(pa.array(self.offsets, type=pa.int32()), dictionary)
+
+    def to_series(self, name: Optional[str] = None) -> pd.Series:
+        """
+        Convert to a pandas column of lists backed by the arrow array
+        """
+        return pd.Series(pd.arrays.ArrowExtensionArray(self.to_arrow()), name=name)
+
+    def to_frame(self, column: str) -> pd.DataFrame:
+        """
+        Convert to a DataFrame of the report keys and a list column, e.g. to merge
+        into other per-report tables
+        """
+        frame = self.keys.copy()
+        frame[column] = self.to_series()
+        return frame
+
+    def count_matches(self, values: Iterable) -> np.ndarray:
+        """
+        Number of the given distinct values each row contains
+        """
+        wanted = self.categories.get_indexer(pd.unique(pd.Series(list(values), dtype=object)))
+        hits = np.isin(self.codes, wanted[wanted >= 0])
+        rows = self.row_ids()[hits]
+        # Count a value once per row even if a row repeats it
+        pairs = pd.Series(rows.astype(np.int64) * max(len(self.categories), 1) + self.codes[hits])
+        return np.bincount(rows[~pairs.duplicated().to_numpy()], minlength=len(self))
+
+    def contains_any(self, values: Iterable) -> np.ndarray:
+        """
+        Rows containing any of the given values
+        """
+        return self.count_matches(values) > 0
+
+    def contains_all(self, values: Iterable) -> np.ndarray:
+        """
+        Rows containing every one of the given values
+        """
+        values = set(values)
+        return self.count_matches(values) == len(values)
@@ -9,14 +9,17 @@ import lxml
 import time
 import shutil
 import warnings
+import zlib
+import threading
 import requests
 from tqdm import tqdm
-from io import BytesIO
-from zipfile import ZipFile
+from zipfile import BadZipFile, ZipFile
 from bs4 import BeautifulSoup
 from urllib.request import urlopen
 from loguru import logger
-from typing import List
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Dict, List, Optional
+from urllib.parse import urlparse
 from pathlib import Path
 from loguru import logger
 from src.utils.supported_quarters import (
@@ -25,6 +28,43 @@ from src.utils.supported_quarters import (
     get_available_processed_quarters,
 )
 from src.parse_quarters import ParseQuarters
+from src.utils import atomic_directory
+from src.utils.manifest import record_download
+from src.utils.quarter_archive import get_quarter_archive_path
+
+# Size of the chunks a download is streamed to disk in
+DOWNLOAD_CHUNK_SIZE = 1024 * 1024
+
+# Outcomes of download_quarter
+DOWNLOADED = "downloaded"
+SKIPPED = "skipped"
+FAILED = "failed"
+
+
+class HostThrottle:
+    """
+    Spaces out the requests made to each host by at least delay seconds, across threads.
+
+    Args:
+        delay: float (minimum seconds between the start of two requests to the same host)
+    """
+
+    def __init__(self, delay: float = 1.0):
+        self.delay = delay
+        self._lock = threading.Lock()
+        self._next_request: Dict[str, float] = {}
+
+    def wait(self, url: str) -> None:
+        """
+        Block until a request to the url's host is allowed
+        """
+        host = urlparse(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_request.get(host, now))
+            self._next_request[host] = start + self.delay
+        if start > now:
+            time.sleep(start - now)
 
 
 def flatten_directory(directory_path: str, debug: bool = False):
@@ -81,22 +121,146 @@ def flatten_directory(directory_path: str, debug: bool = False):
                 logger.error(f"Error removing directory {root}: {e}")
 
 
+def get_part_path(archive_path: Path) -> Path:
+    """
+    Get the path a download is streamed to before it's verified
+    (e.g. data/faers_reports/.2024Q1.zip.part)
+    """
+    archive_path = Path(archive_path)
+    return archive_path.with_name(f".{archive_path.name}.part")
+
+
+def parse_total_size(response: requests.Response, offset: int) -> Optional[int]:
+    """
+    Get the full size of the file being downloaded from the response headers, or None
+    if the server didn't send it
+    """
+    content_range = response.headers.get("Content-Range")
+    if content_range and "/" in content_range:
+        total = content_range.rsplit("/", 1)[1]
+        if total.isdigit():
+            return int(total)
+    content_length = response.headers.get("Content-Length")
+    if content_length and content_length.isdigit():
+        return offset + int(content_length)
+    return None
+
+
+def download_archive(
+    url: str,
+    archive_path: Path,
+    chunk_size: int = DOWNLOAD_CHUNK_SIZE,
+    timeout: int = 200,
+    progress: bool = False,
+) -> Path:
+    """
+    Stream a zip archive to disk and move it to archive_path once it has been verified.
+
+    The response is written to a .part file next to archive_path in chunks. If a .part
+    file is left over from an interrupted download, only the rest of the file is
+    requested (with an HTTP Range header). Servers that ignore the range restart the
+    download from scratch.
+    Args:
+        url: str
+        archive_path: Path (e.g. data/faers_reports/2024Q1.zip)
+        chunk_size: int (bytes written per chunk)
+        timeout: int (seconds to wait for the server)
+        progress: bool (show a progress bar of the bytes downloaded)
+    Returns:
+        archive_path
+    """
+    archive_path = Path(archive_path)
+    archive_path.parent.mkdir(parents=True, exist_ok=True)
+    part_path = get_part_path(archive_path)
+    offset = part_path.stat().st_size if part_path.exists() else 0
+    headers = {"Range": f"bytes={offset}-"} if offset else {}
+    if offset:
+        logger.info(f"Resuming download of {archive_path.name} at byte {offset}")
+
+    with requests.get(url, headers=headers, stream=True, timeout=timeout) as r:
+        if r.status_code == 416:
+            # Nothing left to request, the part file is already complete
+            total_size = parse_total_size(r, offset)
+        else:
+            r.raise_for_status()
+            if offset and r.status_code != 206:
+                logger.warning(f"Server ignored the range request, restarting {archive_path.name}")
+                offset = 0
+            total_size = parse_total_size(r, offset)
+            with open(part_path, "ab" if offset else "wb") as f, tqdm(
+                total=total_size,
+                initial=offset,
+                unit="B",
+                unit_scale=True,
+                desc=archive_path.name,
+                leave=False,
+                disable=not progress,
+            ) as bar:
+                for chunk in r.iter_content(chunk_size=chunk_size):
+                    f.write(chunk)
+                    bar.update(len(chunk))
+
+    verify_archive(part_path, total_size)
+    os.replace(part_path, archive_path)
+    return archive_path
+
+
+def verify_archive(archive_path: Path, expected_size: Optional[int] = None) -> None:
+    """
+    Check that a downloaded archive has the size the server reported and that every
+    member passes its CRC check. A corrupt archive is deleted so the next attempt
+    downloads it again.
+    Args:
+        archive_path: Path
+        expected_size: int (size reported by the server, not checked if None)
+    """
+    archive_path = Path(archive_path)
+    size = archive_path.stat().st_size
+    if expected_size is not None and size != expected_size:
+        # Keep a short file so the download can be resumed
+        if size > expected_size:
+            archive_path.unlink()
+        logger.error(f"{archive_path} is {size} bytes, expected {expected_size}")
+        raise ValueError(f"{archive_path} is {size} bytes, expected {expected_size}")
+    try:
+        with ZipFile(archive_path) as z:
+            bad_member = z.testzip()
+    except (BadZipFile, zlib.error, EOFError) as e:
+        archive_path.unlink()
+        logger.error(f"{archive_path} is not a valid zip archive: {e}")
+        raise ValueError(f"{archive_path} is not a valid zip archive: {e}")
+    if bad_member is not None:
+        archive_path.unlink()
+        logger.error(f"{archive_path} failed the CRC check on {bad_member}")
+        raise ValueError(f"{archive_path} failed the CRC check on {bad_member}")
+
+
 class FAERSDownloader:
     """
     Class for downloading FAERS data from the FDA website.
     Used by methods below to download the raw data
     """
 
-    def __init__(self, save_dir: str = "data", debug: bool = False):
+    def __init__(
+        self, save_dir: str = "data", debug: bool = False, request_delay: float = 1.0
+    ):
         self.debug = debug
         self.base_save_dir = Path(save_dir)
         self.save_dir = self.base_save_dir.joinpath("faers_reports")
+        self.throttle = HostThrottle(request_delay)
+
+    @property
+    def available_online_quarters(self) -> Dict[str, str]:
+        """
+        Quarters on the FAERS download page -> archive urls, from the shared cached index
+        """
+        return get_available_online_quarters(self.base_save_dir)
 
     def help(self):
         """
         List all available online quarters and print example message
         """
-        print(f"Available online quarters: {get_available_online_quarters()}")
+        print(f"Available online quarters: {self.available_online_quarters}")
         print(
             f"Available locally downloaded quarters: {get_available_downloaded_quarters(self.base_save_dir)}"
         )
@@ -121,7 +285,11 @@ class FAERSDownloader:
         end_quarter: int = 4,
         overwrite: bool = False,
         remove_pdfs: bool = True,
-    ):
+        keep_archive: bool = False,
+        max_workers: int = 1,
+        retries: int = 3,
+        backoff: float = 2.0,
+    ) -> Dict[str, List[str]]:
         """
         Download a range of quarters of FAERS data
         Args:
@@ -131,63 +299,137 @@ class FAERSDownloader:
             end_quarter: int = 4
             overwrite: bool = False
             remove_pdfs: bool = True
+            keep_archive: bool = False
+            max_workers: int = 1 (number of quarters downloaded at once)
+            retries: int = 3 (attempts after the first before a quarter counts as failed)
+            backoff: float = 2.0 (seconds before the first retry, doubled on every retry)
+        Returns:
+            dict of outcome ("downloaded", "skipped", "failed") -> quarters
         """
         # Parse the quarters and make sure they are available online
         parsed_quarters = ParseQuarters(
             start_year, end_year, start_quarter, end_quarter, debug=self.debug
         )
-        parsed_quarters.check_available_online()
+        parsed_quarters.check_available_online(self.base_save_dir)
         parsed_quarters = parsed_quarters.get_quarters()
 
-        # Get the available online quarters
-        self.available_online_quarters = get_available_online_quarters()
+        logger.info(f"Downloading {len(parsed_quarters)} quarters with {max_workers} workers")
+        summary = {DOWNLOADED: [], SKIPPED: [], FAILED: []}
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                executor.submit(
+                    self.download_quarter_with_retries,
+                    quarter,
+                    retries,
+                    backoff,
+                    overwrite=overwrite,
+                    remove_pdfs=remove_pdfs,
+                    keep_archive=keep_archive,
+                ): quarter
+                for quarter in parsed_quarters
+            }
+            for future in tqdm(as_completed(futures), total=len(futures), desc="Quarters"):
+                summary[future.result()].append(futures[future])
 
-        logger.info(f"Downloading {len(parsed_quarters)} quarters")
-        for quarter in tqdm(parsed_quarters):
-            self.download_quarter(quarter, overwrite=overwrite, remove_pdfs=remove_pdfs)
+        for status, quarters in summary.items():
+            quarters.sort()
+            logger.info(f"{len(quarters)} quarters {status}: {quarters}")
+        return summary
+
+    def download_quarter_with_retries(
+        self, quarter: str, retries: int = 3, backoff: float = 2.0, **kwargs
+    ) -> str:
+        """
+        Download a single quarter, retrying with exponential backoff on errors. Retries
+        resume from the partially downloaded archive.
+        Args:
+            quarter: the quarter of the FAERS data to download
+            retries: attempts after the first before giving up
+            backoff: seconds before the first retry, doubled on every retry
+            kwargs: passed to download_quarter
+        Returns:
+            "downloaded", "skipped" or "failed"
+        """
+        for attempt in range(retries + 1):
+            try:
+                return self.download_quarter(quarter, **kwargs)
+            except Exception as e:
+                if attempt == retries:
+                    logger.error(f"Failed to download {quarter} after {retries + 1} attempts: {e}")
+                    return FAILED
+                delay = backoff * 2**attempt
+                logger.warning(f"Error downloading {quarter} ({e}), retrying in {delay:.1f}s")
+                time.sleep(delay)
 
     def download_quarter(
-        self, quarter: str, overwrite: bool = False, remove_pdfs: bool = True
-    ):
+        self,
+        quarter: str,
+        overwrite: bool = False,
+        remove_pdfs: bool = True,
+        keep_archive: bool = False,
+    ) -> str:
         """
         Download a single quarter of FAERS data
         Args:
             quarter: the quarter of the FAERS data to download
             overwrite: whether to overwrite the existing data
             remove_pdfs: whether to remove pdf files (READMEs)
+            keep_archive: keep the original zip at faers_reports/<quarter>.zip instead of
+                extracting it, the loader reads the tables straight from the archive
+        Returns:
+            "downloaded", "skipped" (already downloaded) or "failed" (not available online)
         """
         # Check if the quarter is available online
         if quarter not in self.available_online_quarters:
             logger.error(
                 f"Quarter {quarter} not found in {self.available_online_quarters.keys()}"
             )
-            return
+            return FAILED
 
         # Check if the quarter has already been downloaded
-        if os.path.exists(os.path.join(self.save_dir, quarter)):
+        archive_path = get_quarter_archive_path(quarter, self.base_save_dir)
+        if os.path.exists(os.path.join(self.save_dir, quarter)) or archive_path.exists():
             if not overwrite:
                 logger.warning(f"Skipping {quarter} because it already exists")
-                return
+                return SKIPPED
             else:
                 logger.warning(f"Overwriting {quarter}")
 
         logger.info(f"Downloading {quarter}")
 
-        # Create the quarter folder if it doesn't exist
-        os.makedirs(os.path.join(self.save_dir, quarter), exist_ok=True)
-
-        # Download the zip file
+        # Stream the zip file to disk, it's only moved into place once verified
         download_folder_path = os.path.join(self.save_dir, quarter)
         url = self.available_online_quarters[quarter]
-        r = requests.get(url, timeout=200)
+        if overwrite:
+            for path in (archive_path, get_part_path(archive_path)):
+                if path.exists():
+                    os.remove(path)
+        self.throttle.wait(url)
+        download_archive(url, archive_path, progress=True)
 
-        # Unzip
+        if keep_archive:
+            # An extracted copy would shadow the archive
+            if os.path.exists(download_folder_path):
+                shutil.rmtree(download_folder_path)
+            record_download(quarter, self.base_save_dir)
+            logger.info(f"{quarter} archive saved to {archive_path}")
+            return DOWNLOADED
+
+        # Unzip into a temporary folder that replaces the quarter folder once cleaned
         logger.info(f"Unzipping files")
-        z = ZipFile(BytesIO(r.content))
-        z.extractall(download_folder_path)
-        r.close()
+        with atomic_directory(Path(download_folder_path)) as tmp_dir:
+            with ZipFile(archive_path) as z:
+                z.extractall(tmp_dir)
+                # Keep the archive's CRCs so the extracted files don't need hashing
+                checksums = {
+                    info.filename.rsplit("/", 1)[-1].lower(): f"{info.CRC:08x}"
+                    for info in z.infolist()
+                }
+            clean_quarter_dir(tmp_dir, remove_pdfs=remove_pdfs)
+        os.remove(archive_path)
+        record_download(quarter, self.base_save_dir, checksums)
         logger.info(f"{quarter} downloaded to {download_folder_path}")
-        self.clean_files(quarter, remove_pdfs=remove_pdfs)
+        return DOWNLOADED
 
     def clean_files(self, quarter: str, remove_pdfs: bool = True):
         """
@@ -197,16 +439,25 @@ class FAERSDownloader:
             remove_pdfs: whether to remove pdf files (READMEs)
         """
         logger.info(f"Cleaning {quarter} files")
-        quarter_dir = os.path.join(self.save_dir, quarter)
-        flatten_directory(quarter_dir)
+        clean_quarter_dir(os.path.join(self.save_dir, quarter), remove_pdfs=remove_pdfs)
 
-        # Remove pdf files
-        if remove_pdfs:
-            files = os.listdir(quarter_dir)
-            for file in files:
-                if file.endswith(".pdf"):
-                    os.remove(os.path.join(quarter_dir, file))
-            logger.info(f"Removed all pdf files")
+
+def clean_quarter_dir(quarter_dir: str, remove_pdfs: bool = True):
+    """
+    Move files from ascii up a level and remove non-FAERS data files.
+    Args:
+        quarter_dir: the directory the quarter was extracted to
+        remove_pdfs: whether to remove pdf files (READMEs)
+    """
+    flatten_directory(quarter_dir)
+
+    # Remove pdf files
+    if remove_pdfs:
+        files = os.listdir(quarter_dir)
+        for file in files:
+            if file.endswith(".pdf"):
+                os.remove(os.path.join(quarter_dir, file))
+        logger.info(f"Removed all pdf files")
 
 
 def download_single_faers_quarter(
@@ -215,12 +466,13 @@ def download_single_faers_quarter(
     overwrite: bool = False,
     remove_pdfs: bool = True,
     debug: bool = False,
+    keep_archive: bool = False,
 ):
     """
     Download a single quarter of FAERS data
     """
     downloader = FAERSDownloader(save_dir=save_dir, debug=debug)
-    downloader.download_quarter(quarter, overwrite, remove_pdfs)
+    downloader.download_quarter(quarter, overwrite, remove_pdfs, keep_archive)
 
 
 def download_faers_quarters(
@@ -232,7 +484,12 @@ def download_faers_quarters(
     overwrite: bool = False,
     remove_pdfs: bool = True,
     debug: bool = False,
-):
+    keep_archive: bool = False,
+    max_workers: int = 1,
+    retries: int = 3,
+    backoff: float = 2.0,
+    request_delay: float = 1.0,
+) -> Dict[str, List[str]]:
     """
     Download a range of quarters of FAERS data
 
@@ -245,8 +502,26 @@ def download_faers_quarters(
         overwrite: bool = False
         remove_pdfs: bool = True
         debug: bool = False
+        keep_archive: bool = False (keep each quarter as its zip instead of extracting it)
+        max_workers: int = 1 (number of quarters downloaded at once)
+        retries: int = 3 (attempts after the first before a quarter counts as failed)
+        backoff: float = 2.0 (seconds before the first retry, doubled on every retry)
+        request_delay: float = 1.0 (minimum seconds between requests to the FDA server)
+    Returns:
+        dict of outcome ("downloaded", "skipped", "failed") -> quarters
     """
-    downloader = FAERSDownloader(save_dir=save_dir, debug=debug)
-    downloader.download_quarters(
-        start_year, end_year, start_quarter, end_quarter, overwrite, remove_pdfs
+    downloader = FAERSDownloader(
+        save_dir=save_dir, debug=debug, request_delay=request_delay
+    )
+    return downloader.download_quarters(
+        start_year,
+        end_year,
+        start_quarter,
+        end_quarter,
+        overwrite,
+        remove_pdfs,
+        keep_archive,
+        max_workers,
+        retries,
+        backoff,
     )
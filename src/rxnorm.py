@@ -0,0 +1,112 @@
+"""
+Compiled RxNorm mapping index.
+
+data/rxnorm_map.csv maps cleaned FAERS drug names to their best match and RxNorm
+names. It's compiled once into data/rxnorm_map.parquet (rebuilt whenever the CSV
+changes) and loaded at most once per process into an RxNormIndex, which looks up
+a whole column of drug names at once instead of merging on the name strings.
+"""
+
+from pathlib import Path
+from typing import Dict, Tuple
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+RXNORM_MAP_PATH = Path("data/rxnorm_map.csv")
+
+# Columns the mapping adds to the drug table
+RXNORM_COLUMNS = ["best_match_name", "rxnorm_name"]
+
+
+def get_compiled_path(mapping_path: Path) -> Path:
+    """
+    Get the compiled index of a mapping CSV (e.g. data/rxnorm_map.parquet)
+    """
+    return Path(mapping_path).with_suffix(".parquet")
+
+
+def compile_rxnorm_mapping(mapping_path: Path = RXNORM_MAP_PATH) -> pd.DataFrame:
+    """
+    Compile the mapping CSV to parquet, keeping the first row for each drug name (the
+    row the old left merge + drop_duplicates on primaryid ended up keeping).
+    Returns:
+        the compiled mapping
+    """
+    mapping_path = Path(mapping_path)
+    logger.info(f"Compiling RxNorm mapping from: {mapping_path}")
+    mapping = pd.read_csv(mapping_path, usecols=["drugname"] + RXNORM_COLUMNS)
+    mapping = mapping.dropna(subset=["drugname"]).drop_duplicates(
+        subset=["drugname"], keep="first"
+    )
+    compiled_path = get_compiled_path(mapping_path)
+    tmp_path = compiled_path.with_name(f".{compiled_path.name}.tmp")
+    try:
+        mapping.to_parquet(tmp_path, index=False)
+        tmp_path.replace(compiled_path)
+    except OSError as e:
+        logger.warning(f"Could not write the compiled RxNorm mapping to {compiled_path}: {e}")
+    return mapping
+
+
+class RxNormIndex:
+    """
+    In-memory index from cleaned drug name to its RxNorm mapping.
+
+    Args:
+        mapping: pd.DataFrame (drugname, best_match_name, rxnorm_name with unique drugnames)
+    """
+
+    def __init__(self, mapping: pd.DataFrame):
+        self.names = pd.Index(mapping["drugname"])
+        # One extra null row that unmatched names point to
+        self.values = {
+            column: np.append(mapping[column].to_numpy(dtype=object), np.nan)
+            for column in RXNORM_COLUMNS
+        }
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+    def lookup(self, drugnames: pd.Series) -> pd.DataFrame:
+        """
+        Look up the RxNorm mapping of every drug name. Each distinct name is only
+        hashed once.
+        Returns:
+            DataFrame of best_match_name and rxnorm_name aligned with drugnames
+            (null where a name has no mapping)
+        """
+        codes, uniques = pd.factorize(drugnames)
+        positions = self.names.get_indexer(uniques)
+        positions[positions == -1] = len(self.names)
+        # Null drug names have code -1, which also lands on the null row
+        rows = np.append(positions, len(self.names))[codes]
+        return pd.DataFrame(
+            {column: values[rows] for column, values in self.values.items()},
+            index=drugnames.index,
+        )
+
+
+# One index per mapping file and process, rebuilt if the file changes
+_rxnorm_indexes: Dict[Tuple[str, int], RxNormIndex] = {}
+
+
+def get_rxnorm_index(mapping_path: Path = RXNORM_MAP_PATH) -> RxNormIndex:
+    """
+    Get the RxNorm index for a mapping CSV, reading it from the compiled parquet
+    (compiling it first if it's missing or older than the CSV). Memoized per process.
+    """
+    mapping_path = Path(mapping_path)
+    mtime = mapping_path.stat().st_mtime_ns
+    key = (str(mapping_path.resolve()), mtime)
+    if key not in _rxnorm_indexes:
+        compiled_path = get_compiled_path(mapping_path)
+        if compiled_path.exists() and compiled_path.stat().st_mtime_ns >= mtime:
+            logger.info(f"Loading RxNorm mapping from: {compiled_path}")
+            mapping = pd.read_parquet(compiled_path)
+        else:
+            mapping = compile_rxnorm_mapping(mapping_path)
+        _rxnorm_indexes.clear()
+        _rxnorm_indexes[key] = RxNormIndex(mapping)
+    return _rxnorm_indexes[key]
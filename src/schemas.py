@@ -0,0 +1,119 @@
+"""
+Schemas for parsing the raw FAERS tables.
+
+Each schema declares the columns preprocess needs from a quarter's $-delimited
+TXT file and the compact dtypes to parse them with. Columns not listed are never
+materialized.
+"""
+
+import csv
+from dataclasses import dataclass
+from typing import Any, Dict, List
+
+# Format of the raw quarter files. FAERS fields are never quoted, so quote characters
+# inside drug names or PTs are kept as literal text.
+FAERS_DELIMITER = "$"
+FAERS_ENCODING = "ISO-8859-1"
+
+# Compact dtypes shared by the schemas below. Only the report keys are plain int64,
+# other integer fields are nullable since any of them can be blank in a raw file
+ID = "int64"
+SEQ = "Int64"
+CODE = "category"
+NAME = "string[pyarrow]"
+
+
+@dataclass(frozen=True)
+class TableSchema:
+    """
+    Columns and dtypes used to parse a raw FAERS table.
+
+    Attributes:
+        columns (List[str]): Columns to parse, every other column in the file is skipped
+        dtypes (Dict[str, str]): Dtypes of the parsed columns, columns not listed are inferred
+    """
+
+    columns: List[str]
+    dtypes: Dict[str, str]
+
+    def read_csv_kwargs(self) -> Dict[str, Any]:
+        """
+        Keyword arguments for pd.read_csv that apply the column pruning and dtypes.
+        Columns missing from a file (e.g. in older quarters) are ignored.
+        """
+        columns = set(self.columns)
+        return {
+            "sep": FAERS_DELIMITER,
+            "encoding": FAERS_ENCODING,
+            "quoting": csv.QUOTE_NONE,
+            "usecols": lambda column: column in columns,
+            "dtype": self.dtypes,
+        }
+
+
+TABLE_SCHEMAS: Dict[str, TableSchema] = {
+    "reac": TableSchema(
+        columns=["primaryid", "caseid", "pt", "drug_rec_act"],
+        dtypes={"primaryid": ID, "caseid": ID, "pt": NAME, "drug_rec_act": NAME},
+    ),
+    "drug": TableSchema(
+        columns=[
+            "primaryid",
+            "caseid",
+            "role_cod",
+            "drugname",
+            "prod_ai",
+            "drug_seq",
+            "dechal",
+            "rechal",
+        ],
+        dtypes={
+            "primaryid": ID,
+            "caseid": ID,
+            "role_cod": CODE,
+            "drugname": NAME,
+            "prod_ai": NAME,
+            "drug_seq": SEQ,
+            "dechal": CODE,
+            "rechal": CODE,
+        },
+    ),
+    "demo": TableSchema(
+        columns=[
+            "primaryid",
+            "caseid",
+            "caseversion",
+            "age_cod",
+            "age",
+            "sex",
+            "wt",
+            "wt_cod",
+            "fda_dt",
+            "event_dt",
+        ],
+        dtypes={
+            "primaryid": ID,
+            "caseid": ID,
+            "caseversion": SEQ,
+            "age_cod": CODE,
+            "sex": CODE,
+            "wt_cod": CODE,
+        },
+    ),
+    "outc": TableSchema(
+        columns=["primaryid", "caseid", "outc_cod"],
+        dtypes={"primaryid": ID, "caseid": ID, "outc_cod": CODE},
+    ),
+    "ther": TableSchema(
+        columns=["primaryid", "caseid", "start_dt", "dsg_drug_seq"],
+        dtypes={"primaryid": ID, "caseid": ID, "dsg_drug_seq": SEQ},
+    ),
+    "indi": TableSchema(
+        columns=["primaryid", "caseid", "indi_drug_seq", "indi_pt"],
+        dtypes={"primaryid": ID, "caseid": ID, "indi_drug_seq": SEQ, "indi_pt": NAME},
+    ),
+    "rpsr": TableSchema(
+        columns=["primaryid", "caseid", "rpsr_cod"],
+        dtypes={"primaryid": ID, "caseid": ID, "rpsr_cod": CODE},
+    ),
+}
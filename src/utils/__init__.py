@@ -3,3 +3,4 @@ from .supported_quarters import (
     get_available_processed_quarters,
     convert_quarter_file_str,
 )
+from .atomic import atomic_directory, file_lock
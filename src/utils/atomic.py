@@ -0,0 +1,71 @@
+import fcntl
+import os
+import shutil
+import tempfile
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Iterator
+
+
+@contextmanager
+def atomic_directory(target_dir: Path) -> Iterator[Path]:
+    """
+    Context manager for writing a directory atomically. Files are written into the
+    yielded temporary directory, which is renamed to target_dir once the block
+    completes, so concurrent readers never see a half-written directory.
+
+    If another process publishes target_dir while this one is writing, the copy
+    that got there first is kept.
+
+    Args:
+        target_dir (Path): The directory to create or replace
+    """
+    target_dir = Path(target_dir)
+    target_dir.parent.mkdir(parents=True, exist_ok=True)
+    tmp_dir = Path(
+        tempfile.mkdtemp(
+            prefix=f".{target_dir.name}.", suffix=".tmp", dir=target_dir.parent
+        )
+    )
+    os.chmod(tmp_dir, 0o755)
+    try:
+        yield tmp_dir
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+
+    # Move an existing directory aside first, a directory can't be renamed onto a non-empty one
+    old_dir = None
+    if target_dir.exists():
+        old_dir = target_dir.with_name(f".{target_dir.name}.{uuid.uuid4().hex}.old")
+        try:
+            target_dir.rename(old_dir)
+        except OSError:
+            old_dir = None
+    try:
+        tmp_dir.rename(target_dir)
+    except OSError:
+        # Another writer published target_dir in the meantime
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    if old_dir is not None:
+        shutil.rmtree(old_dir, ignore_errors=True)
+
+
+@contextmanager
+def file_lock(lock_path: Path) -> Iterator[None]:
+    """
+    Context manager holding an exclusive lock on lock_path, across threads and
+    processes. Used to serialize read-modify-write updates of shared files.
+
+    Args:
+        lock_path (Path): The lock file, created if missing
+    """
+    lock_path = Path(lock_path)
+    lock_path.parent.mkdir(parents=True, exist_ok=True)
+    with open(lock_path, "a") as f:
+        fcntl.flock(f, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f, fcntl.LOCK_UN)
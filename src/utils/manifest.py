@@ -0,0 +1,338 @@
+"""
+Manifest of the quarters in a save_dir.
+
+data/manifest.json records, for every quarter, the raw files it was downloaded as
+(the archive or the extracted TXT files, with byte sizes and CRC32 checksums) and
+the tables written to the processed store (with row counts and byte sizes). It is
+updated when a quarter is downloaded or converted, so availability checks and load
+planning can read it instead of walking data/faers_reports and data/processed_faers.
+
+A listing is only rescanned from disk when the directory itself changed (its mtime
+differs from the one recorded in the manifest), e.g. after a quarter was copied in
+or deleted by hand. Quarters found that way are recorded without checksums until
+verify is run:
+
+    python -m src.utils.manifest show
+    python -m src.utils.manifest verify
+"""
+
+import argparse
+import json
+import os
+import zlib
+from pathlib import Path
+from typing import Dict, List, Optional
+from zipfile import ZipFile
+
+import pyarrow.parquet as pq
+from loguru import logger
+
+from src.utils.atomic import file_lock
+
+MANIFEST_FILE = "manifest.json"
+
+# Sections of a quarter's manifest entry, and the directory each one is listed from
+RAW = "raw"
+PROCESSED = "processed"
+SECTION_DIRS = {RAW: "faers_reports", PROCESSED: "processed_faers"}
+
+# In-process copy of each manifest, keyed by path and invalidated by its mtime
+_manifest_memo: Dict[str, tuple] = {}
+
+
+def get_manifest_path(save_dir: str = "data") -> Path:
+    """
+    Get the manifest path (e.g. data/manifest.json)
+    """
+    return Path(save_dir) / MANIFEST_FILE
+
+
+def read_manifest(save_dir: str = "data") -> dict:
+    """
+    Read the manifest, or an empty one if it hasn't been written yet
+    """
+    path = get_manifest_path(save_dir)
+    try:
+        mtime = path.stat().st_mtime_ns
+    except FileNotFoundError:
+        return {"quarters": {}, "listings": {}}
+    key = str(path.resolve())
+    cached = _manifest_memo.get(key)
+    if cached is None or cached[0] != mtime:
+        with open(path) as f:
+            cached = (mtime, json.load(f))
+        _manifest_memo[key] = cached
+    return cached[1]
+
+
+def update_manifest(save_dir: str, update) -> dict:
+    """
+    Apply update (a function that modifies the manifest dict in place) to the
+    manifest under a lock, so concurrent downloads and conversions don't lose entries
+    """
+    path = get_manifest_path(save_dir)
+    with file_lock(path.with_name(f".{path.name}.lock")):
+        manifest = json.loads(json.dumps(read_manifest(save_dir)))
+        update(manifest)
+        tmp_path = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(manifest, f, indent=1, sort_keys=True)
+        os.replace(tmp_path, path)
+    return manifest
+
+
+def _file_crc32(path: Path, chunk_size: int = 1024 * 1024) -> str:
+    crc = 0
+    with open(path, "rb") as f:
+        while chunk := f.read(chunk_size):
+            crc = zlib.crc32(chunk, crc)
+    return f"{crc:08x}"
+
+
+def scan_raw_quarter(
+    quarter: str,
+    save_dir: str = "data",
+    checksums: Optional[Dict[str, str]] = None,
+    compute_checksums: bool = False,
+) -> Optional[dict]:
+    """
+    Describe the raw files of a downloaded quarter.
+
+    For an archive the member sizes and CRC32s are read from the zip directory, which
+    costs no decompression. For an extracted folder the checksums are taken from
+    checksums (e.g. the CRCs of the archive it was extracted from), computed if
+    compute_checksums is set, and left empty otherwise.
+    Args:
+        quarter: str (e.g. "2024Q1")
+        save_dir: str
+        checksums: dict of lowercased file name -> CRC32 hex digest
+        compute_checksums: bool
+    Returns:
+        manifest entry, or None if the quarter isn't downloaded
+    """
+    reports_dir = Path(save_dir) / SECTION_DIRS[RAW]
+    quarter_dir = reports_dir / quarter
+    archive_path = reports_dir / f"{quarter}.zip"
+    checksums = checksums or {}
+    files = {}
+    if quarter_dir.is_dir():
+        source = "directory"
+        for path in sorted(quarter_dir.iterdir()):
+            if path.is_file() and path.suffix.lower() == ".txt":
+                crc = checksums.get(path.name.lower())
+                if crc is None and compute_checksums:
+                    crc = _file_crc32(path)
+                files[path.name] = {"bytes": path.stat().st_size, "crc32": crc}
+        archive_bytes = None
+    elif archive_path.exists():
+        source = "archive"
+        with ZipFile(archive_path) as archive:
+            for info in archive.infolist():
+                name = info.filename.rsplit("/", 1)[-1]
+                if name.lower().endswith(".txt"):
+                    files[name] = {"bytes": info.file_size, "crc32": f"{info.CRC:08x}"}
+        archive_bytes = archive_path.stat().st_size
+    else:
+        return None
+    return {
+        "source": source,
+        "archive_bytes": archive_bytes,
+        "bytes": sum(f["bytes"] for f in files.values()),
+        "files": files,
+    }
+
+
+def scan_processed_quarter(quarter: str, save_dir: str = "data") -> Optional[dict]:
+    """
+    Describe a quarter in the processed store. Row counts are read from the parquet
+    footers, no data is read.
+    Returns:
+        manifest entry, or None if the quarter isn't in the store
+    """
+    quarter_dir = Path(save_dir) / SECTION_DIRS[PROCESSED] / quarter
+    if not quarter_dir.is_dir():
+        return None
+    meta_path = quarter_dir / "_meta.json"
+    fingerprint = None
+    if meta_path.exists():
+        with open(meta_path) as f:
+            fingerprint = json.load(f).get("fingerprint")
+    paths = sorted(quarter_dir.glob("*.parquet"))
+    return {
+        "fingerprint": fingerprint,
+        "rows": {path.stem: pq.read_metadata(path).num_rows for path in paths},
+        "bytes": sum(path.stat().st_size for path in paths),
+    }
+
+
+def record_download(
+    quarter: str, save_dir: str = "data", checksums: Optional[Dict[str, str]] = None
+) -> None:
+    """
+    Record a downloaded quarter's raw files in the manifest
+    """
+    entry = scan_raw_quarter(quarter, save_dir, checksums)
+    update_manifest(
+        save_dir, lambda m: m["quarters"].setdefault(quarter, {}).update({RAW: entry})
+    )
+
+
+def record_processed(quarter: str, save_dir: str = "data") -> None:
+    """
+    Record a quarter written to the processed store, with its row count per table
+    """
+    entry = scan_processed_quarter(quarter, save_dir)
+    update_manifest(
+        save_dir, lambda m: m["quarters"].setdefault(quarter, {}).update({PROCESSED: entry})
+    )
+
+
+def _record_listing(manifest: dict, save_dir: str, section: str) -> None:
+    listing_dir = Path(save_dir) / SECTION_DIRS[section]
+    if listing_dir.exists():
+        manifest.setdefault("listings", {})[section] = listing_dir.stat().st_mtime_ns
+
+
+def _list_section_dir(save_dir: str, section: str) -> List[str]:
+    """
+    Scan the quarters in data/faers_reports or data/processed_faers
+    """
+    listing_dir = Path(save_dir) / SECTION_DIRS[section]
+    quarters = set()
+    for path in listing_dir.iterdir():
+        # Skip in-progress writes and partial downloads (e.g. .2024Q1.tmp, .2024Q1.zip.part)
+        if path.name.startswith("."):
+            continue
+        if path.is_dir():
+            quarters.add(path.name)
+        elif section == RAW and path.suffix.lower() == ".zip":
+            quarters.add(path.stem)
+    return sorted(quarters)
+
+
+def get_manifest_quarters(save_dir: str, section: str) -> List[str]:
+    """
+    Get the quarters with a raw or processed entry in the manifest. If the directory
+    has changed since the manifest last saw it, it's rescanned and the manifest
+    brought up to date first.
+    Args:
+        save_dir: str
+        section: "raw" or "processed"
+    """
+    listing_dir = Path(save_dir) / SECTION_DIRS[section]
+    if not listing_dir.exists():
+        return []
+    manifest = read_manifest(save_dir)
+    if manifest.get("listings", {}).get(section) != listing_dir.stat().st_mtime_ns:
+        manifest = _sync_section(save_dir, section)
+    return sorted(
+        quarter for quarter, entry in manifest["quarters"].items() if entry.get(section)
+    )
+
+
+def _sync_section(save_dir: str, section: str) -> dict:
+    """
+    Add quarters found on disk to the manifest and drop the ones that are gone
+    """
+    on_disk = set(_list_section_dir(save_dir, section))
+    logger.debug(f"Rescanning {Path(save_dir) / SECTION_DIRS[section]} for the manifest")
+
+    def update(manifest: dict) -> None:
+        quarters = manifest["quarters"]
+        for quarter in list(quarters):
+            if quarter not in on_disk and quarters[quarter].get(section):
+                del quarters[quarter][section]
+        for quarter in on_disk:
+            if not quarters.get(quarter, {}).get(section):
+                if section == RAW:
+                    entry = scan_raw_quarter(quarter, save_dir)
+                else:
+                    entry = scan_processed_quarter(quarter, save_dir)
+                quarters.setdefault(quarter, {})[section] = entry
+        _record_listing(manifest, save_dir, section)
+
+    try:
+        return update_manifest(save_dir, update)
+    except OSError as e:
+        # A read-only save_dir still works, it's just rescanned every time
+        logger.debug(f"Could not update the manifest: {e}")
+        manifest = {"quarters": {}}
+        update(manifest)
+        return manifest
+
+
+def get_quarter_size(quarter: str, save_dir: str = "data") -> int:
+    """
+    Estimated amount of work to load a quarter: its processed size if it's been
+    converted, else the size of its raw TXT files, else 0 if it's unknown
+    """
+    entry = read_manifest(save_dir)["quarters"].get(quarter, {})
+    for section in (PROCESSED, RAW):
+        if entry.get(section) and entry[section].get("bytes"):
+            return entry[section]["bytes"]
+    return 0
+
+
+def verify_manifest(save_dir: str = "data") -> Dict[str, List[str]]:
+    """
+    Recompute the checksums of the extracted quarters and compare them with the
+    manifest. Missing checksums are filled in.
+    Returns:
+        dict of quarter -> files whose size or checksum doesn't match
+    """
+    mismatches = {}
+    get_manifest_quarters(save_dir, RAW)
+    for quarter, entry in read_manifest(save_dir)["quarters"].items():
+        if not entry.get(RAW):
+            continue
+        recorded = entry[RAW]["files"]
+        known = {name.lower(): f["crc32"] for name, f in recorded.items() if f["crc32"]}
+        current = scan_raw_quarter(quarter, save_dir, compute_checksums=True)
+        if current is None:
+            continue
+        bad = [
+            name
+            for name, f in current["files"].items()
+            if name not in recorded
+            or recorded[name]["bytes"] != f["bytes"]
+            or known.get(name.lower(), f["crc32"]) != f["crc32"]
+        ]
+        if bad:
+            mismatches[quarter] = bad
+        else:
+            update_manifest(save_dir, lambda m: m["quarters"][quarter].update({RAW: current}))
+    return mismatches
+
+
+def build_parser() -> argparse.ArgumentParser:
+    p = argparse.ArgumentParser(prog="python -m src.utils.manifest")
+    p.add_argument("--save-dir", default="data")
+    sub = p.add_subparsers(dest="cmd", required=True)
+    sub.add_parser("show", help="Print the size and row counts of every quarter")
+    sub.add_parser("verify", help="Check the raw files against their recorded checksums")
+    return p
+
+
+def main():
+    args = build_parser().parse_args()
+    if args.cmd == "show":
+        get_manifest_quarters(args.save_dir, RAW)
+        get_manifest_quarters(args.save_dir, PROCESSED)
+        for quarter, entry in sorted(read_manifest(args.save_dir)["quarters"].items()):
+            raw = entry.get(RAW) or {}
+            processed = entry.get(PROCESSED) or {}
+            print(
+                f"{quarter}  raw={raw.get('source', '-')} {raw.get('bytes') or 0:>12} bytes  "
+                f"processed={processed.get('bytes') or 0:>12} bytes  rows={processed.get('rows') or '-'}"
+            )
+    elif args.cmd == "verify":
+        mismatches = verify_manifest(args.save_dir)
+        for quarter, files in mismatches.items():
+            print(f"{quarter}: {files} don't match the manifest")
+        if mismatches:
+            raise SystemExit(1)
+        print("All quarters match the manifest")
+
+
+if __name__ == "__main__":
+    main()
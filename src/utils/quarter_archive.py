@@ -0,0 +1,94 @@
+"""
+Locate the raw TXT files of a downloaded quarter.
+
+A quarter is either extracted to data/faers_reports/<quarter>/ or kept as the
+original FDA archive at data/faers_reports/<quarter>.zip. Tables are read from the
+extracted directory when it exists and streamed straight out of the archive
+otherwise. File names are matched case-insensitively since the FDA archives aren't
+consistent about it (e.g. ASCII/DRUG24Q1.txt vs ascii/drug12q4.txt).
+"""
+
+from contextlib import contextmanager
+from pathlib import Path
+from typing import BinaryIO, Iterator, Optional
+from zipfile import ZipFile
+
+from src.utils.supported_quarters import convert_quarter_file_str
+
+
+def get_quarter_dir(quarter: str, save_dir: str = "data") -> Path:
+    """
+    Get the extracted directory of a quarter (e.g. data/faers_reports/2024Q1)
+    """
+    return Path(save_dir).joinpath("faers_reports", quarter)
+
+
+def get_quarter_archive_path(quarter: str, save_dir: str = "data") -> Path:
+    """
+    Get the archive of a quarter (e.g. data/faers_reports/2024Q1.zip)
+    """
+    return Path(save_dir).joinpath("faers_reports", f"{quarter}.zip")
+
+
+def get_table_file_name(quarter: str, table: str) -> str:
+    """
+    Get the file name of a raw table (e.g. DRUG24Q1.txt)
+    """
+    return f"{table.upper()}{convert_quarter_file_str(quarter)}.txt"
+
+
+def find_quarter_file(quarter_dir: Path, file_name: str) -> Optional[Path]:
+    """
+    Find a file in an extracted quarter directory, ignoring case
+    """
+    path = Path(quarter_dir) / file_name
+    if path.exists():
+        return path
+    for candidate in Path(quarter_dir).iterdir():
+        if candidate.name.lower() == file_name.lower():
+            return candidate
+    return None
+
+
+def find_archive_member(archive: ZipFile, file_name: str) -> Optional[str]:
+    """
+    Find a member of a quarter archive by its base name, ignoring case and the
+    folder it sits in
+    """
+    for member in archive.namelist():
+        if member.rsplit("/", 1)[-1].lower() == file_name.lower():
+            return member
+    return None
+
+
+@contextmanager
+def open_raw_table(quarter: str, table: str, save_dir: str = "data") -> Iterator[BinaryIO]:
+    """
+    Open a raw table of a downloaded quarter as a binary stream, from the extracted
+    directory or directly from the archive without extracting it.
+    Args:
+        quarter: str (e.g. "2024Q1")
+        table: str (e.g. "drug")
+        save_dir: str
+    Raises:
+        FileNotFoundError: if the quarter or its table file isn't available
+    """
+    file_name = get_table_file_name(quarter, table)
+    quarter_dir = get_quarter_dir(quarter, save_dir)
+    archive_path = get_quarter_archive_path(quarter, save_dir)
+
+    if quarter_dir.is_dir():
+        path = find_quarter_file(quarter_dir, file_name)
+        if path is None:
+            raise FileNotFoundError(f"{file_name} not found in {quarter_dir}")
+        with open(path, "rb") as f:
+            yield f
+    elif archive_path.exists():
+        with ZipFile(archive_path) as archive:
+            member = find_archive_member(archive, file_name)
+            if member is None:
+                raise FileNotFoundError(f"{file_name} not found in {archive_path}")
+            with archive.open(member) as f:
+                yield f
+    else:
+        raise FileNotFoundError(f"Quarter {quarter} not found in {quarter_dir.parent}")
@@ -1,37 +1,48 @@
+import json
 import os
-from pathlib import Path
 import re
-from urllib.request import urlopen
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import requests
 from bs4 import BeautifulSoup
-from typing import List
+from loguru import logger
+
+from src.utils.manifest import PROCESSED, RAW, get_manifest_quarters
 
 faers_download_page = [
     "https://fis.fda.gov/extensions/FPD-QDE-FAERS/FPD-QDE-FAERS.html"
 ]
 
+# On-disk cache of the download page index, and how long it's used before revalidating
+ONLINE_INDEX_FILE = "online_quarters.json"
+ONLINE_INDEX_TTL = 24 * 60 * 60
+
+# In-process copy of the index, keyed by the cache path
+_online_index_memo: Dict[str, dict] = {}
+_online_index_lock = threading.Lock()
+
 
 def get_available_downloaded_quarters(save_dir: str = "data") -> List[str]:
     """
     Checks the quarters in data/faers_reports and returns a list of the supported quarters.
+    A quarter is downloaded if it has been extracted to a folder or kept as its
+    original archive (e.g. data/faers_reports/2024Q1.zip).
+
+    Read from the manifest, the directory is only rescanned when it has changed.
     """
-    supported_quarters = []
-    for folder in Path(save_dir).joinpath("faers_reports").iterdir():
-        if folder.is_dir():
-            supported_quarters.append(folder.name)
-    # Sort the quarters
-    supported_quarters.sort()
-    return supported_quarters
+    return get_manifest_quarters(save_dir, RAW)
 
 
 def get_available_processed_quarters(save_dir: str = "data") -> List[str]:
     """
     Checks the quarters in data/processed_faers and returns a list of the supported quarters.
+
+    Read from the manifest, the directory is only rescanned when it has changed.
     """
-    supported_quarters = []
-    for folder in Path(save_dir).joinpath("processed_faers").iterdir():
-        if folder.is_dir():
-            supported_quarters.append(folder.name)
-    return supported_quarters
+    return get_manifest_quarters(save_dir, PROCESSED)
 
 
 def convert_quarter_file_str(quarter_string: str) -> str:
@@ -59,29 +70,115 @@ def convert_quarter_file_str(quarter_string: str) -> str:
         )
 
 
-def get_available_online_quarters() -> dict[str, str]:
+def parse_online_quarters(page_html: bytes) -> Dict[str, str]:
+    """
+    Find the ASCII quarter archives linked from a FAERS download page
+    :return: dict files = {"YYYYQN":"url"}
+    """
+    try:
+        page_bs = BeautifulSoup(page_html, "lxml")
+    except Exception:
+        page_bs = BeautifulSoup(page_html)
+    files = {}
+    for url in page_bs.find_all("a"):
+        a_string = str(url)
+        if "ASCII" in a_string.upper():
+            t_url = url.get("href")
+            # Extract year and quarter from the URL
+            match = re.search(r"ascii_(\d{4})([qQ]\d)", t_url)
+            if match:
+                year = match.group(1)
+                quarter = match.group(2).upper()  # Convert to uppercase
+                key = f"{year}{quarter}"
+                files[key] = t_url
+    return files
+
+
+def get_online_index_path(save_dir: str = "data") -> Path:
+    """
+    Get the on-disk cache of the download page index (e.g. data/online_quarters.json)
+    """
+    return Path(save_dir) / ONLINE_INDEX_FILE
+
+
+def _read_online_index(index_path: Path) -> dict:
+    try:
+        with open(index_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {"pages": {}}
+
+
+def _write_online_index(index_path: Path, index: dict) -> None:
+    index_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = index_path.with_name(f".{index_path.name}.{os.getpid()}.tmp")
+    with open(tmp_path, "w") as f:
+        json.dump(index, f)
+    os.replace(tmp_path, index_path)
+
+
+def _fetch_online_page(page_url: str, cached_page: Optional[dict]) -> dict:
+    """
+    Fetch and parse a download page, revalidating the cached copy with its
+    ETag/Last-Modified so an unchanged page isn't downloaded or parsed again
+    """
+    headers = {}
+    if cached_page:
+        if cached_page.get("etag"):
+            headers["If-None-Match"] = cached_page["etag"]
+        if cached_page.get("last_modified"):
+            headers["If-Modified-Since"] = cached_page["last_modified"]
+    r = requests.get(page_url, headers=headers, timeout=60)
+    if r.status_code == 304 and cached_page:
+        logger.debug(f"{page_url} not modified")
+        return cached_page
+    r.raise_for_status()
+    return {
+        "etag": r.headers.get("ETag"),
+        "last_modified": r.headers.get("Last-Modified"),
+        "quarters": parse_online_quarters(r.content),
+    }
+
+
+def get_available_online_quarters(
+    save_dir: str = "data", ttl: float = ONLINE_INDEX_TTL, refresh: bool = False
+) -> Dict[str, str]:
     """
     find all web urls in the FAERS download page
+
+    The parsed index is cached in data/online_quarters.json and reused for ttl seconds.
+    After that the page is revalidated with a conditional GET and only downloaded and
+    parsed again if it changed. One copy is kept in memory per process, so repeated
+    calls don't touch the disk or the network. If the page can't be reached a stale
+    cached index is used.
+    Args:
+        save_dir: str
+        ttl: float (seconds the cached index is used without revalidating)
+        refresh: bool (revalidate now regardless of ttl)
     :return: dict files = {"YYYYQN":"url"}
     """
+    index_path = get_online_index_path(save_dir)
+    key = str(index_path.resolve())
+    with _online_index_lock:
+        index = _online_index_memo.get(key) or _read_online_index(index_path)
+        fresh = time.time() - index.get("checked_at", 0) < ttl
+        if refresh or not fresh or set(index["pages"]) != set(faers_download_page):
+            try:
+                index = {
+                    "checked_at": time.time(),
+                    "pages": {
+                        page_url: _fetch_online_page(page_url, index["pages"].get(page_url))
+                        for page_url in faers_download_page
+                    },
+                }
+                _write_online_index(index_path, index)
+            except (requests.RequestException, OSError) as e:
+                if not index["pages"]:
+                    raise
+                logger.warning(f"Could not refresh the FAERS download page, using the cached index: {e}")
+        _online_index_memo[key] = index
+
     files = {}
-    for page_url in faers_download_page:
-        try:
-            request = urlopen(page_url)
-            page_bs = BeautifulSoup(request, "lxml")
-            request.close()
-        except:
-            request = urlopen(page_url)
-            page_bs = BeautifulSoup(request)
-        for url in page_bs.find_all("a"):
-            a_string = str(url)
-            if "ASCII" in a_string.upper():
-                t_url = url.get("href")
-                # Extract year and quarter from the URL
-                match = re.search(r"ascii_(\d{4})([qQ]\d)", t_url)
-                if match:
-                    year = match.group(1)
-                    quarter = match.group(2).upper()  # Convert to uppercase
-                    key = f"{year}{quarter}"
-                    files[key] = t_url
+    for page in index["pages"].values():
+        files.update(page["quarters"])
     return files
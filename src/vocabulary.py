@@ -0,0 +1,213 @@
+"""
+Global dictionary encoding of drug names and MedDRA PTs.
+
+The name columns of the preprocessed tables (drugname, prod_ai, best_match_name,
+rxnorm_name, pt and indi_pt) are stored in the processed store and the cache as
+int32 ids into a vocabulary shared by every quarter:
+
+    data/vocabulary/drug.parquet   drug names
+    data/vocabulary/pt.parquet     reaction and indication PTs
+
+A value's id is its row in the file. The files only ever grow: a quarter with new
+names appends them under a lock, so ids already written stay valid. The vocabulary
+epoch (a random id written when the vocabulary is first created) is part of every
+quarter's fingerprint, so if the vocabulary is deleted the stored quarters are
+rebuilt instead of being decoded against the wrong names. The processed store also
+records the epoch of each quarter, and a quarter without raw files to rebuild it
+from is refused if it was encoded with another vocabulary.
+
+The loader decodes the ids into categoricals whose categories are the vocabulary,
+so every quarter shares the same categories and joins and group-bys run on the
+integer codes.
+"""
+
+import os
+import uuid
+from pathlib import Path
+from typing import Dict, Tuple
+
+import numpy as np
+import pandas as pd
+from loguru import logger
+
+from src.utils import file_lock
+
+VOCABULARY_DIR = "vocabulary"
+EPOCH_FILE = "epoch"
+
+# Vocabulary used by each encoded column, per table
+ENCODED_COLUMNS: Dict[str, Dict[str, str]] = {
+    "drug": {
+        "drugname": "drug",
+        "prod_ai": "drug",
+        "best_match_name": "drug",
+        "rxnorm_name": "drug",
+    },
+    "reac": {"pt": "pt"},
+    "indi": {"indi_pt": "pt"},
+}
+
+
+def get_vocabulary_dir(save_dir: str = "data") -> Path:
+    """
+    Get the vocabulary directory (e.g. data/vocabulary)
+    """
+    return Path(save_dir) / VOCABULARY_DIR
+
+
+def get_vocabulary_epoch(save_dir: str = "data") -> str:
+    """
+    Get the id of the vocabulary in save_dir, creating it if it doesn't exist yet
+    """
+    directory = get_vocabulary_dir(save_dir)
+    epoch_path = directory / EPOCH_FILE
+    if not epoch_path.exists():
+        directory.mkdir(parents=True, exist_ok=True)
+        with file_lock(directory / ".lock"):
+            if not epoch_path.exists():
+                tmp_path = epoch_path.with_name(f".{EPOCH_FILE}.{os.getpid()}.tmp")
+                tmp_path.write_text(uuid.uuid4().hex)
+                os.replace(tmp_path, epoch_path)
+    return epoch_path.read_text().strip()
+
+
+class Vocabulary:
+    """
+    Append-only mapping of strings to int32 ids, persisted to a parquet file.
+
+    Args:
+        name: str (e.g. "drug")
+        save_dir: str
+    """
+
+    def __init__(self, name: str, save_dir: str = "data"):
+        self.name = name
+        self.dir = get_vocabulary_dir(save_dir)
+        self.path = self.dir / f"{name}.parquet"
+        self.values = pd.Index([], dtype=object)
+        self._mtime = None
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def refresh(self) -> None:
+        """
+        Reload the vocabulary if another process has grown it
+        """
+        try:
+            mtime = self.path.stat().st_mtime_ns
+        except FileNotFoundError:
+            return
+        if mtime != self._mtime:
+            self.values = pd.Index(pd.read_parquet(self.path)["value"], dtype=object)
+            self._mtime = mtime
+
+    def encode(self, values: pd.Series) -> np.ndarray:
+        """
+        Map values to their ids, appending the ones the vocabulary doesn't have yet.
+        Nulls are encoded as -1.
+        Returns:
+            int32 array aligned with values
+        """
+        codes, uniques = pd.factorize(values)
+        uniques = pd.Index(uniques, dtype=object)
+        self.refresh()
+        ids = self.values.get_indexer(uniques)
+        if (ids == -1).any():
+            with file_lock(self.dir / ".lock"):
+                # Other processes may have added some of them in the meantime
+                self.refresh()
+                new = uniques[self.values.get_indexer(uniques) == -1]
+                if len(new):
+                    self._append(new)
+            ids = self.values.get_indexer(uniques)
+        # Null values have code -1, which lands on the trailing -1
+        return np.append(ids, -1).astype(np.int32)[codes]
+
+    def _append(self, new: pd.Index) -> None:
+        values = self.values.append(new)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+        pd.DataFrame({"value": values.to_numpy()}).to_parquet(tmp_path, index=False)
+        os.replace(tmp_path, self.path)
+        self.values = values
+        self._mtime = self.path.stat().st_mtime_ns
+        logger.debug(f"Added {len(new)} values to the {self.name} vocabulary ({len(values)} total)")
+
+    def decode(self, ids: np.ndarray) -> pd.Categorical:
+        """
+        Map ids back to their values, as a categorical over the whole vocabulary
+        """
+        ids = np.asarray(ids)
+        if len(ids) and ids.max() >= len(self.values):
+            self.refresh()
+        return pd.Categorical.from_codes(ids, categories=self.values)
+
+
+# One vocabulary per save_dir, name and process
+_vocabularies: Dict[Tuple[str, str], Vocabulary] = {}
+
+
+def get_vocabulary(name: str, save_dir: str = "data") -> Vocabulary:
+    """
+    Get the vocabulary with the given name (e.g. "drug"). Memoized per process.
+    """
+    key = (str(Path(save_dir).resolve()), name)
+    if key not in _vocabularies:
+        _vocabularies[key] = Vocabulary(name, save_dir)
+    return _vocabularies[key]
+
+
+def encode_table(df: pd.DataFrame, table: str, save_dir: str = "data") -> pd.DataFrame:
+    """
+    Replace the name columns of a preprocessed table with their int32 vocabulary ids
+    Args:
+        df: pd.DataFrame (preprocessed table)
+        table: str (e.g. "drug")
+        save_dir: str
+    """
+    columns = {
+        column: name
+        for column, name in ENCODED_COLUMNS.get(table, {}).items()
+        if column in df.columns
+    }
+    if not columns:
+        return df
+    df = df.copy()
+    for column, name in columns.items():
+        df[column] = get_vocabulary(name, save_dir).encode(df[column])
+    return df
+
+
+def decode_table(df: pd.DataFrame, table: str, save_dir: str = "data") -> pd.DataFrame:
+    """
+    Replace the vocabulary ids in a table with categoricals of their values. Columns
+    that aren't encoded (e.g. read from a store written before encoding) are left as is.
+    Args:
+        df: pd.DataFrame (table with encoded columns)
+        table: str (e.g. "drug")
+        save_dir: str
+    """
+    columns = {
+        column: name
+        for column, name in ENCODED_COLUMNS.get(table, {}).items()
+        if column in df.columns and pd.api.types.is_integer_dtype(df[column])
+    }
+    if not columns:
+        return df
+    df = df.copy()
+    for column, name in columns.items():
+        df[column] = get_vocabulary(name, save_dir).decode(df[column].to_numpy())
+    return df
+
+
+def decode_ids(ids, name: str, save_dir: str = "data") -> pd.Series:
+    """
+    Decode vocabulary ids (e.g. a column read straight from the processed store)
+    Args:
+        ids: array-like of int ids, -1 for nulls
+        name: str (vocabulary name, "drug" or "pt")
+        save_dir: str
+    """
+    index = ids.index if isinstance(ids, pd.Series) else None
+    return pd.Series(get_vocabulary(name, save_dir).decode(np.asarray(ids)), index=index)
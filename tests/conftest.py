@@ -0,0 +1,164 @@
+"""
+Synthetic FAERS quarters for the tests.
+
+make_quarters writes small raw $-delimited quarters to data/faers_reports the way
+the FDA ships them. Cases are followed up across and within quarters, and some
+of their versions have no age, so the within-quarter dedup, the age filter and the
+cross-quarter dedup all have something to drop.
+"""
+
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.schemas import FAERS_DELIMITER, FAERS_ENCODING
+from src.utils.quarter_archive import get_quarter_dir, get_table_file_name
+
+QUARTERS = ["2023Q1", "2023Q2"]
+
+DRUG_NAMES = ["Aspirin", "Metformin HCl.", "HUMIRA", "Insulin Glargine", "Ozempic", "Prednisone"]
+PTS = ["Nausea", "Headache.", "Rash", "Fatigue", "Dizziness", "Vomiting"]
+OUTCOME_CODES = ["DE", "LT", "HO", "DS", "CA", "RI", "OT"]
+
+
+def write_raw_table(save_dir: Path, quarter: str, table: str, df: pd.DataFrame) -> Path:
+    """
+    Write a raw table as a $-delimited TXT file, with missing values left empty
+    """
+    quarter_dir = get_quarter_dir(quarter, save_dir)
+    quarter_dir.mkdir(parents=True, exist_ok=True)
+    path = quarter_dir / get_table_file_name(quarter, table)
+    lines = [FAERS_DELIMITER.join(df.columns)]
+    for row in df.astype(object).itertuples(index=False):
+        lines.append(
+            FAERS_DELIMITER.join("" if pd.isna(value) else str(value) for value in row)
+        )
+    path.write_bytes(("\n".join(lines) + "\n").encode(FAERS_ENCODING))
+    return path
+
+
+def make_reports(n_cases: int = 60, seed: int = 0) -> pd.DataFrame:
+    """
+    Versions of n_cases cases, with the quarter each version was reported in.
+    Every case has one to three versions, later versions have a higher caseversion
+    and fda_dt and are never in an earlier quarter.
+    """
+    rng = np.random.default_rng(seed)
+    rows = []
+    primaryid = 100000
+    for case in range(n_cases):
+        n_versions = int(rng.integers(1, 4))
+        quarter = 0
+        for version in range(1, n_versions + 1):
+            quarter = max(quarter, int(rng.integers(0, len(QUARTERS))))
+            primaryid += 1
+            rows.append(
+                {
+                    "primaryid": primaryid,
+                    "caseid": 1000 + case,
+                    "caseversion": version,
+                    "quarter": QUARTERS[quarter],
+                    "fda_dt": 20230101 + 100 * quarter + version,
+                    "age": np.nan if rng.random() < 0.25 else int(rng.integers(1, 90)),
+                }
+            )
+    return pd.DataFrame(rows)
+
+
+def make_quarter_tables(reports: pd.DataFrame, seed: int = 0) -> Dict[str, pd.DataFrame]:
+    """
+    The seven raw tables of a set of reports
+    """
+    rng = np.random.default_rng(seed)
+    n = len(reports)
+    ids = reports[["primaryid", "caseid"]].reset_index(drop=True)
+
+    def per_report(counts: np.ndarray) -> pd.DataFrame:
+        return ids.loc[ids.index.repeat(counts)].reset_index(drop=True)
+
+    demo = ids.assign(
+        caseversion=reports["caseversion"].to_numpy(),
+        i_f_code=np.where(reports["caseversion"].to_numpy() > 1, "F", "I"),
+        event_dt=2022,
+        fda_dt=reports["fda_dt"].to_numpy(),
+        age_cod=rng.choice(["YR", "MON", "DEC", None], n),
+        age=reports["age"].to_numpy(),
+        sex=rng.choice(["F", "M", None], n),
+        wt=rng.choice([60, 75.5, 160, None], n),
+        wt_cod=rng.choice(["KG", "LBS", None], n),
+        occr_country="US",
+    )
+
+    drug_counts = rng.integers(1, 3, n)
+    drug = per_report(drug_counts)
+    drug["drug_seq"] = drug.groupby("primaryid").cumcount() + 1
+    drug["role_cod"] = np.where(drug["drug_seq"] == 1, "PS", "SS")
+    drug["drugname"] = rng.choice(DRUG_NAMES + [None], len(drug))
+    drug["prod_ai"] = rng.choice(["ASPIRIN", "METFORMIN", "ADALIMUMAB", None], len(drug))
+    drug["dechal"] = rng.choice(["Y", "N", "U", None], len(drug))
+    drug["rechal"] = rng.choice(["Y", "N", "U", None], len(drug))
+
+    reac = per_report(rng.integers(1, 4, n))
+    reac["pt"] = rng.choice(PTS, len(reac))
+    reac["drug_rec_act"] = None
+
+    outc = per_report(rng.integers(0, 3, n))
+    outc["outc_cod"] = rng.choice(OUTCOME_CODES, len(outc))
+
+    ther = per_report(drug_counts)
+    ther["dsg_drug_seq"] = ther.groupby("primaryid").cumcount() + 1
+    ther["start_dt"] = rng.choice([20220101, 20220315, None], len(ther))
+
+    indi = per_report(drug_counts)
+    indi["indi_drug_seq"] = indi.groupby("primaryid").cumcount() + 1
+    indi["indi_pt"] = rng.choice(["Pain", "Diabetes mellitus", "Arthritis", None], len(indi))
+
+    rpsr = per_report(rng.integers(0, 2, n))
+    rpsr["rpsr_cod"] = rng.choice(["EXP", "DIR", "CSM"], len(rpsr))
+
+    return {
+        "demo": demo,
+        "drug": drug,
+        "reac": reac,
+        "outc": outc,
+        "ther": ther,
+        "indi": indi,
+        "rpsr": rpsr,
+    }
+
+
+def make_quarters(save_dir: Path, reports: pd.DataFrame) -> List[str]:
+    """
+    Write the raw tables of every quarter in reports, plus an RxNorm mapping
+    """
+    for i, (quarter, quarter_reports) in enumerate(reports.groupby("quarter")):
+        for table, df in make_quarter_tables(quarter_reports, seed=i).items():
+            write_raw_table(save_dir, quarter, table, df)
+    pd.DataFrame(
+        {
+            "drugname": ["aspirin", "metformin hcl", "humira"],
+            "best_match_name": ["aspirin", "metformin", "humira"],
+            "rxnorm_name": ["ASPIRIN", "METFORMIN", "ADALIMUMAB"],
+        }
+    ).to_csv(Path(save_dir) / "rxnorm_map.csv", index=False)
+    return sorted(reports["quarter"].unique())
+
+
+@pytest.fixture
+def reports() -> pd.DataFrame:
+    return make_reports()
+
+
+@pytest.fixture
+def faers_dir(tmp_path, monkeypatch, reports) -> Path:
+    """
+    A data directory with the synthetic quarters. The working directory is its
+    parent, so paths relative to data/ (e.g. the RxNorm mapping) resolve to it.
+    """
+    monkeypatch.chdir(tmp_path)
+    save_dir = tmp_path / "data"
+    make_quarters(save_dir, reports)
+    return save_dir
@@ -0,0 +1,45 @@
+import pandas as pd
+import pytest
+
+from src.data_loader import load_faers_data
+
+# Table and column of every list column of merged
+LIST_COLUMNS = {"pt": "reac", "rpsr_cod": "rpsr", "start_dt": "ther"}
+
+
+def old_aggregate(df: pd.DataFrame, column: str) -> pd.DataFrame:
+    """
+    The aggregation the list columns were built with before they were ragged arrays
+    """
+    return (
+        df.groupby(["primaryid", "caseid"])[column]
+        .apply(lambda x: list(x.dropna().unique()))
+        .reset_index()
+    )
+
+
+@pytest.mark.parametrize("column", list(LIST_COLUMNS))
+def test_merged_lists_match_the_old_aggregates(faers_dir, column):
+    data = load_faers_data(2023, 2023, 1, 2, save_dir=str(faers_dir))
+    merged = data.merged
+    assert isinstance(merged[column].dtype, pd.ArrowDtype)
+
+    table = getattr(data, f"{LIST_COLUMNS[column]}_data")
+    old = data.drug_data[["primaryid", "caseid"]].merge(
+        old_aggregate(table, column), on=["primaryid", "caseid"], how="left"
+    )
+    new = merged[column].array.__arrow_array__().to_pylist()
+    assert len(new) == len(old)
+    for new_values, old_values in zip(new, old[column]):
+        # Reports without rows in the table have a missing list, as before
+        if not isinstance(old_values, list):
+            assert new_values is None
+        else:
+            assert new_values == [str(v) if column == "pt" else v for v in old_values]
+
+
+def test_list_elements_are_python_lists(faers_dir):
+    merged = load_faers_data(2023, 2023, 1, 2, save_dir=str(faers_dir)).merged
+    has_pts = merged["pt"].notna()
+    assert isinstance(merged.loc[has_pts, "pt"].iloc[0], list)
+    assert merged["pt"].tolist() == merged["pt"].array.__arrow_array__().to_pylist()
@@ -0,0 +1,63 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from src.cache import CacheManager, quarter_fingerprint
+from src.data_loader import FAERSDataLoader, load_faers_data
+from src.incidence import FAERSIncidence
+from src.utils.quarter_archive import get_quarter_dir, get_table_file_name
+from tests.conftest import QUARTERS
+
+
+def test_lazy_tables_survive_eviction_by_another_loader(faers_dir):
+    data = load_faers_data(2023, 2023, 1, 1, save_dir=str(faers_dir))
+    expected = load_faers_data(2023, 2023, 1, 1, save_dir=str(faers_dir), cache=False).drug_data
+
+    # A later loader with a tiny budget evicts every shard it isn't using
+    FAERSDataLoader(2023, 2023, 2, 2, save_dir=str(faers_dir), cache_max_bytes=1)
+    assert not any(
+        key.startswith("2023Q1") for key in CacheManager(faers_dir / "cache").list_entries()["key"]
+    )
+
+    pd.testing.assert_frame_equal(
+        data.drug_data.reset_index(drop=True), expected.reset_index(drop=True)
+    )
+    # The rebuilt table is written back to the shard
+    assert any(
+        key.startswith("2023Q1") for key in CacheManager(faers_dir / "cache").list_entries()["key"]
+    )
+
+
+def test_eager_incidence_is_cached(faers_dir, monkeypatch):
+    loader = FAERSDataLoader(2023, 2023, 1, 2, save_dir=str(faers_dir))
+    loader.load_quarters()
+    built = loader.get_data().incidence
+    key = loader._incidence_key()
+    assert key in set(CacheManager(faers_dir / "cache").list_entries()["key"])
+
+    # A second eager load reads the matrices instead of rebuilding them
+    def rebuild(*args):
+        raise AssertionError("incidence was rebuilt")
+
+    monkeypatch.setattr(FAERSIncidence, "build", rebuild)
+    loader = FAERSDataLoader(2023, 2023, 1, 2, save_dir=str(faers_dir))
+    loader.load_quarters()
+    cached = loader.get_data().incidence
+    np.testing.assert_array_equal(cached.reports, built.reports)
+    assert (cached.pt.matrix != built.pt.matrix).nnz == 0
+
+
+def test_fingerprint_sees_content_changes_with_the_same_size_and_mtime(faers_dir):
+    path = get_quarter_dir(QUARTERS[0], faers_dir) / get_table_file_name(QUARTERS[0], "drug")
+    before = quarter_fingerprint(QUARTERS[0], str(faers_dir))
+    assert quarter_fingerprint(QUARTERS[0], str(faers_dir)) == before
+
+    stat = path.stat()
+    content = bytearray(path.read_bytes())
+    content[-2] = ord("X") if content[-2] != ord("X") else ord("Y")
+    path.write_bytes(bytes(content))
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+
+    assert path.stat().st_size == stat.st_size
+    assert quarter_fingerprint(QUARTERS[0], str(faers_dir)) != before
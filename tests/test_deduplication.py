@@ -0,0 +1,82 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.data_loader import TABLE_NAMES, FAERSDataLoader, load_faers_data
+from src.deduplication import CaseDeduplicator, case_versions
+
+
+def latest_primaryids(reports: pd.DataFrame) -> set:
+    return set(reports.loc[reports.groupby("caseid")["caseversion"].idxmax(), "primaryid"])
+
+
+@pytest.mark.parametrize("use_cache", [True, False])
+@pytest.mark.parametrize("eager", [True, False])
+def test_tables_only_hold_latest_versions(faers_dir, reports, use_cache, eager):
+    loader = FAERSDataLoader(
+        2023, 2023, 1, 2, save_dir=str(faers_dir), use_cache=use_cache, deduplicate=True
+    )
+    if eager:
+        loader.load_quarters()
+    data = loader.get_data()
+
+    latest = latest_primaryids(reports)
+    for name in TABLE_NAMES:
+        primaryids = set(getattr(data, f"{name}_data")["primaryid"])
+        assert primaryids, name
+        assert primaryids <= latest, f"{name} holds superseded reports {sorted(primaryids - latest)}"
+
+
+def test_versions_dropped_by_preprocessing_are_superseded(faers_dir, reports):
+    loader = FAERSDataLoader(2023, 2023, 1, 2, save_dir=str(faers_dir), deduplicate=True)
+    superseded = set(loader.superseded_primaryids)
+    assert superseded == set(reports["primaryid"]) - latest_primaryids(reports)
+
+    # Some of them never make it to the preprocessed demo (an older version in the
+    # same quarter, or no age), so they can only come from the versions table
+    demo = load_faers_data(2023, 2023, 1, 2, save_dir=str(faers_dir)).demo_data
+    assert superseded - set(demo["primaryid"])
+
+
+def test_not_deduplicated_by_default(faers_dir, reports):
+    drug = load_faers_data(2023, 2023, 1, 2, save_dir=str(faers_dir)).drug_data
+    assert not set(drug["primaryid"]) <= latest_primaryids(reports)
+
+
+def test_quarter_order_does_not_matter(reports):
+    quarters = [case_versions(group) for _, group in reports.groupby("quarter")]
+    forward, backward = CaseDeduplicator(), CaseDeduplicator()
+    for versions in quarters:
+        forward.add(versions)
+    for versions in reversed(quarters):
+        backward.add(versions)
+    np.testing.assert_array_equal(np.sort(forward.superseded), np.sort(backward.superseded))
+    np.testing.assert_array_equal(
+        np.sort(forward.latest_primaryids()), np.sort(list(latest_primaryids(reports)))
+    )
+
+
+def test_reading_between_quarters(reports):
+    quarters = [case_versions(group) for _, group in reports.groupby("quarter")]
+    interleaved, at_once = CaseDeduplicator(), CaseDeduplicator()
+    for versions in quarters:
+        interleaved.add(versions)
+        interleaved.superseded
+        at_once.add(versions)
+    np.testing.assert_array_equal(np.sort(interleaved.superseded), np.sort(at_once.superseded))
+    assert set(interleaved.superseded) == set(reports["primaryid"]) - latest_primaryids(reports)
+
+
+def test_versions_are_added_to_older_processed_stores(faers_dir, reports):
+    FAERSDataLoader(2023, 2023, 1, 2, save_dir=str(faers_dir), use_cache=False).load_quarters()
+    # A store written before the versions table existed
+    stored_versions = list((faers_dir / "processed_faers").glob("*/versions.parquet"))
+    assert len(stored_versions) == 2
+    for path in stored_versions:
+        path.unlink()
+
+    loader = FAERSDataLoader(
+        2023, 2023, 1, 2, save_dir=str(faers_dir), use_cache=False, deduplicate=True
+    )
+    assert set(loader.data.drug_data["primaryid"]) <= latest_primaryids(reports)
+    assert len(list((faers_dir / "processed_faers").glob("*/versions.parquet"))) == 2
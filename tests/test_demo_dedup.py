@@ -0,0 +1,26 @@
+import pandas as pd
+
+from benchmarks.demo_dedup import compare, make_demo, old_latest
+from src.deduplication import is_latest_version
+
+
+def test_matches_old_rule_outside_conflicting_cases():
+    result = compare(make_demo(20000, seed=1, conflict_rate=0.05))
+    assert result["conflicting_cases"] > 0
+    assert result["same_cases_kept"]
+    assert result["only_conflicts_differ"]
+    assert result["same_reports_elsewhere"]
+
+
+def test_follow_up_with_older_date_is_kept():
+    # The follow-up (version 2) was received before the initial report
+    demo = pd.DataFrame(
+        {
+            "primaryid": [101, 102, 201, 202],
+            "caseid": [1, 1, 2, 2],
+            "caseversion": [1, 2, 1, 2],
+            "fda_dt": [20240301.0, 20240101.0, 20240101.0, 20240301.0],
+        }
+    )
+    assert set(demo.loc[is_latest_version(demo), "primaryid"]) == {102, 202}
+    assert set(old_latest(demo)["primaryid"]) == {101, 202}
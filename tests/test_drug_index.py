@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.data_loader import load_faers_data
+from src.drug_index import (
+    DRUG_NAME_COLUMNS,
+    DrugNameIndex,
+    get_drug_index,
+    match_drug_names,
+)
+from src.drug_search import filter_by_drug_name
+
+NAMES = ["aspirin", "Aspirin 81MG", "metformin hcl", "humira", "insulin glargine", "ozempic", "as"]
+
+QUERIES = [
+    "a",  # shorter than a trigram
+    "as",
+    "asp",
+    "Asp",  # case differs from most names
+    "ASPIRIN",
+    "in",
+    "glargine",
+    "zzz",
+    "^hum",  # regular expressions
+    "in$",
+    "met.*hcl",
+]
+
+
+def old_scan(drug_df: pd.DataFrame, drug_name: str) -> np.ndarray:
+    """
+    The str.contains scan filter_by_drug_name ran before the index
+    """
+    return (
+        drug_df["drugname"].str.contains(drug_name, na=False)
+        | drug_df["prod_ai"].str.contains(drug_name, na=False)
+        | drug_df["best_match_name"].str.contains(drug_name, na=False)
+        | drug_df["rxnorm_name"].str.contains(drug_name, na=False)
+    ).to_numpy()
+
+
+def make_drug_df(categories, n_rows: int = 300, seed: int = 0, categorical: bool = True) -> pd.DataFrame:
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({"primaryid": rng.integers(0, 100, n_rows)})
+    for column in DRUG_NAME_COLUMNS:
+        # About one name in six is null
+        codes = rng.integers(-1, len(categories), n_rows)
+        values = pd.Categorical.from_codes(codes, categories=categories)
+        df[column] = values if categorical else pd.Series(values).astype(object)
+    return df
+
+
+@pytest.mark.parametrize("categorical", [True, False])
+@pytest.mark.parametrize("query", QUERIES)
+def test_matches_old_scan(query, categorical):
+    drug_df = make_drug_df(pd.Index(NAMES), categorical=categorical)
+    np.testing.assert_array_equal(match_drug_names(drug_df, query), old_scan(drug_df, query))
+
+
+def test_matches_names_added_after_the_index_was_built():
+    old_categories = pd.Index(NAMES)
+    index = get_drug_index(old_categories)
+    assert not len(index.search("wegovy"))
+
+    # The vocabulary grew, the index must pick the new names up
+    categories = old_categories.append(pd.Index(["wegovy", "aspirin/caffeine"]))
+    drug_df = make_drug_df(categories, seed=1)
+    for query in ["wegovy", "aspirin", "caff", "as"]:
+        np.testing.assert_array_equal(match_drug_names(drug_df, query), old_scan(drug_df, query))
+    assert get_drug_index(categories) is index
+
+    # An older frame over the shorter categories ignores names beyond them
+    older_df = make_drug_df(old_categories, seed=2)
+    np.testing.assert_array_equal(match_drug_names(older_df, "wegovy"), old_scan(older_df, "wegovy"))
+
+
+def test_index_update_refuses_unrelated_categories():
+    index = DrugNameIndex(NAMES)
+    assert not index.update(pd.Index(["humira", "aspirin"]))
+    assert len(index) == len(NAMES)
+
+
+def test_filter_by_drug_name_matches_old_scan(faers_dir):
+    data = load_faers_data(2023, 2023, 1, 2, save_dir=str(faers_dir))
+    for query in ["aspirin", "ASPIRIN", "me", "humira", "^in", "nothing"]:
+        old = data.drug_data[old_scan(data.drug_data, query)]
+        pd.testing.assert_frame_equal(filter_by_drug_name(data, query), old)
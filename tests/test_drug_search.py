@@ -0,0 +1,32 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.data_loader import load_faers_data
+from src.drug_index import match_drug_names, match_drug_names_batch
+from src.drug_search import filter_by_drug_name, filter_by_drug_names
+from tests.test_drug_index import NAMES, QUERIES, make_drug_df, old_scan
+
+
+@pytest.mark.parametrize("categorical", [True, False])
+def test_batch_matches_single_queries(categorical):
+    drug_df = make_drug_df(pd.Index(NAMES), seed=3, categorical=categorical)
+    membership, reports = match_drug_names_batch(drug_df, QUERIES)
+    for i, query in enumerate(QUERIES):
+        row = membership.getrow(i).toarray().ravel().astype(bool)
+        single = np.sort(pd.unique(drug_df.loc[match_drug_names(drug_df, query), "primaryid"]))
+        np.testing.assert_array_equal(reports[row], single, err_msg=query)
+        old = np.sort(pd.unique(drug_df.loc[old_scan(drug_df, query), "primaryid"]))
+        np.testing.assert_array_equal(reports[row], old, err_msg=query)
+
+
+def test_filter_by_drug_names_matches_filter_by_drug_name(faers_dir):
+    data = load_faers_data(2023, 2023, 1, 2, save_dir=str(faers_dir))
+    queries = ["aspirin", "ASPIRIN", "me", "humira", "^in", "nothing"]
+    matches = filter_by_drug_names(data, queries + ["aspirin"])
+    assert list(matches) == queries
+    for query in queries:
+        single = filter_by_drug_name(data, query)
+        np.testing.assert_array_equal(matches[query], np.sort(single["primaryid"].unique()))
+        old = data.drug_data[old_scan(data.drug_data, query)]
+        pd.testing.assert_frame_equal(single, old)
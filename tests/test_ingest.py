@@ -0,0 +1,98 @@
+import queue
+import threading
+import time
+
+from src import ingest
+from src.ingest import CONVERTED, _DONE, _download_stage, build_parser, ingest_faers_quarters
+from src.parse_quarters import ParseQuarters
+from src.processed_store import is_quarter_processed
+from src.report_downloader import DOWNLOADED, FAILED, SKIPPED
+
+
+class StubDownloader:
+    """
+    Stands in for FAERSDownloader: "downloads" instantly, except the failing quarters
+    """
+
+    def __init__(self, failing=(), delay: float = 0.0):
+        self.failing = set(failing)
+        self.delay = delay
+        self.calls = []
+        self.lock = threading.Lock()
+
+    def download_quarter_with_retries(self, quarter, retries, **kwargs):
+        time.sleep(self.delay)
+        with self.lock:
+            self.calls.append((quarter, retries, kwargs))
+        return FAILED if quarter in self.failing else DOWNLOADED
+
+
+def test_download_stage_queues_quarters_in_order():
+    downloader = StubDownloader(failing={"2023Q2"})
+    downloaded = queue.Queue()
+    summary = {CONVERTED: [], SKIPPED: [], FAILED: []}
+    _download_stage(downloader, ["2023Q1", "2023Q2", "2023Q3"], downloaded, summary, 1, 5)
+
+    assert [downloaded.get_nowait() for _ in range(3)] == ["2023Q1", "2023Q3", _DONE]
+    assert summary[FAILED] == ["2023Q2"]
+    assert {retries for _, retries, _ in downloader.calls} == {5}
+
+
+def test_download_stage_is_bounded_by_the_queue():
+    quarters = [f"20{year}Q{q}" for year in range(10, 13) for q in range(1, 5)]
+    downloader = StubDownloader()
+    downloaded = queue.Queue(maxsize=2)
+    summary = {CONVERTED: [], SKIPPED: [], FAILED: []}
+    thread = threading.Thread(
+        target=_download_stage, args=(downloader, quarters, downloaded, summary, 1, 0)
+    )
+    thread.start()
+
+    received = []
+    while True:
+        time.sleep(0.01)
+        # The downloader is at most the queue plus the one blocked put ahead
+        assert len(downloader.calls) - len(received) <= 2 + 1
+        quarter = downloaded.get()
+        if quarter is _DONE:
+            break
+        received.append(quarter)
+    thread.join()
+    assert received == quarters
+
+
+def test_ingest_collects_download_and_convert_errors(faers_dir, monkeypatch):
+    downloader = StubDownloader(failing={"2023Q3"})
+    options = {}
+
+    def make_downloader(save_dir, debug=False, request_delay=1.0):
+        options["request_delay"] = request_delay
+        return downloader
+
+    monkeypatch.setattr(ingest, "FAERSDownloader", make_downloader)
+    monkeypatch.setattr(ParseQuarters, "check_available_online", lambda self, save_dir: None)
+
+    # 2023Q4 "downloads" but has no raw files, so its conversion fails
+    summary = ingest_faers_quarters(
+        2023, 2023, 1, 4, save_dir=str(faers_dir), queue_size=1, convert_workers=2,
+        retries=4, request_delay=0.5,
+    )
+    assert summary == {CONVERTED: ["2023Q1", "2023Q2"], SKIPPED: [], FAILED: ["2023Q3", "2023Q4"]}
+    assert options["request_delay"] == 0.5
+    assert {retries for _, retries, _ in downloader.calls} == {4}
+    for quarter in ["2023Q1", "2023Q2"]:
+        assert is_quarter_processed(quarter, ["drug"], str(faers_dir))
+
+    # Converted quarters are skipped the next time
+    summary = ingest_faers_quarters(2023, 2023, 1, 2, save_dir=str(faers_dir))
+    assert summary == {CONVERTED: [], SKIPPED: ["2023Q1", "2023Q2"], FAILED: []}
+
+
+def test_cli_exposes_retries_and_request_delay():
+    args = build_parser().parse_args(
+        ["--start-year", "2023", "--end-year", "2023", "--retries", "7", "--request-delay", "2.5"]
+    )
+    assert args.retries == 7
+    assert args.request_delay == 2.5
+    defaults = build_parser().parse_args(["--start-year", "2023", "--end-year", "2023"])
+    assert (defaults.retries, defaults.request_delay) == (3, 1.0)
@@ -0,0 +1,47 @@
+import pandas as pd
+
+from src.data_loader import load_faers_data
+from src.normalization import NameNormalizer, clean_pts, get_normalization_dir, get_normalizer
+
+
+def test_dictionaries_follow_save_dir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    save_dir = tmp_path / "elsewhere"
+    get_normalizer("pt", str(save_dir)).normalize(pd.Series(["Nausea.", " Rash"]))
+    get_normalizer("pt", str(save_dir)).save()
+
+    assert any(get_normalization_dir(save_dir).glob("pt_v*/*.parquet"))
+    assert not (tmp_path / "data").exists()
+
+
+def test_loader_persists_normalizations_under_save_dir(faers_dir, tmp_path, monkeypatch):
+    # Run from a directory unrelated to the data
+    workdir = tmp_path / "workdir"
+    workdir.mkdir()
+    monkeypatch.chdir(workdir)
+    (workdir / "data").mkdir()
+    (faers_dir / "rxnorm_map.csv").rename(workdir / "data" / "rxnorm_map.csv")
+
+    load_faers_data(2023, 2023, 1, 1, save_dir=str(faers_dir)).drug_data
+
+    for name in ["drugname", "prod_ai"]:
+        assert any(get_normalization_dir(faers_dir).glob(f"{name}_v*/*.parquet"))
+    assert not (workdir / "data" / "normalization").exists()
+
+
+def test_normalizer_without_save_dir_stays_in_memory(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    normalizer = NameNormalizer("pt", clean_pts)
+    assert normalizer.normalize(pd.Series(["Nausea."])).tolist() == ["nausea"]
+    normalizer.save()
+    assert not any(tmp_path.iterdir())
+
+
+def test_normalizer_persists_under_its_save_dir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    save_dir = tmp_path / "elsewhere"
+    normalizer = NameNormalizer("pt", clean_pts, str(save_dir))
+    normalizer.normalize(pd.Series(["Nausea."]))
+    normalizer.save()
+    assert any(get_normalization_dir(save_dir).glob("pt_v*/*.parquet"))
+    assert not (tmp_path / "data").exists()
@@ -0,0 +1,76 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.data_loader import load_faers_data, read_raw_table
+from src.filters import filter_by
+from src.outcomes import OUTCOME_LABELS, encode_outcomes, is_fatal, is_serious
+from src.utils.quarter_archive import get_quarter_dir, get_table_file_name
+from tests.conftest import QUARTERS
+
+OUTC = pd.DataFrame(
+    {
+        "primaryid": [1, 1, 2, 3, 3, 3],
+        "caseid": [10, 10, 20, 30, 30, 30],
+        "outc_cod": ["DE", "HO", "OT", "LT", "LT", "XX"],
+    }
+)
+
+
+def masks() -> pd.Series:
+    # Report 4 has no outcome row, as after a left merge
+    return pd.concat([encode_outcomes(OUTC)["outc_mask"], pd.Series([np.nan])], ignore_index=True)
+
+
+def test_is_serious():
+    assert is_serious(masks()).tolist() == [True, True, True, False]
+
+
+def test_is_fatal():
+    assert is_fatal(masks()).tolist() == [True, False, False, False]
+
+
+def test_unknown_codes_are_ignored():
+    encoded = encode_outcomes(pd.DataFrame({"primaryid": [1], "caseid": [10], "outc_cod": ["XX"]}))
+    assert encoded["outc_mask"].tolist() == [0]
+    assert not is_serious(encoded["outc_mask"]).any()
+
+
+@pytest.mark.parametrize("filter_type", ["serious", "fatal"])
+@pytest.mark.parametrize("keep", [True, False])
+def test_filter_by_outcome(faers_dir, filter_type, keep):
+    data = load_faers_data(2023, 2023, 1, 2, save_dir=str(faers_dir))
+    predicate = {"serious": is_serious, "fatal": is_fatal}[filter_type]
+
+    filtered = filter_by(data, filter_type, keep)
+    expected = data.outc_data[predicate(data.outc_data["outc_mask"]) == keep]
+    pd.testing.assert_frame_equal(filtered, expected)
+
+    # On merged, reports without an outcome row are neither serious nor fatal
+    merged = filter_by(data.merged, filter_type, keep)
+    kept = set(expected["primaryid"])
+    merged_ids = set(data.merged["primaryid"])
+    assert set(merged["primaryid"]) == (merged_ids & kept if keep else merged_ids - set(
+        data.outc_data.loc[predicate(data.outc_data["outc_mask"]), "primaryid"]
+    ))
+
+
+def test_merged_outcome_masks_are_uint8(faers_dir):
+    merged = load_faers_data(2023, 2023, 1, 2, save_dir=str(faers_dir)).merged
+    assert merged["outc_mask"].dtype == np.uint8
+    assert (merged["outc_mask"] != 0).any() and (merged["outc_mask"] == 0).any()
+
+
+def test_outcomes_match_the_old_lists(faers_dir):
+    data = load_faers_data(2023, 2023, 1, 2, save_dir=str(faers_dir))
+    outcomes = data.outcomes.set_index("primaryid")
+
+    raw = pd.concat(
+        read_raw_table(get_quarter_dir(quarter, faers_dir) / get_table_file_name(quarter, "outc"), "outc")
+        for quarter in QUARTERS
+    )
+    old = raw.groupby("primaryid")["outc_cod"].agg(set)
+    assert set(outcomes.index) == set(old.index)
+    for primaryid, codes in old.items():
+        assert set(outcomes.at[primaryid, "outc_cod"]) == codes
+        assert set(outcomes.at[primaryid, "outc_label"]) == {OUTCOME_LABELS[code] for code in codes}
@@ -0,0 +1,62 @@
+import numpy as np
+import pandas as pd
+
+from src.preprocessing import preprocess_demo_df, unit_factors
+
+
+def make_demo(**columns) -> pd.DataFrame:
+    n = len(next(iter(columns.values())))
+    demo = pd.DataFrame(
+        {
+            "primaryid": np.arange(n) + 1,
+            "caseid": np.arange(n) + 1,
+            "caseversion": 1,
+            "age_cod": "YR",
+            "age": 30.0,
+            "sex": "F",
+            "wt": 70.0,
+            "wt_cod": "KG",
+            "fda_dt": 20230101,
+            "event_dt": 20230101,
+        }
+    )
+    for column, values in columns.items():
+        demo[column] = values
+    return demo.astype({"age_cod": "category", "wt_cod": "category", "sex": "category"})
+
+
+def test_ages_are_converted_to_years():
+    demo = preprocess_demo_df(
+        make_demo(
+            age_cod=["YR", "DEC", "MON", "WK", "DY", "HR", "yr", None],
+            age=[40, 3, 18, 26, 730, 8760, 5, 7],
+        )
+    )
+    np.testing.assert_allclose(demo["age"], [40, 30, 1.5, 0.5, 2, 1, 5, 7])
+    assert "age_cod" not in demo.columns
+
+
+def test_weights_are_converted_to_kilograms():
+    demo = preprocess_demo_df(
+        make_demo(
+            wt_cod=["KG", "LBS", "GMS", "lbs", None, "KG"],
+            wt=[70, 150, 3500, 100, 80, None],
+        )
+    )
+    np.testing.assert_allclose(
+        demo["wt"], [70, 150 * 0.45359237, 3.5, 100 * 0.45359237, 80, np.nan]
+    )
+    assert "wt_cod" not in demo.columns
+
+
+def test_weights_without_units_are_kept():
+    # Older quarters have no wt_cod column
+    demo = preprocess_demo_df(make_demo(wt=[70.0, 80.0]).drop(columns="wt_cod"))
+    np.testing.assert_allclose(demo["wt"], [70, 80])
+
+
+def test_unit_factors():
+    units = pd.Series(["LBS", None, "XX", "kg"], dtype="category")
+    np.testing.assert_allclose(
+        unit_factors(units, {"KG": 1.0, "LBS": 0.5}), [0.5, 1.0, 1.0, 1.0]
+    )
@@ -0,0 +1,41 @@
+import pandas as pd
+import pytest
+
+from src.data_loader import STORED_TABLES, TABLE_NAMES, load_quarter_tables, read_raw_table
+from src.utils.quarter_archive import get_quarter_dir, get_table_file_name
+from tests.conftest import QUARTERS
+
+
+@pytest.mark.parametrize("table", TABLE_NAMES)
+def test_engines_parse_the_same_frame(faers_dir, table):
+    path = get_quarter_dir(QUARTERS[0], faers_dir) / get_table_file_name(QUARTERS[0], table)
+    c = read_raw_table(path, table, engine="c")
+    arrow = read_raw_table(path, table, engine="pyarrow")
+    pd.testing.assert_frame_equal(c, arrow)
+
+
+def test_engines_match_with_trailing_delimiter(faers_dir):
+    path = get_quarter_dir(QUARTERS[0], faers_dir) / get_table_file_name(QUARTERS[0], "drug")
+    # FDA files often end every line with a delimiter
+    lines = path.read_text(encoding="ISO-8859-1").splitlines()
+    path.write_text("\n".join(line + "$" for line in lines) + "\n", encoding="ISO-8859-1")
+    pd.testing.assert_frame_equal(
+        read_raw_table(path, "drug", engine="c"),
+        read_raw_table(path, "drug", engine="pyarrow"),
+    )
+
+
+def test_invalid_engine(faers_dir):
+    path = get_quarter_dir(QUARTERS[0], faers_dir) / get_table_file_name(QUARTERS[0], "drug")
+    with pytest.raises(ValueError):
+        read_raw_table(path, "drug", engine="python")
+
+
+@pytest.mark.parametrize("quarter", QUARTERS)
+def test_engines_preprocess_the_same_tables(faers_dir, quarter):
+    c = load_quarter_tables(quarter, str(faers_dir), STORED_TABLES, use_processed=False, engine="c")
+    arrow = load_quarter_tables(
+        quarter, str(faers_dir), STORED_TABLES, use_processed=False, engine="pyarrow"
+    )
+    for name in STORED_TABLES:
+        pd.testing.assert_frame_equal(c[name], arrow[name], obj=name)
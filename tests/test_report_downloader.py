@@ -0,0 +1,160 @@
+import io
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from zipfile import ZIP_STORED, ZipFile
+
+import pytest
+
+from src.report_downloader import download_archive, get_part_path, verify_archive
+
+
+def make_archive() -> bytes:
+    buffer = io.BytesIO()
+    with ZipFile(buffer, "w", ZIP_STORED) as z:
+        z.writestr("ASCII/DEMO23Q1.txt", "primaryid$caseid\n" + "1$1\n" * 5000)
+    return buffer.getvalue()
+
+
+class ArchiveServer(ThreadingHTTPServer):
+    """
+    Serves one archive at /archive.zip. mode changes how it answers:
+    "range" honours Range headers, "ignore_range" always sends the whole file and
+    "truncated" stops halfway through while announcing the full size.
+    """
+
+    def __init__(self, payload: bytes, mode: str = "range"):
+        super().__init__(("127.0.0.1", 0), ArchiveHandler)
+        self.payload = payload
+        self.mode = mode
+        self.ranges = []
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}/archive.zip"
+
+
+class ArchiveHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        payload, mode = self.server.payload, self.server.mode
+        range_header = self.headers.get("Range")
+        self.server.ranges.append(range_header)
+        start = 0
+        if range_header and mode != "ignore_range":
+            start = int(re.match(r"bytes=(\d+)-", range_header).group(1))
+            if start >= len(payload):
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{len(payload)}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+        body = payload[start:]
+        if mode == "truncated":
+            body = body[: len(body) // 2]
+        if start or mode == "truncated":
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{start + len(body) - 1}/{len(payload)}")
+        else:
+            self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def serve():
+    servers = []
+
+    def start(payload: bytes, mode: str = "range") -> ArchiveServer:
+        server = ArchiveServer(payload, mode)
+        threading.Thread(target=server.serve_forever, args=(0.05,), daemon=True).start()
+        servers.append(server)
+        return server
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def test_download(serve, tmp_path):
+    payload = make_archive()
+    server = serve(payload)
+    archive_path = download_archive(server.url, tmp_path / "2023Q1.zip")
+    assert archive_path.read_bytes() == payload
+    assert not get_part_path(archive_path).exists()
+    assert server.ranges == [None]
+
+
+def test_resume_from_part_file(serve, tmp_path):
+    payload = make_archive()
+    server = serve(payload)
+    archive_path = tmp_path / "2023Q1.zip"
+    get_part_path(archive_path).write_bytes(payload[:1000])
+
+    download_archive(server.url, archive_path)
+    assert archive_path.read_bytes() == payload
+    assert server.ranges == ["bytes=1000-"]
+
+
+def test_complete_part_file_gets_416(serve, tmp_path):
+    payload = make_archive()
+    server = serve(payload)
+    archive_path = tmp_path / "2023Q1.zip"
+    get_part_path(archive_path).write_bytes(payload)
+
+    download_archive(server.url, archive_path)
+    assert archive_path.read_bytes() == payload
+    assert server.ranges == [f"bytes={len(payload)}-"]
+
+
+def test_server_ignoring_range_restarts(serve, tmp_path):
+    payload = make_archive()
+    server = serve(payload, mode="ignore_range")
+    archive_path = tmp_path / "2023Q1.zip"
+    # A stale part file the server's full response must replace, not extend
+    get_part_path(archive_path).write_bytes(b"x" * 1000)
+
+    download_archive(server.url, archive_path)
+    assert archive_path.read_bytes() == payload
+
+
+def test_truncated_body_is_kept_for_resuming(serve, tmp_path):
+    payload = make_archive()
+    server = serve(payload, mode="truncated")
+    archive_path = tmp_path / "2023Q1.zip"
+
+    with pytest.raises(ValueError, match="expected"):
+        download_archive(server.url, archive_path)
+    part_path = get_part_path(archive_path)
+    assert not archive_path.exists()
+    assert part_path.read_bytes() == payload[: len(payload) // 2]
+
+    server.mode = "range"
+    download_archive(server.url, archive_path)
+    assert archive_path.read_bytes() == payload
+
+
+def test_corrupt_member_fails_crc(serve, tmp_path):
+    payload = bytearray(make_archive())
+    # Flip a byte inside the stored member's data
+    position = payload.index(b"1$1")
+    payload[position] ^= 0xFF
+    server = serve(bytes(payload))
+    archive_path = tmp_path / "2023Q1.zip"
+
+    with pytest.raises(ValueError, match="CRC"):
+        download_archive(server.url, archive_path)
+    assert not archive_path.exists()
+    assert not get_part_path(archive_path).exists()
+
+
+def test_verify_archive_deletes_oversized_file(tmp_path):
+    path = tmp_path / "2023Q1.zip"
+    path.write_bytes(make_archive())
+    with pytest.raises(ValueError, match="expected"):
+        verify_archive(path, path.stat().st_size - 1)
+    assert not path.exists()
@@ -0,0 +1,58 @@
+import io
+
+import pandas as pd
+import pytest
+
+from src.data_loader import FAERSDataLoader, iter_raw_table, read_raw_table
+from src.schemas import TABLE_SCHEMAS
+from src.utils.quarter_archive import get_quarter_dir, get_table_file_name
+from tests.conftest import QUARTERS, make_quarter_tables, write_raw_table
+
+# Non-key integer columns that can be blank in a raw file
+BLANKABLE = {
+    "drug": "drug_seq",
+    "demo": "caseversion",
+    "ther": "dsg_drug_seq",
+    "indi": "indi_drug_seq",
+}
+
+
+def test_blank_cell_is_read_as_missing():
+    raw = "primaryid$caseid$drug_seq$role_cod$drugname\n1$1$$PS$ASPIRIN\n2$2$1$PS$HUMIRA\n"
+    drug = pd.read_csv(io.StringIO(raw), **TABLE_SCHEMAS["drug"].read_csv_kwargs())
+    assert drug["drug_seq"].isna().tolist() == [True, False]
+    assert drug["drug_seq"].dtype == "Int64"
+
+
+@pytest.mark.parametrize("engine", ["c", "pyarrow"])
+@pytest.mark.parametrize("table", list(BLANKABLE))
+def test_tables_with_blank_cells_parse(faers_dir, reports, table, engine):
+    column = BLANKABLE[table]
+    df = make_quarter_tables(reports[reports["quarter"] == QUARTERS[0]])[table]
+    df[column] = df[column].astype(object)
+    df.loc[df.index[0], column] = None
+    path = write_raw_table(faers_dir, QUARTERS[0], table, df)
+
+    parsed = read_raw_table(path, table, engine=engine)
+    assert parsed[column].dtype == "Int64"
+    assert parsed[column].isna().sum() == 1
+    chunked = pd.concat(iter_raw_table(path, table, chunksize=7), ignore_index=True)
+    pd.testing.assert_series_equal(chunked[column], parsed[column])
+
+
+def test_quarter_with_blank_cells_loads(faers_dir, reports):
+    for i, quarter in enumerate(QUARTERS):
+        tables = make_quarter_tables(reports[reports["quarter"] == quarter], seed=i)
+        for table, column in BLANKABLE.items():
+            df = tables[table]
+            df[column] = df[column].astype(object)
+            df.loc[df.index[::5], column] = None
+            write_raw_table(faers_dir, quarter, table, df)
+
+    loader = FAERSDataLoader(
+        2023, 2023, 1, 2, save_dir=str(faers_dir), use_cache=False, deduplicate=True
+    )
+    loader.load_quarters()
+    data = loader.get_data()
+    assert data.drug_data["drug_seq"].isna().any()
+    assert len(data.merged)
@@ -0,0 +1,47 @@
+import shutil
+
+import pandas as pd
+import pytest
+
+from src.data_loader import FAERSDataLoader, load_faers_data
+from src.processed_store import get_processed_epoch
+from src.utils.quarter_archive import get_quarter_dir
+from src.vocabulary import get_vocabulary_dir, get_vocabulary_epoch
+from tests.conftest import QUARTERS
+
+
+@pytest.fixture
+def store_only_dir(faers_dir):
+    """
+    faers_dir with its quarters in the processed store and their raw files removed
+    """
+    FAERSDataLoader(2023, 2023, 1, 2, save_dir=str(faers_dir), use_cache=False).load_quarters()
+    for quarter in QUARTERS:
+        shutil.rmtree(get_quarter_dir(quarter, faers_dir))
+    return faers_dir
+
+
+def test_store_records_vocabulary_epoch(store_only_dir):
+    for quarter in QUARTERS:
+        assert get_processed_epoch(quarter, str(store_only_dir)) == get_vocabulary_epoch(str(store_only_dir))
+
+
+def test_store_only_quarters_decode_with_their_vocabulary(faers_dir):
+    loader = FAERSDataLoader(2023, 2023, 1, 2, save_dir=str(faers_dir), use_cache=False)
+    loader.load_quarters()
+    expected = loader.get_data().drug_data
+    for quarter in QUARTERS:
+        shutil.rmtree(get_quarter_dir(quarter, faers_dir))
+    drug = load_faers_data(2023, 2023, 1, 2, save_dir=str(faers_dir), cache=False).drug_data
+    pd.testing.assert_frame_equal(drug, expected)
+
+
+@pytest.mark.parametrize("use_cache", [True, False])
+def test_store_only_quarters_refuse_another_vocabulary(store_only_dir, use_cache):
+    # e.g. the store was copied without data/vocabulary, which was then regrown
+    shutil.rmtree(get_vocabulary_dir(store_only_dir))
+    get_vocabulary_epoch(str(store_only_dir))
+    with pytest.raises(ValueError, match="different vocabulary"):
+        load_faers_data(
+            2023, 2023, 1, 2, save_dir=str(store_only_dir), cache=use_cache
+        ).drug_data